@@ -0,0 +1,144 @@
+# adjacency for whole arrays of points at once
+# the neighbor in each direction is computed with NumPy masks over (starting point, l, d) coordinates
+# rather than calling add_direction_to_point_code six times per point
+
+# in the CD-normalized half-peel squares, with N = 2**n and top = N-1:
+# - moving within the square is just l +/- 1 and/or d +/- 1
+# - stepping off an edge of the square lands in a neighboring square (C, D, E, F, K, L from the CD peel's perspective)
+#   at coordinates which are a simple function of (l, d), including the refraction across the CA and DB edges
+#   and the reversed polarity of the K-A and L-B edges
+# the cases below are the closed forms of the cases in add_direction_to_point_code,
+# and the results are the same (checked point-by-point in tests)
+
+
+import numpy as np
+
+import icosalattice.PackedPointCodes as ppc
+import icosalattice.StartingPoints as sp
+from icosalattice.PackedPointCodes import NORTH_POLE_INDEX, SOUTH_POLE_INDEX, C_INDEX, D_INDEX
+
+
+ADJACENCY_DIRECTIONS = [1, 2, 3, -1, -2, -3]
+NO_NEIGHBOR = -1  # sentinel in packed neighbor arrays
+
+_I = ppc.STARTING_POINT_INDEX
+E_INDEX = _I["E"]
+F_INDEX = _I["F"]
+K_INDEX = _I["K"]
+L_INDEX = _I["L"]
+
+
+def get_adjacency_array_from_point_codes(pcs):
+    # (N, 6) object array of point code strings, None where there is no neighbor
+    ppcs = ppc.get_packed_code_array_from_point_codes(pcs)
+    adj = get_adjacency_array_from_packed_codes(ppcs)
+    res = np.full(adj.shape, None, dtype=object)
+    mask = adj != NO_NEIGHBOR
+    res[mask] = ppc.get_point_code_array_from_packed_codes(adj[mask])
+    return res
+
+
+def get_adjacency_array_from_packed_codes(ppcs):
+    # (N, 6) int64 array of packed codes, in direction order [1, 2, 3, -1, -2, -3], NO_NEIGHBOR where there is no neighbor
+    # poles have no neighbors in any direction (directions from them are ill-defined), same as get_adjacency_from_point_code
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    h, l, d, n = ppc.unpack_l_and_d_array(ppcs)
+    top = (1 << n) - 1
+    size = top + 1
+
+    is_pole = h < C_INDEX
+    peel_offset = np.where(is_pole, 0, (h - C_INDEX) >> 1)
+    in_d = ~is_pole & ((h - C_INDEX) & 1 == 1)
+    in_c = ~is_pole & ~in_d
+
+    l_max = l == top
+    d_max = d == top
+    l_zero = l == 0
+    d_zero = d == 0
+
+    res_h = np.full((len(ppcs), 6), NO_NEIGHBOR, dtype=np.int64)
+    res_l = np.zeros((len(ppcs), 6), dtype=np.int64)
+    res_d = np.zeros((len(ppcs), 6), dtype=np.int64)
+
+    def put(col, mask, new_h, new_l, new_d):
+        res_h[mask, col] = new_h if np.isscalar(new_h) else new_h[mask]
+        res_l[mask, col] = new_l if np.isscalar(new_l) else new_l[mask]
+        res_d[mask, col] = new_d if np.isscalar(new_d) else new_d[mask]
+
+    # +1
+    put(0, in_c & ~l_max, C_INDEX, l + 1, d)
+    put(0, in_c & l_max & d_zero, NORTH_POLE_INDEX, 0, 0)
+    put(0, in_c & l_max & ~d_zero, K_INDEX, size - d, 0)
+    put(0, in_d & ~l_max, D_INDEX, l + 1, d)
+    put(0, in_d & l_max, C_INDEX, 0, d)
+
+    # +2
+    put(1, in_c & ~l_max & ~d_max, C_INDEX, l + 1, d + 1)
+    put(1, in_c & l_max & ~d_max, K_INDEX, top - d, 0)
+    put(1, in_c & ~l_max & d_max, L_INDEX, l + 1, 0)
+    put(1, in_c & l_max & d_max, K_INDEX, 0, 0)
+    put(1, in_d & ~l_max & ~d_max, D_INDEX, l + 1, d + 1)
+    put(1, in_d & l_max & ~d_max, C_INDEX, 0, d + 1)
+    put(1, in_d & ~l_max & d_max, L_INDEX, 0, top - l)
+    put(1, in_d & l_max & d_max, L_INDEX, 0, 0)
+
+    # +3
+    put(2, in_c & ~d_max, C_INDEX, l, d + 1)
+    put(2, in_c & d_max, L_INDEX, l, 0)
+    put(2, in_d & ~d_max, D_INDEX, l, d + 1)
+    put(2, in_d & d_max & l_zero, SOUTH_POLE_INDEX, 0, 0)
+    put(2, in_d & d_max & ~l_zero, L_INDEX, 0, size - l)
+
+    # -1
+    put(3, in_c & ~l_zero, C_INDEX, l - 1, d)
+    put(3, in_c & l_zero, D_INDEX, top, d)
+    put(3, in_d & ~l_zero, D_INDEX, l - 1, d)
+    put(3, in_d & l_zero & ~d_zero, F_INDEX, top - d, top)  # refraction across DB edge; D itself has no -1 neighbor
+
+    # -2
+    put(4, in_c & ~l_zero & ~d_zero, C_INDEX, l - 1, d - 1)
+    put(4, in_c & l_zero & d_zero, E_INDEX, top, top)
+    put(4, in_c & ~l_zero & d_zero, E_INDEX, top, size - l)  # refraction across CA edge
+    put(4, in_c & l_zero & ~d_zero, D_INDEX, top, d - 1)
+    put(4, in_d & ~l_zero & ~d_zero, D_INDEX, l - 1, d - 1)
+    put(4, in_d & l_zero & d_zero, F_INDEX, top, top)
+    put(4, in_d & l_zero & ~d_zero, F_INDEX, size - d, top)  # refraction across DB edge
+    put(4, in_d & ~l_zero & d_zero, E_INDEX, l - 1, top)
+
+    # -3
+    put(5, in_c & ~d_zero, C_INDEX, l, d - 1)
+    put(5, in_c & d_zero & ~l_zero, E_INDEX, top, top - l)  # refraction across CA edge; C itself has no -3 neighbor
+    put(5, in_d & ~d_zero, D_INDEX, l, d - 1)
+    put(5, in_d & d_zero, E_INDEX, l, top)
+
+    # undo the peel normalization (poles are not on any peel)
+    offsets = peel_offset[:, None]
+    rotate = res_h >= C_INDEX
+    res_h = np.where(rotate, C_INDEX + (res_h - C_INDEX + 2 * offsets) % 10, res_h)
+
+    missing = res_h == NO_NEIGHBOR
+    res = ppc.pack_l_and_d_array(np.where(missing, 0, res_h), res_l, res_d, n[:, None])
+    res[missing] = NO_NEIGHBOR
+    return res
+
+
+def get_neighbor_array_from_packed_codes(ppcs):
+    # same as get_adjacency_array_from_packed_codes, except that the poles' rows have their 5 neighbors
+    # in the same order as get_neighbors_of_point_code (C1...1, E1...1, ..., K1...1 for A and L3...3, J3...3, ..., D3...3 for B)
+    # followed by NO_NEIGHBOR, so every point's row lists all of its neighbors
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    res = get_adjacency_array_from_packed_codes(ppcs)
+    h, l, d, n = ppc.unpack_l_and_d_array(ppcs)
+    for pole_index, ring in [(NORTH_POLE_INDEX, sp.NORTHERN_RING), (SOUTH_POLE_INDEX, sp.SOUTHERN_RING[::-1])]:
+        is_pole = h == pole_index
+        if not is_pole.any():
+            continue
+        pole_n = n[is_pole]
+        edge = (1 << pole_n) - 1
+        zero = np.zeros_like(pole_n)
+        # the l plane is all ones going in the 1 direction, the d plane is all ones going in the 3 direction
+        ring_l, ring_d = (edge, zero) if pole_index == NORTH_POLE_INDEX else (zero, edge)
+        for col, spc in enumerate(ring):
+            spc_indices = np.full(len(pole_n), ppc.STARTING_POINT_INDEX[spc])
+            res[is_pole, col] = ppc.pack_l_and_d_array(spc_indices, ring_l, ring_d, pole_n)
+    return res
@@ -0,0 +1,95 @@
+# the lattice at a given iteration as a graph, for simulating things spreading around on the sphere
+# nodes are numbered by canonical index (see GeneratePointCodes.get_all_packed_codes_at_iteration)
+
+# two forms of the same topology:
+# - neighbor table: dense (N, 6) array of canonical indices, columns in direction order [1, 2, 3, -1, -2, -3],
+#   NO_NEIGHBOR in the missing direction of the 10 non-pole starting points
+#   the poles' rows hold their 5 neighbors in counterclockwise order (same as get_neighbors_of_point_code) then NO_NEIGHBOR,
+#   since directions from a pole are ill-defined
+# - adjacency matrix: scipy.sparse CSR matrix with a 1 for each edge (symmetric)
+
+# building either of these for a large iteration takes a while, so they can be cached on disk as .npz
+
+
+import os
+import numpy as np
+import scipy.sparse
+
+import icosalattice.Iterations as it
+from icosalattice.AdjacencyArrays import NO_NEIGHBOR
+from icosalattice.LevelStreams import iterate_level_chunks, DEFAULT_CHUNK_SIZE
+from icosalattice.PeelSymmetry import get_peel_block_size, copy_cd_peel_to_other_peels, rotate_neighbor_indices
+
+
+def get_index_dtype_for_iteration(iterations):
+    n_points = it.get_exact_n_points_from_iterations(iterations)
+    return np.int32 if n_points < 2**31 else np.int64
+
+
+def build_neighbor_table(iterations, chunk_size=DEFAULT_CHUNK_SIZE):
+    n_points = it.get_exact_n_points_from_iterations(iterations)
+    table = np.full((n_points, 6), NO_NEIGHBOR, dtype=get_index_dtype_for_iteration(iterations))
+
+    # only the poles and the CD peel are computed, the other peels are copies of the CD peel (see PeelSymmetry)
+    # do it in chunks so the temporary (chunk, 6) arrays of packed codes don't get too big
+    chunks = iterate_level_chunks(iterations, chunk_size=chunk_size, with_xyz=False, with_neighbors=True, stop=2 + get_peel_block_size(iterations))
+    for chunk in chunks:
+        table[chunk.indices[0]:chunk.indices[0] + len(chunk.indices)] = chunk.neighbors
+    copy_cd_peel_to_other_peels(table, iterations, rotate=lambda block, peel_offset: rotate_neighbor_indices(block, peel_offset, iterations))
+
+    return table
+
+
+def get_adjacency_matrix_from_neighbor_table(table):
+    has_neighbor = table != NO_NEIGHBOR
+    n_points = len(table)
+    indptr = np.zeros(n_points + 1, dtype=table.dtype)
+    np.cumsum(has_neighbor.sum(axis=1), out=indptr[1:])
+    indices = table[has_neighbor]  # row-major, so each row's neighbors stay together
+    data = np.ones(len(indices), dtype=np.int8)
+    mat = scipy.sparse.csr_matrix((data, indices, indptr), shape=(n_points, n_points))
+    mat.sort_indices()
+    return mat
+
+
+def build_adjacency_graph(iterations, chunk_size=DEFAULT_CHUNK_SIZE):
+    table = build_neighbor_table(iterations, chunk_size=chunk_size)
+    mat = get_adjacency_matrix_from_neighbor_table(table)
+    return mat, table
+
+
+def save_adjacency_graph(path, mat, table, iterations):
+    # uncompressed so that loading is just reading the arrays back
+    np.savez(path, iterations=np.int64(iterations), neighbor_table=table, indptr=mat.indptr, indices=mat.indices)
+
+
+def load_adjacency_graph(path, iterations=None):
+    # if iterations is given, the file must have been saved for that iteration
+    with np.load(path) as f:
+        if iterations is not None and int(f["iterations"]) != iterations:
+            raise ValueError(f"{path} holds the adjacency graph of iteration {int(f['iterations'])}, not {iterations}")
+        table = f["neighbor_table"]
+        indptr = f["indptr"]
+        indices = f["indices"]
+    n_points = len(table)
+    data = np.ones(len(indices), dtype=np.int8)
+    mat = scipy.sparse.csr_matrix((data, indices, indptr), shape=(n_points, n_points))
+    mat.has_sorted_indices = True  # they were sorted before saving
+    return mat, table
+
+
+def get_adjacency_graph_cache_path(iterations, cache_dir):
+    return os.path.join(cache_dir, f"adjacency_graph_iteration_{iterations}.npz")
+
+
+def get_adjacency_graph(iterations, cache_dir=None):
+    # returns (adjacency matrix, neighbor table), loading them from cache_dir if they have been built before
+    if cache_dir is None:
+        return build_adjacency_graph(iterations)
+    path = get_adjacency_graph_cache_path(iterations, cache_dir)
+    if os.path.exists(path):
+        return load_adjacency_graph(path, iterations)
+    mat, table = build_adjacency_graph(iterations)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_adjacency_graph(path, mat, table, iterations)
+    return mat, table
@@ -1,2 +1,126 @@
 # number points by birth order in the recursive construction of the lattice
 
+# the 12 starting points are numbered 0-11 in the order of sp.STARTING_POINT_CODES
+# at iteration i, every existing point except the poles gets three children (digits 1, 2, 3 in the code),
+# and the children are numbered in order of their parent's birth number, then digit:
+#   child = n_points(i-1) + 3 * (parent - 2) + (digit - 1)
+# so the points of iteration k are exactly the birth numbers 0 <= bn < 2 + 10 * 4**k,
+# and a field stored in a flat array indexed by birth number at iteration k
+# contains the field at every coarser iteration as a prefix slice
+# (this is the same numbering as the old point numbers in IcosahedronMath)
+
+# both directions are a single loop over the digits, no recursion and no building strings digit by digit
+
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+import icosalattice.StartingPoints as sp
+from icosalattice.PackedPointCodes import MAX_ITERATIONS, STARTING_POINT_SHIFT, ITERATION_MASK
+
+
+N_POINTS_AT_ITERATION = tuple(2 + 10 * 4**i for i in range(MAX_ITERATIONS + 1))
+N_POINTS_AT_ITERATION_ARRAY = np.array(N_POINTS_AT_ITERATION, dtype=np.int64)
+N_STARTING_POINTS = N_POINTS_AT_ITERATION[0]
+
+# digit of the code <-> bit pair (l bit, d bit) in the packed tail
+DIGIT_TO_TAIL_BIT_PAIR = np.array([0b00, 0b10, 0b11, 0b01], dtype=np.int64)
+TAIL_BIT_PAIR_TO_DIGIT = np.array([0, 3, 1, 2], dtype=np.int64)
+
+
+def get_birth_number_from_point_code(pc):
+    bn = ppc.STARTING_POINT_INDEX[pc[0]]
+    for i, c in enumerate(pc[1:]):
+        if c != "0":
+            bn = N_POINTS_AT_ITERATION[i] + 3 * (bn - 2) + int(c) - 1
+    return bn
+
+
+def get_birth_numbers_from_point_codes(pcs):
+    return [get_birth_number_from_point_code(pc) for pc in pcs]
+
+
+def get_point_code_from_birth_number(bn, iterations=None):
+    # iterations is the length of the code to return (padding with trailing zeros)
+    # if not given, the code is returned at the iteration in which the point was born
+    iteration_born = get_iteration_born_from_birth_number(bn)
+    if iterations is None:
+        iterations = iteration_born
+    elif iteration_born > iterations:
+        raise ValueError(f"birth number {bn} does not exist at iteration {iterations}")
+
+    digits = ["0"] * iterations
+    for i in range(iteration_born, 0, -1):
+        first_child = N_POINTS_AT_ITERATION[i - 1]
+        if bn >= first_child:
+            parent_offset, child_index = divmod(bn - first_child, 3)
+            digits[i - 1] = "123"[child_index]
+            bn = 2 + parent_offset
+    return sp.STARTING_POINT_CODES[bn] + "".join(digits)
+
+
+def get_point_codes_from_birth_numbers(bns, iterations=None):
+    return [get_point_code_from_birth_number(bn, iterations) for bn in bns]
+
+
+def get_iteration_born_from_birth_number(bn):
+    if bn < 0 or bn >= N_POINTS_AT_ITERATION[-1]:
+        raise ValueError(f"invalid birth number {bn}")
+    i = 0
+    while bn >= N_POINTS_AT_ITERATION[i]:
+        i += 1
+    return i
+
+
+def get_birth_number_array_from_packed_codes(ppcs):
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    bns = ppcs >> STARTING_POINT_SHIFT
+    if len(ppcs) == 0:
+        return bns
+    max_n = int((ppcs & ITERATION_MASK).max())
+    # the tail is left-aligned, so digit i is always in the same two bits regardless of the code's length,
+    # and the bits past the end of a shorter code are zero (no child)
+    for i in range(max_n):
+        digit = TAIL_BIT_PAIR_TO_DIGIT[(ppcs >> (STARTING_POINT_SHIFT - 2 * (i + 1))) & 0b11]
+        bns = np.where(digit != 0, N_POINTS_AT_ITERATION[i] + 3 * (bns - 2) + digit - 1, bns)
+    return bns
+
+
+def get_birth_number_array_from_point_codes(pcs):
+    return get_birth_number_array_from_packed_codes(ppc.get_packed_code_array_from_point_codes(pcs))
+
+
+def get_iteration_born_array_from_birth_numbers(bns):
+    bns = np.asarray(bns, dtype=np.int64)
+    if (bns < 0).any() or (bns >= N_POINTS_AT_ITERATION[-1]).any():
+        raise ValueError("invalid birth numbers")
+    return np.searchsorted(N_POINTS_AT_ITERATION_ARRAY, bns, side="right")
+
+
+def get_packed_code_array_from_birth_numbers(bns, iterations):
+    # all the resulting packed codes have the same number of iterations
+    bns = np.asarray(bns, dtype=np.int64)
+    if (bns < 0).any() or (bns >= N_POINTS_AT_ITERATION[iterations]).any():
+        raise ValueError(f"birth numbers must be in [0, {N_POINTS_AT_ITERATION[iterations]}) for iteration {iterations}")
+
+    tails = np.zeros(bns.shape, dtype=np.int64)
+    # going from the last iteration backwards, each number is either a child born in that iteration or already existed
+    for i in range(iterations, 0, -1):
+        first_child = N_POINTS_AT_ITERATION[i - 1]
+        is_child = bns >= first_child
+        parent_offset, child_index = np.divmod(bns - first_child, 3)
+        tails |= np.where(is_child, DIGIT_TO_TAIL_BIT_PAIR[child_index + 1], 0) << (STARTING_POINT_SHIFT - 2 * i)
+        bns = np.where(is_child, 2 + parent_offset, bns)
+
+    return (bns << STARTING_POINT_SHIFT) | tails | iterations
+
+
+def get_point_code_array_from_birth_numbers(bns, iterations):
+    return ppc.get_point_code_array_from_packed_codes(get_packed_code_array_from_birth_numbers(bns, iterations))
+
+
+def get_birth_number_array_at_iteration(iterations):
+    # birth number of each point at this iteration, in canonical order (see GeneratePointCodes.get_all_packed_codes_at_iteration)
+    # useful for permuting arrays between the two orders
+    return get_birth_number_array_from_packed_codes(gpc.get_all_packed_codes_at_iteration(iterations))
@@ -0,0 +1,182 @@
+# bounding caps of watersheds: for a code, a cap (center xyz and angular radius) containing all of its descendants
+# at every deeper iteration, for pruning spatial queries (see RegionQueries) without looking at the descendants
+
+# two levels of detail:
+# - get_watershed_cap_radii: one radius per iteration, for a cap centered on the code's own point
+#   (which is at a corner of its watershed, so the cap is about twice as big as it needs to be), for any iteration
+# - bounding cap hierarchy: a center and radius for every code up to some depth, built once per placement method,
+#   centered in the middle of the watershed
+#   stored as flat arrays, the codes of iteration p being the block [offset(p), offset(p+1)) in canonical order
+
+# a hierarchy is built from the bottom: the caps at the deepest level are measured from descendants a few iterations
+# further down (plus the per-iteration radius at that iteration, which bounds everything below them),
+# and each parent's cap is the smallest one around the mean of its 4 children's centers that contains the children's caps
+
+
+import os
+import functools
+import numpy as np
+
+import icosalattice.CoordinatesOfPointCode as coords
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.Iterations as it
+from icosalattice.PackedPointCodes import MAX_ITERATIONS
+from icosalattice.DistancesOnSphere import convert_distance_3d_to_great_circle
+
+
+# iterations up to which watershed radii are measured from the points themselves; deeper ones are extrapolated
+WATERSHED_RADIUS_MEASURED_ITERATIONS = 5
+# how many iterations below each code to look when measuring its watershed's extent
+WATERSHED_RADIUS_LOOKAHEAD = 3
+# iterations of codes that have their own caps in the hierarchy by default
+DEFAULT_BOUNDING_CAP_DEPTH = 5
+
+
+def get_angle_between_unit_vectors(xyz1, xyz2):
+    d_3d = np.minimum(np.linalg.norm(xyz1 - xyz2, axis=-1), 2)
+    return convert_distance_3d_to_great_circle(d_3d)
+
+
+def get_first_child_canonical_indices(indices, iterations_to_add=1):
+    # canonical index of the code with iterations_to_add zeros appended (poles stay the same)
+    indices = np.asarray(indices, dtype=np.int64)
+    return np.where(indices < 2, indices, 2 + ((indices - 2) << (2 * iterations_to_add)))
+
+
+def get_ancestor_canonical_indices(indices, iterations_to_remove=1):
+    # canonical index of the code with its last iterations_to_remove digits dropped
+    indices = np.asarray(indices, dtype=np.int64)
+    return np.where(indices < 2, indices, 2 + ((indices - 2) >> (2 * iterations_to_remove)))
+
+
+def get_watershed_cap_radii(method=None):
+    # radius (angle in radians) of a cap around each code's point containing all of its descendants,
+    # for codes with p digits, indexed by p
+    # (the method is resolved before the cache, so changing CHOSEN_METHOD gives new radii)
+    method = coords.CHOSEN_METHOD if method is None else method
+    return _get_watershed_cap_radii(method)
+
+@functools.lru_cache(maxsize=None)
+def _get_watershed_cap_radii(method):
+    # measured: the farthest descendant WATERSHED_RADIUS_LOOKAHEAD iterations down, plus the radius at that iteration
+    # (every deeper descendant is within that of one of those)
+    # for deeper iterations, the radii are extrapolated, not measured: this assumes the watershed keeps halving in size
+    # with each iteration at worst as slowly as in the measured ones (c * 2**-p below), so past
+    # WATERSHED_RADIUS_MEASURED_ITERATIONS they are a heuristic bound, checked against measurements in the tests
+    f_xyz = coords.get_xyz_array_function(method)
+    m = WATERSHED_RADIUS_LOOKAHEAD
+    max_angles = []
+    for p in range(WATERSHED_RADIUS_MEASURED_ITERATIONS + 1):
+        descendants = np.arange(2, it.get_exact_n_points_from_iterations(p + m), dtype=np.int64)
+        ancestors = get_ancestor_canonical_indices(descendants, m)
+        ancestor_xyz = f_xyz(gpc.get_all_packed_codes_at_iteration(p))
+        descendant_xyz = f_xyz(gpc.get_packed_codes_from_canonical_indices(descendants, p + m))
+        max_angles.append(get_angle_between_unit_vectors(ancestor_xyz[ancestors], descendant_xyz).max())
+    max_angles = np.array(max_angles)
+
+    # bound for the rest of the watershed: radius(p) <= max_angles[p] + radius(p + m), with radius(q) <= c * 2**-q
+    c = (max_angles * 2.0 ** np.arange(len(max_angles))).max() / (1 - 2.0 ** -m)
+    p = np.arange(MAX_ITERATIONS + 1)
+    radii = c * 2.0 ** -p
+    radii[:len(max_angles)] = max_angles + c * 2.0 ** -(np.arange(len(max_angles)) + m)
+    # small margin for rounding in the placement methods (not for any error in the extrapolation)
+    return radii * 1.01 + 1e-12
+
+
+def get_bounding_cap_level_offsets(depth):
+    # where the block of each iteration 0 through depth starts in the flat arrays, and the total length at the end
+    n_points = [it.get_exact_n_points_from_iterations(p) for p in range(depth + 1)]
+    return np.concatenate([[0], np.cumsum(n_points)]).astype(np.int64)
+
+
+def _normalize(xyz):
+    return xyz / np.linalg.norm(xyz, axis=-1, keepdims=True)
+
+
+def build_bounding_caps(depth=DEFAULT_BOUNDING_CAP_DEPTH, method=None):
+    # returns (centers, radii) for all codes of iterations 0 through depth, shapes (M, 3) and (M,)
+    f_xyz = coords.get_xyz_array_function(method)
+    m = WATERSHED_RADIUS_LOOKAHEAD
+    offsets = get_bounding_cap_level_offsets(depth)
+    centers = np.zeros((offsets[-1], 3))
+    radii = np.zeros(offsets[-1])
+
+    # the poles have no descendants, so their caps are just their points
+    pole_xyz = f_xyz(gpc.get_packed_codes_from_canonical_indices(np.array([0, 1]), 0))
+    for p in range(depth + 1):
+        centers[offsets[p]:offsets[p] + 2] = pole_xyz
+
+    # the deepest level, from its descendants m iterations down, which are consecutive blocks of 4**m in canonical order
+    n_nodes = it.get_exact_n_points_from_iterations(depth) - 2
+    samples = f_xyz(gpc.get_all_packed_codes_at_iteration(depth + m, start=2)).reshape(n_nodes, 4**m, 3)
+    leaf_centers = _normalize(samples.mean(axis=1))
+    leaf_radii = get_angle_between_unit_vectors(samples, leaf_centers[:, None, :]).max(axis=1)
+    centers[offsets[depth] + 2:offsets[depth + 1]] = leaf_centers
+    radii[offsets[depth] + 2:offsets[depth + 1]] = leaf_radii + get_watershed_cap_radii(method)[depth + m]
+
+    # each level above from its children, which are also consecutive blocks of 4
+    for p in range(depth - 1, -1, -1):
+        n_nodes = it.get_exact_n_points_from_iterations(p) - 2
+        child_centers = centers[offsets[p + 1] + 2:offsets[p + 2]].reshape(n_nodes, 4, 3)
+        child_radii = radii[offsets[p + 1] + 2:offsets[p + 2]].reshape(n_nodes, 4)
+        parent_centers = _normalize(child_centers.mean(axis=1))
+        parent_radii = (get_angle_between_unit_vectors(child_centers, parent_centers[:, None, :]) + child_radii).max(axis=1)
+        centers[offsets[p] + 2:offsets[p + 1]] = parent_centers
+        radii[offsets[p] + 2:offsets[p + 1]] = parent_radii
+
+    return centers, radii
+
+
+def get_bounding_caps_of_canonical_indices(centers, radii, indices, iterations):
+    # the caps of these codes (canonical indices at this iteration, which must be at most the hierarchy's depth)
+    offsets = get_bounding_cap_level_offsets(iterations)
+    if offsets[-1] > len(radii):
+        raise ValueError(f"bounding cap hierarchy is not deep enough for iteration {iterations}")
+    flat_indices = offsets[iterations] + np.asarray(indices, dtype=np.int64)
+    return centers[flat_indices], radii[flat_indices]
+
+
+def get_angle_bounds_to_caps(centers, radii, xyz):
+    # the smallest and largest angles from xyz that any point in each cap can be at,
+    # e.g. for ruling out watersheds that can't contain a point nearer than one already found
+    d = get_angle_between_unit_vectors(centers, xyz)
+    return np.maximum(d - radii, 0), np.minimum(d + radii, np.pi)
+
+
+def get_bounding_cap_depth(radii):
+    depth = 0
+    while get_bounding_cap_level_offsets(depth)[-1] < len(radii):
+        depth += 1
+    return depth
+
+
+def save_bounding_caps(path, centers, radii):
+    np.savez(path, centers=centers, radii=radii)
+
+
+def load_bounding_caps(path):
+    with np.load(path) as f:
+        return f["centers"], f["radii"]
+
+
+def get_bounding_caps_cache_path(depth, method, cache_dir):
+    return os.path.join(cache_dir, f"bounding_caps_{method}_depth_{depth}.npz")
+
+
+def get_bounding_caps(depth=DEFAULT_BOUNDING_CAP_DEPTH, method=None, cache_dir=None):
+    # (centers, radii), kept in memory, and loaded from cache_dir if they have been built before
+    # (the method is resolved before the in-memory cache, so changing CHOSEN_METHOD gives new caps)
+    method = coords.CHOSEN_METHOD if method is None else method
+    return _get_bounding_caps(depth, method, cache_dir)
+
+@functools.lru_cache(maxsize=16)
+def _get_bounding_caps(depth, method, cache_dir):
+    if cache_dir is None:
+        return build_bounding_caps(depth, method)
+    path = get_bounding_caps_cache_path(depth, method, cache_dir)
+    if os.path.exists(path):
+        return load_bounding_caps(path)
+    centers, radii = build_bounding_caps(depth, method)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_bounding_caps(path, centers, radii)
+    return centers, radii
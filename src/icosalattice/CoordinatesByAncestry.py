@@ -1,9 +1,13 @@
 import numpy as np
 import functools
 
+import icosalattice.GeneratePointCodes as gpc
 import icosalattice.MapCoordinateMath as mcm
+import icosalattice.PackedPointCodes as ppc
 import icosalattice.StartingPoints as sp
 from icosalattice.Adjacency import get_adjacency_from_point_code
+from icosalattice.AdjacencyArrays import get_adjacency_array_from_packed_codes, ADJACENCY_DIRECTIONS, NO_NEIGHBOR
+from icosalattice.BirthNumbers import TAIL_BIT_PAIR_TO_DIGIT
 
 
 @functools.lru_cache(maxsize=100000)
@@ -82,4 +86,122 @@ def get_parents_from_point_code(pc):
     # old way
     # p0 = get_parent_from_point_code(pc)
     # p1 = get_directional_parent_from_point_code(pc)
-    # return [p0, p1]
\ No newline at end of file
+    # return [p0, p1]
+
+# ---- array versions ---- #
+# every point at iteration k is the normalized midpoint of its parent and directional parent at iteration k-1
+# (a point whose code ends in 0 has itself at iteration k-1 as both parents)
+# so a whole level can be computed from the previous level by gathering rows, with the same float operations as above
+
+
+def get_parents_array_from_packed_codes(ppcs):
+    # (par, dpar) arrays of packed codes with one fewer iteration, same as get_parents_from_point_code
+    # NO_NEIGHBOR for the starting points, which have no parents
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    n = ppcs & ppc.ITERATION_MASK
+    has_parents = n > 0
+    last_digit_bits = np.where(has_parents, (ppcs >> (ppc.STARTING_POINT_SHIFT - 2 * n)) & 0b11, 0)
+    child_index = TAIL_BIT_PAIR_TO_DIGIT[last_digit_bits]
+
+    # the tail is left-aligned, so dropping a trailing 0 is just decrementing the iteration bits
+    drop_last_digit = lambda x: (x & ~ppc.ITERATION_MASK) | ((x & ppc.ITERATION_MASK) - 1)
+    par = np.where(has_parents, drop_last_digit(ppcs), NO_NEIGHBOR)
+    dpar = par.copy()
+
+    is_child = child_index != 0
+    if is_child.any():
+        adj = get_adjacency_array_from_packed_codes(ppcs[is_child])
+        ci = child_index[is_child]
+        rows = np.arange(len(ci))
+        par_here = adj[rows, ADJACENCY_DIRECTIONS.index(-1) + ci - 1]  # direction -ci
+        dpar_here = adj[rows, ci - 1]  # direction ci
+        assert (par_here & ppc.ITERATION_MASK != 0).all() and (dpar_here != NO_NEIGHBOR).all()
+        par[is_child] = drop_last_digit(par_here)
+        dpar[is_child] = drop_last_digit(dpar_here)
+    return par, dpar
+
+
+def get_xyz_array_of_initial_points():
+    # in order of sp.STARTING_POINT_CODES, which is also canonical order at iteration 0
+    return np.array([get_xyz_of_initial_point_code(pc) for pc in sp.STARTING_POINT_CODES], dtype=float)
+
+
+def get_xyz_array_of_children_from_parent_xyz_arrays(xyz0, xyz1):
+    # same as mcm.get_unit_sphere_midpoint_from_xyz, on (N, 3) arrays
+    m_raw = (xyz0 + xyz1) / 2
+    mag = np.sqrt(m_raw[:, 0] * m_raw[:, 0] + m_raw[:, 1] * m_raw[:, 1] + m_raw[:, 2] * m_raw[:, 2])
+    return m_raw / mag[:, None]
+
+
+def iterate_xyz_arrays_by_level_using_ancestry(iterations):
+    # yields (k, xyz array of all points at iteration k in canonical order) for k from 0 to iterations
+    xyz = get_xyz_array_of_initial_points()
+    yield 0, xyz
+    for k in range(1, iterations + 1):
+        par, dpar = get_parents_array_from_packed_codes(gpc.get_all_packed_codes_at_iteration(k))
+        par_indices = gpc.get_canonical_indices_from_packed_codes(par)
+        dpar_indices = gpc.get_canonical_indices_from_packed_codes(dpar)
+        xyz = get_xyz_array_of_children_from_parent_xyz_arrays(xyz[par_indices], xyz[dpar_indices])
+        yield k, xyz
+
+
+def get_xyz_array_at_iteration_using_ancestry(iterations):
+    # xyz of all points at this iteration in canonical order (see GeneratePointCodes.get_all_packed_codes_at_iteration)
+    for k, xyz in iterate_xyz_arrays_by_level_using_ancestry(iterations):
+        pass
+    return xyz
+
+
+# for sparse sets of points at mixed iterations, only compute the ancestors that are actually needed
+# (the union of all their parents, parents' parents, etc.), still one level at a time
+# each ancestor is computed once no matter how many of the points share it
+# codes with trailing zeros are separate nodes from their shorter versions (e.g. C10 is the midpoint of C1 with itself),
+# so that the results are the same as get_xyz_from_point_code_using_ancestry
+
+
+def get_ancestor_closure_by_level(ppcs):
+    # list indexed by iteration k of (nodes, par, dpar):
+    # the sorted unique packed codes at iteration k that are needed, and their parents at iteration k-1
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    n = ppcs & ppc.ITERATION_MASK
+    max_n = int(n.max()) if len(ppcs) > 0 else 0
+
+    levels = [None] * (max_n + 1)
+    needed_from_children = np.zeros(0, dtype=np.int64)
+    for k in range(max_n, -1, -1):
+        nodes = np.unique(np.concatenate([ppcs[n == k], needed_from_children]))
+        if k == 0:
+            levels[k] = (nodes, None, None)
+        else:
+            par, dpar = get_parents_array_from_packed_codes(nodes)
+            levels[k] = (nodes, par, dpar)
+            needed_from_children = np.concatenate([par, dpar])
+    return levels
+
+
+def get_xyz_array_from_packed_codes_using_ancestry(ppcs):
+    # (N, 3) array aligned with ppcs
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    levels = get_ancestor_closure_by_level(ppcs)
+
+    xyz_by_level = [None] * len(levels)
+    initial_xyz = get_xyz_array_of_initial_points()
+    nodes, _, _ = levels[0]
+    xyz_by_level[0] = initial_xyz[nodes >> ppc.STARTING_POINT_SHIFT]
+    for k in range(1, len(levels)):
+        nodes, par, dpar = levels[k]
+        prev_nodes = levels[k - 1][0]
+        prev_xyz = xyz_by_level[k - 1]
+        xyz_by_level[k] = get_xyz_array_of_children_from_parent_xyz_arrays(prev_xyz[np.searchsorted(prev_nodes, par)], prev_xyz[np.searchsorted(prev_nodes, dpar)])
+
+    res = np.zeros((len(ppcs), 3), dtype=float)
+    n = ppcs & ppc.ITERATION_MASK
+    for k, (nodes, _, _) in enumerate(levels):
+        mask = n == k
+        if mask.any():
+            res[mask] = xyz_by_level[k][np.searchsorted(nodes, ppcs[mask])]
+    return res
+
+
+def get_xyz_array_from_point_codes_using_ancestry(pcs):
+    return get_xyz_array_from_packed_codes_using_ancestry(ppc.get_packed_code_array_from_point_codes(pcs))
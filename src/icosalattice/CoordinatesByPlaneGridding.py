@@ -1,6 +1,7 @@
 import icosalattice.PeelCoordinates as pe
 import icosalattice.FacePlaneDistortion as distort
-from icosalattice.TriangularPeelCoordinates import adjust_ld_using_lp_transformation_in_triangle_coordinates
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.TriangularPeelCoordinates import adjust_ld_using_lp_transformation_in_triangle_coordinates, adjust_ld_arrays_using_lp_transformation_in_triangle_coordinates
 
 
 def get_xyz_from_point_code_using_corrected_plane_gridding(pc, as_array=True):
@@ -15,3 +16,32 @@ def get_xyz_from_point_code_using_uncorrected_plane_gridding(pc, as_array=True):
     # don't move the l and d coordinates, take them as-is from the point code
     sld = pe.get_raw_peel_coordinates_from_point_code(pc)
     return pe.get_xyz_from_adjusted_peel_coordinates(sld, as_array=as_array)
+
+
+# ---- array versions ---- #
+# take (starting point indices, l, d) arrays of raw peel coordinates, or packed point codes, and return (N, 3) xyz arrays
+
+
+def get_xyz_array_from_raw_peel_coordinates_using_corrected_plane_gridding(spc_indices, l_raw, d_raw):
+    l_modified, d_modified = adjust_ld_arrays_using_lp_transformation_in_triangle_coordinates(l_raw, d_raw)
+    return pe.get_xyz_array_from_adjusted_peel_coordinate_arrays(spc_indices, l_modified, d_modified)
+
+
+def get_xyz_array_from_raw_peel_coordinates_using_uncorrected_plane_gridding(spc_indices, l_raw, d_raw):
+    return pe.get_xyz_array_from_adjusted_peel_coordinate_arrays(spc_indices, l_raw, d_raw)
+
+
+def get_xyz_array_from_packed_codes_using_corrected_plane_gridding(ppcs):
+    return get_xyz_array_from_raw_peel_coordinates_using_corrected_plane_gridding(*pe.get_raw_peel_coordinate_arrays_from_packed_codes(ppcs))
+
+
+def get_xyz_array_from_packed_codes_using_uncorrected_plane_gridding(ppcs):
+    return get_xyz_array_from_raw_peel_coordinates_using_uncorrected_plane_gridding(*pe.get_raw_peel_coordinate_arrays_from_packed_codes(ppcs))
+
+
+def get_xyz_array_from_point_codes_using_corrected_plane_gridding(pcs):
+    return get_xyz_array_from_packed_codes_using_corrected_plane_gridding(ppc.get_packed_code_array_from_point_codes(pcs))
+
+
+def get_xyz_array_from_point_codes_using_uncorrected_plane_gridding(pcs):
+    return get_xyz_array_from_packed_codes_using_uncorrected_plane_gridding(ppc.get_packed_code_array_from_point_codes(pcs))
@@ -3,8 +3,9 @@ import numpy as np
 
 import icosalattice.PeelCoordinates as pe
 from icosalattice.FacePlaneDistortion import ALPHA, B, G, GAMMA, H, W
-from icosalattice.MathUtil import zigzag, zigzag_inverse, mod, round_off_unwanted_float_precision
+from icosalattice.MathUtil import zigzag, zigzag_inverse, mod, round_off_unwanted_float_precision, zigzag_array, zigzag_inverse_array
 import icosalattice.StartingPoints as sp
+import icosalattice.PackedPointCodes as ppc
 from icosalattice.CoordinatesByAncestry import get_xyz_of_initial_point_code
 
 
@@ -159,6 +160,68 @@ def transform_ld_by_r_theta_adjustment(l, d):
 
 
 
+# ---- array versions ---- #
+# same steps as above on (N,) arrays, with the d > l flip done by swapping columns under a mask
+
+
+def transform_ld_arrays_by_r_theta_adjustment(l, d):
+    # same as transform_ld_by_r_theta_adjustment, for l >= d
+    rho_max = 2/3 * B
+    rho_min = 1/3 * B
+    j_max = W/2
+    lq = lambda x: 1/2 * (1 + R5) * np.tan(1/2 * x * ALPHA)
+    f_rho_max_for_theta = lambda theta: rho_min / np.cos(theta)
+    f_rho_2 = lambda rho: G * np.tan(GAMMA * rho / rho_max)
+    f_j_2 = lambda theta: j_max * lq(rho_min * np.tan(theta) / j_max)
+
+    x = x_C + (l * DXL + d * DXD)
+    y = y_C + (l * DYL + d * DYD)
+
+    rho = (x**2 + y**2)**0.5
+    theta_from_AC = np.atan2(y, x) - np.pi/6
+    theta = zigzag_array(np.mod(theta_from_AC, 2*np.pi), a=np.pi/3)
+    theta_2 = np.atan(f_j_2(theta) / rho_min)
+    theta_new = zigzag_inverse_array(theta_2, a=np.pi/3, n=np.floor(theta_from_AC / (np.pi/3)))
+    rho_new = f_rho_2(rho) * f_rho_max_for_theta(theta_2) / f_rho_2(f_rho_max_for_theta(theta))
+    if (rho_new < -1e-9).any() or (rho_new > rho_max + 1e-9).any():
+        raise ValueError(f"expected 0 <= rho_new <= {rho_max:f}")
+
+    dx_new = rho_new * np.cos(theta_new + np.pi/6) - x_C
+    dy_new = rho_new * np.sin(theta_new + np.pi/6) - y_C
+    l_new = dx_new * DLX + dy_new * DLY
+    d_new = dx_new * DDX + dy_new * DDY
+
+    # same as the zeroing done by round_off_unwanted_float_precision (the rest of its rounding is below 1e-12)
+    l_new = np.where(np.abs(l_new) < 1e-12, 0.0, l_new)
+    d_new = np.where(np.abs(d_new) < 1e-12, 0.0, d_new)
+    return l_new, d_new
+
+
+def get_xyz_array_from_raw_peel_coordinates_using_r_theta_adjustment(spc_indices, l, d):
+    l = np.asarray(l, dtype=float)
+    d = np.asarray(d, dtype=float)
+    flipped = d > l
+    l_wlog = np.where(flipped, d, l)
+    d_wlog = np.where(flipped, l, d)
+    l_new_wlog, d_new_wlog = transform_ld_arrays_by_r_theta_adjustment(l_wlog, d_wlog)
+    l_new = np.where(flipped, d_new_wlog, l_new_wlog)
+    d_new = np.where(flipped, l_new_wlog, d_new_wlog)
+
+    # starting points don't move
+    at_starting_point = (l == 0) & (d == 0)
+    l_new[at_starting_point] = 0.0
+    d_new[at_starting_point] = 0.0
+    return pe.get_xyz_array_from_adjusted_peel_coordinate_arrays(spc_indices, l_new, d_new)
+
+
+def get_xyz_array_from_packed_codes_using_r_theta_adjustment(ppcs):
+    return get_xyz_array_from_raw_peel_coordinates_using_r_theta_adjustment(*pe.get_raw_peel_coordinate_arrays_from_packed_codes(ppcs))
+
+
+def get_xyz_array_from_point_codes_using_r_theta_adjustment(pcs):
+    return get_xyz_array_from_packed_codes_using_r_theta_adjustment(ppc.get_packed_code_array_from_point_codes(pcs))
+
+
 if __name__ == "__main__":
     for pc in [
         "C", "C1", "C2", "C11", "C01", "C22", "C02",
@@ -24,9 +24,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
-from icosalattice.CoordinatesByAncestry import get_xyz_from_point_code_using_ancestry
+from icosalattice.CoordinatesByAncestry import get_xyz_from_point_code_using_ancestry, get_xyz_array_from_packed_codes_using_ancestry
 from icosalattice.CoordinatesByPlaneGridding import get_xyz_from_point_code_using_corrected_plane_gridding, get_xyz_from_point_code_using_uncorrected_plane_gridding
-from icosalattice.CoordinatesByRThetaAdjustment import get_xyz_from_point_code_using_r_theta_adjustment
+from icosalattice.CoordinatesByPlaneGridding import get_xyz_array_from_packed_codes_using_corrected_plane_gridding, get_xyz_array_from_packed_codes_using_uncorrected_plane_gridding
+from icosalattice.CoordinatesByRThetaAdjustment import get_xyz_from_point_code_using_r_theta_adjustment, get_xyz_array_from_packed_codes_using_r_theta_adjustment
+import icosalattice.PackedPointCodes as ppc
 from icosalattice.GeneratePointCodes import get_all_point_codes_from_ancestor_at_iteration, get_all_point_codes_at_iteration
 import icosalattice.PeelCoordinates as pe
 import icosalattice.FacePlaneDistortion as distort
@@ -34,7 +36,6 @@ import icosalattice.PlotPointLocations as ppl
 from icosalattice.Adjacency import get_adjacency_from_point_code
 import icosalattice.MapCoordinateMath as mcm
 from icosalattice.PlotPaths import plot_distances_and_angles_2d, plot_distances_and_angles_3d
-from icosalattice.PointPaths import get_point_path, get_stepwise_path_distances_and_angles_2d, get_stepwise_path_distances_and_angles_3d
 
 
 
@@ -44,6 +45,12 @@ METHOD_NAME_TO_FUNCTION_POINT_CODE_TO_XYZ = {
     "cpg1": get_xyz_from_point_code_using_corrected_plane_gridding,  # "corrected plane gridding"
     "rta1": get_xyz_from_point_code_using_r_theta_adjustment,  # "r-theta adjustment"
 }
+METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY = {
+    "ebs1": get_xyz_array_from_packed_codes_using_ancestry,
+    "upg1": get_xyz_array_from_packed_codes_using_uncorrected_plane_gridding,
+    "cpg1": get_xyz_array_from_packed_codes_using_corrected_plane_gridding,
+    "rta1": get_xyz_array_from_packed_codes_using_r_theta_adjustment,
+}
 CHOSEN_METHOD = "cpg1"
 
 
@@ -52,6 +59,21 @@ def get_xyz_from_point_code(pc, as_array=True):
     return f(pc, as_array=as_array)
 
 
+def get_xyz_array_from_packed_codes(ppcs):
+    # (N, 3) array, same values as get_xyz_from_point_code on each point
+    f = METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY[CHOSEN_METHOD]
+    return f(ppcs)
+
+
+def get_xyz_array_from_point_codes(pcs):
+    return get_xyz_array_from_packed_codes(ppc.get_packed_code_array_from_point_codes(pcs))
+
+
+def get_xyz_array_function(method=None):
+    method = CHOSEN_METHOD if method is None else method
+    return METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY[method]
+
+
 def get_latlon_from_point_code(pc, as_array=True):
     xyz = get_xyz_from_point_code(pc)
     latlon = mcm.unit_vector_cartesian_to_latlon(*xyz, as_array=as_array)
@@ -80,6 +102,8 @@ def get_stats_about_point_placements(pc_to_xyz):
 
 
 if __name__ == "__main__":
+    # PointPaths uses get_xyz_array_function from here, so it is only imported for this demo
+    from icosalattice.PointPaths import get_point_path, get_stepwise_path_distances_and_angles_2d, get_stepwise_path_distances_and_angles_3d
     pcs = ["A", "B"]
     for spc in ["C", "E", "G", "I", "K"]:
         pcs += get_all_point_codes_from_ancestor_at_iteration(ancestor_pc=spc, iterations=6)
@@ -1,3 +1,6 @@
+import numpy as np
+
+import icosalattice.PackedPointCodes as ppc
 import icosalattice.StartingPoints as sp
 import icosalattice.MapCoordinateMath as mcm
 import icosalattice.PointCodeArithmetic as pca
@@ -158,4 +161,55 @@ def get_faces_of_point_code(pc):
 
 
 def select_point_codes_on_face(pcs, face_name):
-    return [pc for pc in pcs if face_name in get_faces_of_point_code(pc)]
+    if len(pcs) == 0:
+        return []
+    on_face = packed_codes_are_on_face(ppc.get_packed_code_array_from_point_codes(pcs), face_name)
+    return [pc for pc, x in zip(pcs, on_face) if x]
+
+
+# ---- faces of packed code arrays ---- #
+# within the watershed of a starting point (0 <= l, d < 2**n in the half-peel square),
+# which faces a point is on only depends on where it is relative to the square's corner and diagonal:
+# the starting point itself, the d == 0 edge (direction 1), the l == 0 edge (direction 3),
+# the diagonal l == d (direction 2), the triangle l > d (the "up" face), or the triangle l < d (the "down" face)
+# so a table of faces for each starting point and position classifies whole arrays of codes
+
+VERTEX, EDGE_1, EDGE_3, DIAGONAL, UP_TRIANGLE, DOWN_TRIANGLE = range(6)
+# a code in each position, to look up its faces with get_faces_of_point_code
+POSITION_REPRESENTATIVE_DIGITS = ["", "1", "3", "2", "21", "23"]
+
+
+def _get_face_membership_table():
+    # (starting point, position, face) -> whether points there are on the face
+    table = np.zeros((len(sp.STARTING_POINT_CODES), len(POSITION_REPRESENTATIVE_DIGITS), len(FACE_NAMES)), dtype=bool)
+    for i, spc in enumerate(sp.STARTING_POINT_CODES):
+        for position, digits in enumerate(POSITION_REPRESENTATIVE_DIGITS):
+            # poles have no children, so every point under them is the pole itself
+            pc = spc if spc in sp.POLES else spc + digits
+            for face_name in get_faces_of_point_code(pc):
+                table[i, position, FACE_NAMES.index(face_name)] = True
+    return table
+
+
+FACE_MEMBERSHIP_TABLE = _get_face_membership_table()
+
+
+def get_positions_in_watershed_from_packed_codes(ppcs):
+    spc_indices, l, d, n = ppc.unpack_l_and_d_array(ppcs)
+    return np.select(
+        [(l == 0) & (d == 0), d == 0, l == 0, l == d, l > d],
+        [VERTEX, EDGE_1, EDGE_3, DIAGONAL, UP_TRIANGLE],
+        default=DOWN_TRIANGLE,
+    )
+
+
+def get_face_membership_array_from_packed_codes(ppcs):
+    # (N, 20) bool array of whether each point is on each face in FACE_NAMES
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    return FACE_MEMBERSHIP_TABLE[ppcs >> ppc.STARTING_POINT_SHIFT, get_positions_in_watershed_from_packed_codes(ppcs)]
+
+
+def packed_codes_are_on_face(ppcs, face_name):
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    position = get_positions_in_watershed_from_packed_codes(ppcs)
+    return FACE_MEMBERSHIP_TABLE[ppcs >> ppc.STARTING_POINT_SHIFT, position, FACE_NAMES.index(face_name)]
@@ -1,99 +1,97 @@
 import random
-from functools import reduce
+import numpy as np
 
 import icosalattice.Iterations as it
+import icosalattice.PackedPointCodes as ppc
 import icosalattice.PointCodeArithmetic as pca
 import icosalattice.StartingPoints as sp
-from icosalattice.Faces import FACE_NAMES, get_directionality_of_face, select_point_codes_on_face
+from icosalattice.Faces import FACE_NAMES, get_directionality_of_face
 
 
 
 def get_descendants_of_point_code_using_directions(ancestor_pc, directions, iterations, with_trailing_zeros=True):
-    its_of_ancestor = it.get_iteration_number_from_point_code(ancestor_pc)
-    if iterations < its_of_ancestor:
-        raise ValueError(f"{ancestor_pc = } already has {its_of_ancestor} iterations, so cannot get descendants with only {iterations} iterations")
-    
-    iterations_needed = iterations - its_of_ancestor
-    pcs = [ancestor_pc]
-    for i in range(iterations_needed):
-        pcs = reduce(lambda x,y: x+y, [[pc + x for x in directions] for pc in pcs])
+    ppcs = get_descendant_packed_codes(ancestor_pc, iterations, directions=directions)
     if not with_trailing_zeros:
-        pcs = [pca.strip_trailing_zeros(pc) for pc in pcs]
-    assert len(pcs) == len(set(pcs)), "shouldn't have had duplicates"
-    return pcs
+        ppcs = ppc.strip_trailing_zeros_from_packed_codes(ppcs)
+    return ppc.get_point_code_array_from_packed_codes(ppcs).tolist()
 
 
 def get_all_point_codes_from_ancestor_at_iteration(ancestor_pc, iterations, with_trailing_zeros=True):
-    if ancestor_pc in ["A", "B"]:
-        if with_trailing_zeros:
-            pc = ancestor_pc + "0" * iterations
-        else:
-            pc = ancestor_pc
-        return [pc]
     return get_descendants_of_point_code_using_directions(ancestor_pc, "0123", iterations=iterations, with_trailing_zeros=with_trailing_zeros)
 
 
 def get_all_point_codes_on_face_at_iteration(face_name, iterations, with_edges=True, with_trailing_zeros=True):
-    directionality = get_directionality_of_face(face_name)
-    p0, p1, p2, p3 = face_name
+    ppcs = get_packed_codes_on_face_at_iteration(face_name, iterations, with_edges=with_edges)
+    if not with_trailing_zeros:
+        ppcs = ppc.strip_trailing_zeros_from_packed_codes(ppcs)
+    return ppc.get_point_code_array_from_packed_codes(ppcs).tolist()
 
-    # start off with getting the normal ancestors of the point code which are on this face
-    # we are going to throw away half of them, which can be optimized out later if needed
-    pcs = get_all_point_codes_from_ancestor_at_iteration(ancestor_pc=p0, iterations=iterations, with_trailing_zeros=with_trailing_zeros)
-    pcs = select_point_codes_on_face(pcs, face_name)
+
+def get_packed_codes_on_face_at_iteration(face_name, iterations, with_edges=True):
+    # the points of the face in the watershed of its first starting point, in canonical order,
+    # and then (if with_edges) its far vertex and far edge, which are in the watersheds of other starting points
+    p0 = face_name[0]
+    digits = _get_base_four_digits_of_triangle(iterations, get_directionality_of_face(face_name))
+    spc_indices = np.full(len(digits), ppc.STARTING_POINT_INDEX[p0], dtype=np.int64)
+    ppcs = ppc.pack_array(spc_indices, ppc.get_tail_from_base_four_digits(digits), np.full(len(digits), iterations, dtype=np.int64))
 
     if with_edges:
-        # add missing edges and vertices
-        ring = sp.get_starting_point_ring_from_point_code(p0)
-        if ring == "northern_ring":
-            if directionality == "up":
-                # e.g. CAKX
-                # CA and CK are included in 1 and 2 directions from C
-                # missing A, K, and KA (K+1)
-                assert p1 == "A"
-                missing_lone_vertex = p1  # A
-                missing_edge_apc = p2  # K
-                missing_edge_directions = "01"  # from K to A
-            else:  # directionality == "down"
-                # e.g. CXKL
-                # CK and CL are included in 2 and 3 directions from C
-                # missing K, L, and LK (L+1)
-                missing_lone_vertex = p2  # K
-                missing_edge_apc = p3  # L
-                missing_edge_directions = "01"  # from L to K
-        elif ring == "southern_ring":
-            if directionality == "up":
-                # e.g. DCLX
-                # DC and DL are included in 1 and 2 directions from D
-                # missing C, L, and CL (C+3)
-                missing_lone_vertex = p2  # L
-                missing_edge_apc = p1  # C
-                missing_edge_directions = "03"  # from C to L
-            else:  # directionality == "down"
-                # e.g. DXLB
-                # DL and DB are included in 2 and 3 directions from D
-                # missing L, B, and LB (L+3)
-                assert p3 == "B"
-                missing_lone_vertex = p3  # B
-                missing_edge_apc = p2  # L
-                missing_edge_directions = "03"  # from L to B
+        missing_lone_vertex, missing_edge_apc, missing_edge_directions = _get_missing_vertex_and_edge_of_face(face_name)
+        vertex_ppc = ppc.get_packed_code_from_point_code(pca.pad_with_trailing_zeros(missing_lone_vertex, iterations=iterations))
+        edge_ppcs = get_descendant_packed_codes(missing_edge_apc, iterations, directions=missing_edge_directions)
+        ppcs = np.concatenate([ppcs, [vertex_ppc], edge_ppcs])
+    return ppcs
+
+
+def _get_base_four_digits_of_triangle(iterations, directionality):
+    # tails (read as base-4 numbers) of the points with l >= d ("up") or d >= l ("down") in the half-peel square, in order
+    # the quarters of the square are digit 0 and 2 (triangles like the whole one) and digits 1 (l > d) and 3 (d > l),
+    # so the triangle with k digits is built from the one with k - 1: 0 + triangle, 1 + square, 2 + triangle (up)
+    # or 0 + triangle, 2 + triangle, 3 + square (down)
+    res = np.zeros(1, dtype=np.int64)
+    for k in range(1, iterations + 1):
+        quarter = 4 ** (k - 1)
+        square = np.arange(quarter, dtype=np.int64)
+        if directionality == "up":
+            res = np.concatenate([res, quarter + square, 2 * quarter + res])
         else:
-            raise ValueError(f"invalid {ring = }")
-        
-        edge_pcs = []
-        if with_trailing_zeros:
-            missing_lone_vertex = pca.pad_with_trailing_zeros(missing_lone_vertex, iterations=iterations)
-        edge_pcs.append(missing_lone_vertex)
-        
-        edge_pcs += get_descendants_of_point_code_using_directions(ancestor_pc=missing_edge_apc, directions=missing_edge_directions, iterations=iterations, with_trailing_zeros=with_trailing_zeros)
-        pcs += edge_pcs
-    
-    if not with_trailing_zeros:
-        pcs = [pca.strip_trailing_zeros(pc) for pc in pcs]
-    assert len(pcs) == len(set(pcs)), "shouldn't have had duplicates"
-    return pcs
+            res = np.concatenate([res, 2 * quarter + res, 3 * quarter + square])
+    return res
 
 
+def _get_missing_vertex_and_edge_of_face(face_name):
+    # the face's vertex and edge that are not in the watershed of its first starting point
+    # returns (lone vertex, ancestor of the edge, directions from that ancestor along the edge)
+    directionality = get_directionality_of_face(face_name)
+    p0, p1, p2, p3 = face_name
+    ring = sp.get_starting_point_ring_from_point_code(p0)
+    if ring == "northern_ring":
+        if directionality == "up":
+            # e.g. CAKX
+            # CA and CK are included in 1 and 2 directions from C
+            # missing A, K, and KA (K+1)
+            assert p1 == "A"
+            return p1, p2, "01"  # A, then K to A
+        else:  # directionality == "down"
+            # e.g. CXKL
+            # CK and CL are included in 2 and 3 directions from C
+            # missing K, L, and LK (L+1)
+            return p2, p3, "01"  # K, then L to K
+    elif ring == "southern_ring":
+        if directionality == "up":
+            # e.g. DCLX
+            # DC and DL are included in 1 and 2 directions from D
+            # missing C, L, and CL (C+3)
+            return p2, p1, "03"  # L, then C to L
+        else:  # directionality == "down"
+            # e.g. DXLB
+            # DL and DB are included in 2 and 3 directions from D
+            # missing L, B, and LB (L+3)
+            assert p3 == "B"
+            return p3, p2, "03"  # B, then L to B
+    else:
+        raise ValueError(f"invalid {ring = }")
+
 
 def get_all_point_codes_at_iteration(iterations, with_trailing_zeros=True):
     pcs = []
@@ -102,6 +100,112 @@ def get_all_point_codes_at_iteration(iterations, with_trailing_zeros=True):
     return pcs
 
 
+# canonical order of the points at an iteration is the order of get_all_point_codes_at_iteration (with trailing zeros):
+# A, B, then the descendants of each of C through L, each block in order of the tail read as a base-4 number
+# so the canonical index of a point is a closed-form function of its code and can be computed for whole arrays
+
+
+def get_all_packed_codes_at_iteration(iterations, start=0, stop=None):
+    # packed codes in canonical order, optionally only the slice [start, stop) of that order
+    n_points = it.get_exact_n_points_from_iterations(iterations)
+    stop = n_points if stop is None else min(stop, n_points)
+    indices = np.arange(start, stop, dtype=np.int64)
+    return get_packed_codes_from_canonical_indices(indices, iterations)
+
+
+def get_packed_codes_from_canonical_indices(indices, iterations):
+    indices = np.asarray(indices, dtype=np.int64)
+    n_points = it.get_exact_n_points_from_iterations(iterations)
+    if np.any(indices < 0) or np.any(indices >= n_points):
+        raise ValueError(f"canonical indices must be in [0, {n_points}) at iteration {iterations}")
+    is_pole = indices < 2
+    rest, v = np.divmod(np.maximum(indices - 2, 0), 4 ** iterations)
+    spc_indices = np.where(is_pole, indices, 2 + rest)
+    tails = np.where(is_pole, 0, ppc.get_tail_from_base_four_digits(v))
+    return ppc.pack_array(spc_indices, tails, np.full(len(indices), iterations, dtype=np.int64))
+
+
+def get_canonical_indices_from_packed_codes(ppcs):
+    # each code's own number of iterations is used, so mixing codes from different iterations gives indices in different orders
+    spc_indices, tails, n = ppc.unpack_array(ppcs)
+    v = ppc.get_base_four_digits_from_tail(tails)
+    return np.where(spc_indices < 2, spc_indices, 2 + (spc_indices - 2) * (1 << (2 * n)) + v)
+
+
+# ---- descendants of a code at a given iteration ---- #
+# the descendants of ancestor_pc using only some of the digits (directions) are ordered like the strings
+# ancestor_pc + d1 + d2 + ... with each d taken in the order given in directions,
+# so the i-th one has the digits of i written in base len(directions), and any slice of them can be made directly
+# with all four digits, this is canonical order, and the descendants are one range of canonical indices
+# poles have no children, so their only descendant is themselves (with trailing zeros)
+
+
+def _get_descendant_parameters(ancestor_pc, iterations, directions):
+    ancestor_ppc = ppc.get_packed_code_from_point_code(ancestor_pc)
+    n = ancestor_ppc & ppc.ITERATION_MASK
+    if iterations < n:
+        raise ValueError(f"{ancestor_pc = } already has {n} iterations, so cannot get descendants with only {iterations} iterations")
+    if len(set(directions)) != len(directions) or not set(directions) <= set("0123"):
+        raise ValueError(f"directions must be distinct digits from 0123, got {directions!r}")
+    k = iterations - n
+    if ancestor_pc[0] in sp.POLES:
+        # only the trailing zeros
+        directions = "0" if k == 0 or "0" in directions else ""
+        n_descendants = len(directions)
+    else:
+        n_descendants = len(directions) ** k
+    return ancestor_ppc, n, k, directions, n_descendants
+
+
+def get_n_descendants(ancestor_pc, iterations, directions="0123"):
+    return _get_descendant_parameters(ancestor_pc, iterations, directions)[-1]
+
+
+def get_descendant_canonical_index_range(ancestor_pc, iterations):
+    # range of the canonical indices at this iteration of all descendants of ancestor_pc
+    ancestor_ppc, n, k, directions, n_descendants = _get_descendant_parameters(ancestor_pc, iterations, "0123")
+    first = int(get_canonical_indices_from_packed_codes([(ancestor_ppc & ~ppc.ITERATION_MASK) | iterations])[0])
+    return range(first, first + n_descendants)
+
+
+def get_descendant_packed_codes(ancestor_pc, iterations, directions="0123", start=0, stop=None):
+    # packed codes of the descendants of ancestor_pc at this iteration in the order described above,
+    # optionally only the slice [start, stop) of that order
+    ancestor_ppc, n, k, directions, n_descendants = _get_descendant_parameters(ancestor_pc, iterations, directions)
+    stop = n_descendants if stop is None else min(stop, n_descendants)
+    if directions == "0123":
+        r = get_descendant_canonical_index_range(ancestor_pc, iterations)
+        return get_packed_codes_from_canonical_indices(np.arange(r.start + start, r.start + max(stop, start), dtype=np.int64), iterations)
+
+    i = np.arange(start, max(stop, start), dtype=np.int64)
+    res = np.full(len(i), (ancestor_ppc & ~ppc.ITERATION_MASK) | iterations, dtype=np.int64)
+    if len(directions) == 0 or k == 0:
+        return res
+    digit_bits = np.array([int(x.translate(ppc.DIGIT_TO_TAIL_BITS)) for x in directions], dtype=np.int64)
+    base = len(directions)
+    # the last digit added changes fastest
+    for j in range(k, 0, -1):
+        i, digit_index = np.divmod(i, base)
+        res |= digit_bits[digit_index] << (ppc.STARTING_POINT_SHIFT - 2 * (n + j))
+    return res
+
+
+def iterate_descendant_packed_codes(ancestor_pc, iterations, directions="0123", chunk_size=2**20):
+    # the same codes as get_descendant_packed_codes, as arrays of at most chunk_size at a time
+    n_descendants = get_n_descendants(ancestor_pc, iterations, directions)
+    for chunk_start in range(0, n_descendants, chunk_size):
+        yield get_descendant_packed_codes(ancestor_pc, iterations, directions, start=chunk_start, stop=chunk_start + chunk_size)
+
+
+def iterate_descendant_point_codes(ancestor_pc, iterations, directions="0123", with_trailing_zeros=True, chunk_size=2**16):
+    # one string at a time, converting a chunk at a time
+    for ppcs in iterate_descendant_packed_codes(ancestor_pc, iterations, directions, chunk_size=chunk_size):
+        if not with_trailing_zeros:
+            ppcs = ppc.strip_trailing_zeros_from_packed_codes(ppcs)
+        yield from ppc.get_point_code_array_from_packed_codes(ppcs).tolist()
+
+
+
 def get_random_point_code(min_iterations, expected_iterations, max_iterations, prefix=""):
     assert min_iterations <= expected_iterations <= max_iterations
     
@@ -0,0 +1,162 @@
+# big-endian ordering of points, where all the descendants of a point code form one contiguous range
+# (unlike prefix lookup numbers, which are little-endian, so descendants are congruent mod something but scattered)
+
+# the hierarchical key of a point is its canonical index at MAX_ITERATIONS (see GeneratePointCodes),
+# i.e. A=0, B=1, then 2 + (starting point - 2) * 4**MAX_ITERATIONS + the code's digits read as a base-4 number,
+# padded with trailing zeros out to MAX_ITERATIONS digits
+# - a point has the same key at every iteration (trailing zeros don't change it)
+# - sorting by key is the canonical order at every iteration
+# - the descendants of a code with p digits are the keys [key, key + 4**(MAX_ITERATIONS - p))
+# - the canonical index at iteration n is the key with the last MAX_ITERATIONS - n digits dropped
+
+# so a table of points sorted by key can be filtered to a watershed with two binary searches,
+# and the points under a code at a given iteration are just a range of canonical indices
+
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.PackedPointCodes import MAX_ITERATIONS, ITERATION_MASK
+
+
+def get_hierarchical_key_array_from_packed_codes(ppcs):
+    # the tail is left-aligned, so padding with trailing zeros is just changing the iteration bits
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    return gpc.get_canonical_indices_from_packed_codes((ppcs & ~ITERATION_MASK) | MAX_ITERATIONS)
+
+
+def get_hierarchical_key_array_from_point_codes(pcs):
+    return get_hierarchical_key_array_from_packed_codes(ppc.get_packed_code_array_from_point_codes(pcs))
+
+
+def get_hierarchical_key_from_point_code(pc):
+    return int(get_hierarchical_key_array_from_point_codes([pc])[0])
+
+
+def get_packed_code_array_from_hierarchical_keys(keys, iterations):
+    ppcs = gpc.get_packed_codes_from_canonical_indices(keys, MAX_ITERATIONS)
+    too_deep = (ppcs & ~ITERATION_MASK) & ((1 << (ppc.STARTING_POINT_SHIFT - 2 * iterations)) - 1) != 0
+    if too_deep.any():
+        raise ValueError(f"some hierarchical keys are for points that don't exist at iteration {iterations}")
+    return (ppcs & ~ITERATION_MASK) | iterations
+
+
+def get_point_code_array_from_hierarchical_keys(keys, iterations):
+    return ppc.get_point_code_array_from_packed_codes(get_packed_code_array_from_hierarchical_keys(keys, iterations))
+
+
+def get_canonical_indices_from_hierarchical_keys(keys, iterations):
+    # keys of points that don't exist yet at this iteration are rounded down to the previous point in canonical order
+    keys = np.asarray(keys, dtype=np.int64)
+    return np.where(keys < 2, keys, 2 + ((keys - 2) >> (2 * (MAX_ITERATIONS - iterations))))
+
+
+def get_descendant_key_range(pc):
+    # half-open range [lo, hi) of hierarchical keys of all descendants of pc (including itself), at any iteration
+    lo = get_hierarchical_key_from_point_code(pc)
+    if lo < 2:
+        # poles have no children
+        return lo, lo + 1
+    n = len(pc) - 1
+    return lo, lo + (1 << (2 * (MAX_ITERATIONS - n)))
+
+
+def descendant_range(pc, iteration):
+    # half-open range [lo, hi) of canonical indices at this iteration of all descendants of pc
+    r = gpc.get_descendant_canonical_index_range(pc, iteration)
+    return r.start, r.stop
+
+
+def point_is_descendant(ppcs, ancestor_pc):
+    # for packed codes (an int or array), whether each is ancestor_pc or one of its descendants
+    # codes with fewer iterations than the ancestor can still be descendants, if the ancestor has trailing zeros
+    lo, hi = get_descendant_key_range(ancestor_pc)
+    keys = get_hierarchical_key_array_from_packed_codes(np.atleast_1d(ppcs))
+    res = (keys >= lo) & (keys < hi)
+    return res if np.ndim(ppcs) > 0 else bool(res[0])
+
+
+def get_descendant_slice_in_sorted_keys(sorted_keys, pc):
+    # the slice of sorted_keys (sorted ascending) that holds descendants of pc
+    lo, hi = get_descendant_key_range(pc)
+    start, stop = np.searchsorted(sorted_keys, [lo, hi], side="left")
+    return slice(int(start), int(stop))
+
+
+def get_descendant_slices_in_sorted_keys(sorted_keys, pcs):
+    # starts and stops of the slices of sorted_keys holding the descendants of each of pcs
+    ranges = np.array([get_descendant_key_range(pc) for pc in pcs], dtype=np.int64).reshape(-1, 2)
+    starts = np.searchsorted(sorted_keys, ranges[:, 0], side="left")
+    stops = np.searchsorted(sorted_keys, ranges[:, 1], side="left")
+    return starts, stops
+
+
+# ---- sets of canonical indices as sorted half-open ranges [starts[i], stops[i]) ---- #
+# the descendants of a code at a given iteration are one range (see descendant_range),
+# so regions made of whole subtrees are stored as a few ranges instead of one entry per point
+
+
+def merge_index_ranges(starts, stops):
+    # sort the ranges and join any that overlap or touch, dropping empty ones
+    starts = np.asarray(starts, dtype=np.int64)
+    stops = np.asarray(stops, dtype=np.int64)
+    nonempty = stops > starts
+    starts = starts[nonempty]
+    stops = stops[nonempty]
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    stops = stops[order]
+    if len(starts) == 0:
+        return starts, stops
+    max_stop_so_far = np.maximum.accumulate(stops)
+    # a new merged range begins wherever a start is past everything before it
+    is_new = np.concatenate([[True], starts[1:] > max_stop_so_far[:-1]])
+    group_ends = np.concatenate([np.flatnonzero(is_new)[1:], [len(starts)]]) - 1
+    return starts[is_new], max_stop_so_far[group_ends]
+
+
+def get_indices_from_index_ranges(starts, stops):
+    starts = np.asarray(starts, dtype=np.int64)
+    stops = np.asarray(stops, dtype=np.int64)
+    lengths = stops - starts
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return np.arange(lengths.sum(), dtype=np.int64) + offsets
+
+
+def get_mask_from_index_ranges(starts, stops, n_points):
+    # boolean array of length n_points, True in the ranges
+    changes = np.zeros(n_points + 1, dtype=np.int64)
+    np.add.at(changes, np.asarray(starts, dtype=np.int64), 1)
+    np.add.at(changes, np.asarray(stops, dtype=np.int64), -1)
+    return np.cumsum(changes[:-1]) > 0
+
+
+def get_index_ranges_from_mask(mask):
+    mask = np.asarray(mask, dtype=bool)
+    edges = np.diff(np.concatenate([[False], mask, [False]]).astype(np.int8))
+    return np.flatnonzero(edges == 1).astype(np.int64), np.flatnonzero(edges == -1).astype(np.int64)
+
+
+def get_first_keys_of_canonical_indices(indices, iterations):
+    # the key of each point, which is also where the keys of its descendants start
+    # (the index one past the last point gives the key one past the last key)
+    indices = np.asarray(indices, dtype=np.int64)
+    return np.where(indices < 2, indices, 2 + ((indices - 2) << (2 * (MAX_ITERATIONS - iterations))))
+
+
+def get_key_ranges_from_index_ranges(starts, stops, iterations):
+    # ranges of keys of the points in ranges of canonical indices at this iteration, with all of their descendants
+    return get_first_keys_of_canonical_indices(starts, iterations), get_first_keys_of_canonical_indices(stops, iterations)
+
+
+def get_index_ranges_from_key_ranges(starts, stops, iterations):
+    # ranges of canonical indices at this iteration of the points whose keys are in the key ranges
+    # (rounding up, since a key range can start partway through the descendants of a point)
+    def round_up(keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        shift = 2 * (MAX_ITERATIONS - iterations)
+        return np.where(keys < 2, keys, 2 + ((keys - 2 + (1 << shift) - 1) >> shift))
+    starts, stops = round_up(starts), round_up(stops)
+    nonempty = stops > starts
+    return starts[nonempty], stops[nonempty]
@@ -966,6 +966,7 @@ def get_nearest_neighbor_xyz_to_xyz(xyz, candidates_xyz):
     return nn_xyz, min_d
 
 
+# superseded by SpatialIndex.LatticePointIndex, which builds the KDTree once and returns arrays
 def get_nearest_neighbors_ln_to_ln_with_distance(query_lns, candidate_lns, xyzg, k_neighbors=1, allow_self=False):
     if len(candidate_lns) == 0:
         # there is no point querying because there are no neighbors
@@ -1097,6 +1098,7 @@ def is_in_latlon_rectangle(lat, lon, min_lat, max_lat, min_lon, max_lon):
     return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
 
 
+# superseded by RegionQueries.points_in_latlon_rectangle, which only looks at watersheds on the boundary
 def get_usps_in_latlon_rectangle(min_lat, max_lat, min_lon, max_lon, iterations):
     print(f"getting usps in latlon rectangle for {iterations} iterations. this function is very inefficient")
     g = get_usp_generator(iterations)
@@ -1233,6 +1235,7 @@ def plot_directional_parent_graph(iteration):
     plt.show()
 
 
+# superseded by RegionGrowing.get_region_around_point_by_spreading, which keeps only the last two rings
 def get_region_around_point_code_by_spreading(center_pc, max_distance_gc_normalized, xyzg, resolution_iterations=None, allow_trailing_zeros=False):
     # follow adjacency paths at this iteration resolution until you get every point within the radius
     # measure distance to center_pc, but can spread from a nearby point if needed to fit lower resolution
@@ -1310,6 +1313,7 @@ def get_region_around_point_code_by_narrowing(pc, max_distance_gc_normalized, na
     return res
 
 
+# superseded by GeneratePointCodes.get_descendant_packed_codes (and iterate_descendant_point_codes for strings)
 def get_descendants_of_point_code(pc, max_iterations):
     starting_iteration = get_iteration_number_from_point_code(pc)
     if max_iterations < starting_iteration:
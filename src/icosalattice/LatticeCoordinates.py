@@ -0,0 +1,198 @@
+# integer lattice coordinates of a point: (spc, l, d, n)
+# spc is the starting point whose half-peel square the point is in, n is the number of iterations,
+# and l and d are its n-bit peel coordinates in that square (0 to 2**n - 1), which are the bit planes of the code's tail
+# (a "1" digit is an l bit, "3" is a d bit, "2" is both), so converting to and from codes is just interleaving bits
+
+# moving in a direction is adding (dl, dd) to (l, d): 1 = (1, 0), 2 = (1, 1), 3 = (0, 1) and the negatives
+# when that leaves the square, SEAM_TABLE says which square it lands in and how the coordinates map there
+# (from the CD peel's perspective; other peels are the same thing moved over), which is where the refraction across
+# the CA and DB edges and the reversed polarity of the K-A and L-B edges live; the poles are reached by landing
+# on l = 2**n in a northern square or d = 2**n in a southern one
+# the results are the same as the original case analysis on strings in add_direction_to_point_code
+# (checked in tests against its stored results, tests/point_code_arithmetic_results.txt)
+
+
+import collections
+import numpy as np
+
+import icosalattice.PackedPointCodes as ppc
+import icosalattice.StartingPoints as sp
+from icosalattice.PackedPointCodes import C_INDEX, N_PEELS, DIRECTION_TO_LD_OFFSET
+
+
+LatticeCoordinates = collections.namedtuple("LatticeCoordinates", ["spc", "l", "d", "n"])
+
+# in each peel, the northern square (C-like) has parity 0 and the southern square (D-like) has parity 1
+# a starting point is a pentagon, missing one direction: -3 for the northern ones and -1 for the southern ones
+PENTAGON_MISSING_DIRECTION = {0: -3, 1: -1}
+
+# (parity, l side, d side) -> (peel offset, new parity, new l, new d)
+# where a side is -1 if the stepped coordinate is -1, 1 if it is 2**n, and 0 if it is still in the square,
+# and new l and new d are coefficients (of size, 1, l, d) for the stepped coordinates l and d, e.g. (1, -1, 0, 0) is size - 1
+SEAM_TABLE = {
+    # C: A/K edge, L edge, D edge, E edge (refraction across CA)
+    (0, 1, 0): (-1, 0, (1, 0, 0, -1), (0, 0, 0, 0)),  # K (size - d, 0), or A if d = 0
+    (0, 0, 1): (-1, 1, (0, 0, 1, 0), (0, 0, 0, 0)),  # L (l, 0)
+    (0, 1, 1): (-1, 0, (0, 0, 0, 0), (0, 0, 0, 0)),  # K itself
+    (0, -1, 0): (0, 1, (1, -1, 0, 0), (0, 0, 0, 1)),  # D (top, d)
+    (0, 0, -1): (1, 0, (1, -1, 0, 0), (1, -1, -1, 0)),  # E (top, top - l)
+    (0, -1, -1): (1, 0, (1, -1, 0, 0), (1, -1, 0, 0)),  # E (top, top)
+    # D: C edge, L/B edge, F edge (refraction across DB), E edge
+    (1, 1, 0): (0, 0, (0, 0, 0, 0), (0, 0, 0, 1)),  # C (0, d)
+    (1, 0, 1): (-1, 1, (0, 0, 0, 0), (1, 0, -1, 0)),  # L (0, size - l), or B if l = 0
+    (1, 1, 1): (-1, 1, (0, 0, 0, 0), (0, 0, 0, 0)),  # L itself
+    (1, -1, 0): (1, 1, (1, -1, 0, -1), (1, -1, 0, 0)),  # F (top - d, top)
+    (1, 0, -1): (1, 0, (0, 0, 1, 0), (1, -1, 0, 0)),  # E (l, top)
+    (1, -1, -1): (1, 1, (1, -1, 0, 0), (1, -1, 0, 0)),  # F (top, top)
+}
+
+
+def _apply_coefficients(coefficients, size, l, d):
+    a_size, a_one, a_l, a_d = coefficients
+    return a_size * size + a_one + a_l * l + a_d * d
+
+
+# ---- conversion ---- #
+
+
+def get_lattice_coordinates_from_packed_code(p):
+    spc_index, tail, n = ppc.unpack(p)
+    l, d = ppc.get_l_and_d_from_tail(tail)
+    return LatticeCoordinates(sp.STARTING_POINT_CODES[spc_index], int(l), int(d), n)
+
+
+def get_packed_code_from_lattice_coordinates(coords):
+    spc, l, d, n = coords
+    return ppc.pack(ppc.STARTING_POINT_INDEX[spc], int(ppc.get_tail_from_l_and_d(l, d)), n)
+
+
+def get_lattice_coordinates_from_point_code(pc):
+    return get_lattice_coordinates_from_packed_code(ppc.get_packed_code_from_point_code(pc))
+
+
+def get_point_code_from_lattice_coordinates(coords):
+    return ppc.get_point_code_from_packed_code(get_packed_code_from_lattice_coordinates(coords))
+
+
+# ---- moving ---- #
+
+
+def add_direction_to_lattice_coordinates(coords, x):
+    # the neighbor in direction x, or None if there isn't one (the pentagons' missing directions, and any direction from a pole)
+    if x not in DIRECTION_TO_LD_OFFSET:
+        raise ValueError(f"invalid direction {x!r}")
+    spc, l, d, n = coords
+    h = ppc.STARTING_POINT_INDEX[spc]
+    if h < C_INDEX:
+        # directions from poles are ill-defined
+        return None
+    peel, parity = divmod(h - C_INDEX, 2)
+    if l == 0 and d == 0 and x == PENTAGON_MISSING_DIRECTION[parity]:
+        return None
+
+    size = 1 << n
+    dl, dd = DIRECTION_TO_LD_OFFSET[x]
+    l += dl
+    d += dd
+    l_side = -1 if l < 0 else 1 if l == size else 0
+    d_side = -1 if d < 0 else 1 if d == size else 0
+    if l_side != 0 or d_side != 0:
+        peel_offset, parity, l_coefficients, d_coefficients = SEAM_TABLE[(parity, l_side, d_side)]
+        peel = (peel + peel_offset) % N_PEELS
+        l, d = _apply_coefficients(l_coefficients, size, l, d), _apply_coefficients(d_coefficients, size, l, d)
+        if l == size:
+            return LatticeCoordinates(sp.NORTH_POLE, 0, 0, n)
+        if d == size:
+            return LatticeCoordinates(sp.SOUTH_POLE, 0, 0, n)
+    return LatticeCoordinates(sp.STARTING_POINT_CODES[C_INDEX + 2 * peel + parity], l, d, n)
+
+
+def add_direction_to_packed_code_using_lattice_coordinates(p, x):
+    res = add_direction_to_lattice_coordinates(get_lattice_coordinates_from_packed_code(p), x)
+    return None if res is None else get_packed_code_from_lattice_coordinates(res)
+
+
+# ---- moving many steps ---- #
+# a line of points in one direction (each step in the current point's own frame, like repeated add_direction_to_point_code)
+# is a straight run of l and/or d in each square it passes through, so it's handled a run at a time
+# rather than a step at a time, with a seam crossing between runs
+
+
+def _get_steps_to_leave_square(l, d, size, dl, dd):
+    steps = []
+    if dl != 0:
+        steps.append(size - l if dl > 0 else l + 1)
+    if dd != 0:
+        steps.append(size - d if dd > 0 else d + 1)
+    return min(steps)
+
+
+def iterate_line_runs(coords, x, n_points=None):
+    # the line of points in direction x starting at coords, as runs within one square: yields (first point, number of points)
+    # stops after n_points points (or never, if None), or when the line runs into a pole or a pentagon's missing direction
+    coords = LatticeCoordinates(*coords)
+    dl, dd = DIRECTION_TO_LD_OFFSET[x]
+    while n_points is None or n_points > 0:
+        spc, l, d, n = coords
+        if spc in sp.POLES:
+            # directions from poles are ill-defined, so the line ends here
+            yield coords, 1
+            return
+        length = _get_steps_to_leave_square(l, d, 1 << n, dl, dd)
+        if n_points is not None:
+            length = min(length, n_points)
+            n_points -= length
+        yield coords, length
+        last = LatticeCoordinates(spc, l + (length - 1) * dl, d + (length - 1) * dd, n)
+        coords = add_direction_to_lattice_coordinates(last, x)
+        if coords is None:
+            return
+
+
+def add_steps_to_lattice_coordinates(coords, x, k):
+    # k steps in direction x at once (None if the line ends first), one seam crossing at a time
+    # lines that come back to where they were (e.g. around the equator) are cut down to k mod the loop length
+    if k < 0:
+        raise ValueError(f"number of steps must be non-negative, got {k}")
+    coords = LatticeCoordinates(*coords)
+    dl, dd = DIRECTION_TO_LD_OFFSET[x]
+    steps_left_when_seen = {}
+    while k > 0:
+        spc, l, d, n = coords
+        if spc in sp.POLES:
+            return None
+        if coords in steps_left_when_seen:
+            k %= steps_left_when_seen[coords] - k
+            steps_left_when_seen = {}
+            if k == 0:
+                break
+        steps_left_when_seen[coords] = k
+        length = _get_steps_to_leave_square(l, d, 1 << n, dl, dd)
+        if k < length:
+            return LatticeCoordinates(spc, l + k * dl, d + k * dd, n)
+        coords = add_direction_to_lattice_coordinates(LatticeCoordinates(spc, l + (length - 1) * dl, d + (length - 1) * dd, n), x)
+        k -= length
+        if coords is None:
+            return None
+    return coords
+
+
+def add_steps_to_packed_code(p, x, k):
+    res = add_steps_to_lattice_coordinates(get_lattice_coordinates_from_packed_code(p), x, k)
+    return None if res is None else get_packed_code_from_lattice_coordinates(res)
+
+
+def add_direction(pc, x, k=1):
+    # pc moved k steps in direction x, or None if the line ends before then
+    res = add_steps_to_lattice_coordinates(get_lattice_coordinates_from_point_code(pc), x, k)
+    return None if res is None else get_point_code_from_lattice_coordinates(res)
+
+
+def get_line_packed_codes(p, x, n_steps):
+    # packed codes of the line from p through n_steps steps in direction x (fewer if the line ends first), starting with p
+    dl, dd = DIRECTION_TO_LD_OFFSET[x]
+    parts = []
+    for (spc, l, d, n), length in iterate_line_runs(get_lattice_coordinates_from_packed_code(p), x, n_points=n_steps + 1):
+        steps = np.arange(length, dtype=np.int64)
+        parts.append(ppc.pack_l_and_d_array(np.full(length, ppc.STARTING_POINT_INDEX[spc]), l + dl * steps, d + dd * steps, np.full(length, n)))
+    return np.concatenate(parts)
@@ -0,0 +1,385 @@
+# the points within k steps of a point (its k-ring) and at exactly k steps (its hex ring), for single points and arrays
+
+# away from the pentagons and the seams, a point's neighborhood is the regular triangular lattice in its half-peel square,
+# where the points at distance k are the hexagon of (l, d) offsets at hex distance k
+# (with directions 1 = (1, 0), 2 = (1, 1), 3 = (0, 1), that is max(|dl|, |dd|) if they have the same sign, else |dl| + |dd|),
+# so those rings are just the point's (l, d) plus fixed offsets
+# points whose k-ring would leave their square (and the poles) fall back to breadth-first search
+# over the neighbors, which also takes care of the pentagons, since each one is at the corner of a square
+
+# rings are sorted by packed code, and array versions have one row per point padded at the end with NO_NEIGHBOR
+# (a ring has at most 6k points, fewer around a pentagon)
+
+# the hop distance (number of steps) between two points is the hex distance in the same way, in the flat chart that
+# the squares along a chain of seams unfold into (the seams are all rotations and translations of the lattice),
+# taking the shortest over the chains from one point's square to the other's that a shortest path in the chart stays inside,
+# so that no search is needed (the pentagons are at the squares' corners, where the seams meet)
+
+
+import functools
+import numpy as np
+
+import icosalattice.LatticeCoordinates as lc
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.AdjacencyArrays import get_neighbor_array_from_packed_codes, NO_NEIGHBOR
+from icosalattice.PackedPointCodes import C_INDEX, N_PEELS, DIRECTION_TO_LD_OFFSET
+
+
+def get_hex_distance_from_ld_offsets(dl, dd):
+    dl = np.asarray(dl)
+    dd = np.asarray(dd)
+    same_sign = (dl >= 0) == (dd >= 0)
+    return np.where(same_sign, np.maximum(np.abs(dl), np.abs(dd)), np.abs(dl) + np.abs(dd))
+
+
+def get_max_hex_ring_size(k):
+    return 1 if k == 0 else 6 * k
+
+
+def get_max_k_ring_size(k):
+    return 1 + 3 * k * (k + 1)
+
+
+@functools.lru_cache(maxsize=64)
+def get_hex_ring_ld_offsets(k):
+    # (6k, 2) offsets of the points at hex distance k, going around from k steps in direction -2
+    if k == 0:
+        res = np.zeros((1, 2), dtype=np.int64)
+    else:
+        sides = []
+        corner = np.array([-k, -k])
+        steps = np.arange(k)[:, None]
+        for dl, dd in DIRECTION_TO_LD_OFFSET.values():
+            sides.append(corner + steps * [dl, dd])
+            corner = corner + k * np.array([dl, dd])
+        res = np.concatenate(sides).astype(np.int64)
+    res.flags.writeable = False
+    return res
+
+
+def _has_regular_neighborhood(ppcs, k):
+    # whether each point's k-ring is inside its own square, so it is the regular hexagon
+    # (the square's pentagon can only be on the ring, at its corner, which doesn't make a shortcut)
+    h, l, d, n = ppc.unpack_l_and_d_array(ppcs)
+    top = np.left_shift(1, n, dtype=np.int64) - 1
+    return (h >= C_INDEX) & (l >= k) & (d >= k) & (l + k <= top) & (d + k <= top)
+
+
+def _get_regular_hex_rings(ppcs, k):
+    h, l, d, n = ppc.unpack_l_and_d_array(ppcs)
+    offsets = get_hex_ring_ld_offsets(k)
+    rings = ppc.pack_l_and_d_array(h[:, None], l[:, None] + offsets[:, 0], d[:, None] + offsets[:, 1], n[:, None])
+    return np.sort(rings, axis=1)
+
+
+def _get_search_key_shift(iterations):
+    # at one iteration, p >> (STARTING_POINT_SHIFT - 2n) is the starting point and tail in 4 + 2n bits,
+    # so a (row, packed code) pair can be searched on as the single integer row << (4 + 2n) | that
+    return 4 + 2 * iterations
+
+
+def _get_sorted_unique(keys):
+    # np.unique can hash integers instead of sorting, which is very slow for keys like these, with mostly-zero low bits
+    keys = np.sort(keys)
+    is_new = np.ones(len(keys), dtype=bool)
+    is_new[1:] = keys[1:] != keys[:-1]
+    return keys[is_new]
+
+
+def _get_packed_codes_of_search_keys(keys, iterations):
+    shift = _get_search_key_shift(iterations)
+    return ((keys & ((1 << shift) - 1)) << (ppc.STARTING_POINT_SHIFT - 2 * iterations)) | iterations
+
+
+def _get_search_keys(rows, ppcs, iterations):
+    return (np.asarray(rows, dtype=np.int64) << _get_search_key_shift(iterations)) | (ppcs >> (ppc.STARTING_POINT_SHIFT - 2 * iterations))
+
+
+def _keys_are_in(keys, sorted_keys):
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[positions] == keys
+
+
+def _get_next_ring_keys(ring, previous_ring, iterations):
+    # the ring after this one (all as sorted keys), from the neighbors that aren't in this ring or the one before it
+    shift = _get_search_key_shift(iterations)
+    # many rows can reach the same points, so each point's neighbors are only computed once
+    codes, inverse = np.unique(_get_packed_codes_of_search_keys(ring, iterations), return_inverse=True)
+    neighbors = get_neighbor_array_from_packed_codes(codes)[inverse]
+    exists = neighbors != NO_NEIGHBOR
+    rows = np.broadcast_to((ring >> shift)[:, None], neighbors.shape)[exists]
+    candidates = _get_sorted_unique(_get_search_keys(rows, neighbors[exists], iterations))
+    seen = np.sort(np.concatenate([previous_ring, ring]))
+    return candidates[~_keys_are_in(candidates, seen)]
+
+
+def _iterate_hex_rings_by_search(ppcs, k, iterations):
+    # yields each ring from 0 to k as sorted keys (see _get_search_key_shift) of the points' rows and packed codes,
+    # keeping only the current ring and the one before it (as in RegionGrowing)
+    ring = _get_search_keys(np.arange(len(ppcs)), ppcs, iterations)
+    previous_ring = ring[:0]
+    yield ring
+    for _ in range(k):
+        previous_ring, ring = ring, _get_next_ring_keys(ring, previous_ring, iterations)
+        yield ring
+
+
+def _get_rings_by_search(ppcs, k, width, only_last_ring):
+    # (N, width) rings (or k-rings) padded with NO_NEIGHBOR, searched a group of points at a time,
+    # with each group at one iteration and few enough points for the keys to fit
+    res = np.full((len(ppcs), width), NO_NEIGHBOR, dtype=np.int64)
+    _, _, n = ppc.unpack_array(ppcs)
+    for iterations in np.unique(n):
+        rows = np.flatnonzero(n == iterations)
+        shift = _get_search_key_shift(int(iterations))
+        max_rows = 1 << (63 - shift)
+        for start in range(0, len(rows), max_rows):
+            group = rows[start:start + max_rows]
+            rings = list(_iterate_hex_rings_by_search(ppcs[group], k, int(iterations)))
+            keys = rings[-1] if only_last_ring else np.concatenate(rings)
+            key_rows = keys >> shift
+            # stable sort by row keeps the rings in order within each row
+            order = np.argsort(key_rows, kind="stable")
+            keys = keys[order]
+            key_rows = key_rows[order]
+            starts = np.searchsorted(key_rows, np.arange(len(group)))
+            res[group[key_rows], np.arange(len(keys)) - starts[key_rows]] = _get_packed_codes_of_search_keys(keys, int(iterations))
+    return res
+
+
+def get_hex_ring_array_from_packed_codes(ppcs, k):
+    # (N, 6k) packed codes of the points exactly k steps from each point
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    if k < 0:
+        raise ValueError(f"k must be non-negative, got {k}")
+    res = np.full((len(ppcs), get_max_hex_ring_size(k)), NO_NEIGHBOR, dtype=np.int64)
+    regular = _has_regular_neighborhood(ppcs, k)
+    res[regular] = _get_regular_hex_rings(ppcs[regular], k)
+    res[~regular] = _get_rings_by_search(ppcs[~regular], k, res.shape[1], only_last_ring=True)
+    return res
+
+
+def get_k_ring_array_from_packed_codes(ppcs, k):
+    # (N, 1 + 3k(k+1)) packed codes of the points within k steps of each point, ring by ring (each ring sorted),
+    # with the point itself first
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    if k < 0:
+        raise ValueError(f"k must be non-negative, got {k}")
+    res = np.full((len(ppcs), get_max_k_ring_size(k)), NO_NEIGHBOR, dtype=np.int64)
+    regular = _has_regular_neighborhood(ppcs, k)
+    res[regular] = np.concatenate([_get_regular_hex_rings(ppcs[regular], j) for j in range(k + 1)], axis=1)
+    res[~regular] = _get_rings_by_search(ppcs[~regular], k, res.shape[1], only_last_ring=False)
+    return res
+
+
+def _trim(row):
+    return ppc.get_point_code_array_from_packed_codes(row[row != NO_NEIGHBOR])
+
+
+def hex_ring(pc, k):
+    # point codes exactly k steps from pc
+    return _trim(get_hex_ring_array_from_packed_codes([ppc.get_packed_code_from_point_code(pc)], k)[0])
+
+
+def k_ring(pc, k):
+    # point codes within k steps of pc, ring by ring, starting with pc
+    return _trim(get_k_ring_array_from_packed_codes([ppc.get_packed_code_from_point_code(pc)], k)[0])
+
+
+# ---- hop distance ---- #
+
+
+# each seam in LatticeCoordinates.SEAM_TABLE is a lattice isometry: the next square's (l, d) are the stepped coordinates
+# turned by a multiple of 60 degrees (ROTATE_60 turns direction 1 into 2, 2 into 3, and so on) plus a multiple of 2**n,
+# so the squares along any chain of seams unfold into one flat chart in the first square's (l, d)
+ROTATE_60 = np.array([[1, -1], [1, 0]], dtype=np.int64)
+SQUARE_SIDES = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+
+# the edge on each side of a square, as its two corners in units of 2**n
+SIDE_TO_EDGE = {(1, 0): ((1, 0), (1, 1)), (0, 1): ((0, 1), (1, 1)), (-1, 0): ((0, 0), (0, 1)), (0, -1): ((0, 0), (1, 0))}
+
+# the pairs of adjacent directions bounding each sixth of the plane, going around from direction 1
+SECTOR_DIRECTIONS = [(1, 2), (2, 3), (3, -1), (-1, -2), (-2, -3), (-3, 1)]
+
+# chains of up to this many seams give the hop distance between any two points; there's no bound derived for this,
+# it's the least that matches breadth-first search everywhere tried (all pairs up to iteration 4, and in tests,
+# all pairs at iteration 2 and from sampled sources at iterations 3 and 5), where 4 seams already misses some pairs
+MAX_SEAMS_IN_CHART = 5
+
+# how many of a pair's charts to check for a shortest path at a time, nearest first
+CHAINS_TRIED_AT_ONCE = 8
+
+
+def _get_rotation(k):
+    return np.linalg.matrix_power(ROTATE_60, k % 6)
+
+
+@functools.cache
+def _get_seam_isometries():
+    # (parity, side) -> (peel offset, new parity, k, offset) where the next square's (l, d) are
+    # _get_rotation(k) @ (l, d) + offset * 2**n for (l, d) past that side of the square
+    # read off the seam table along a row of stepped points, at a size big enough to keep clear of the corners
+    size = 16
+    res = {}
+    for parity in (0, 1):
+        for side in SQUARE_SIDES:
+            peel_offset, new_parity, l_coefficients, d_coefficients = lc.SEAM_TABLE[(parity, *side)]
+            stepped = np.array([{-1: -1, 0: size // 2, 1: size}[s] for s in side])
+            along = np.array([1 - abs(side[0]), 1 - abs(side[1])])
+            step = lambda x: np.array([lc._apply_coefficients(l_coefficients, size, *x), lc._apply_coefficients(d_coefficients, size, *x)])
+            k = next(k for k in range(6) if (_get_rotation(k) @ along == step(stepped + along) - step(stepped)).all())
+            offset = step(stepped) - _get_rotation(k) @ stepped
+            assert (offset % size == 0).all(), offset
+            res[(parity, side)] = (peel_offset, new_parity, k, offset // size)
+    return res
+
+
+@functools.cache
+def _get_square_chains():
+    # (parity of the first square, peel offset of the last, parity of the last) -> (rotations, offsets, edges)
+    # for the c chains of at most MAX_SEAMS_IN_CHART seams between them that don't come back to a square,
+    # where the last square's (l, d) go into the first one's chart as rotations[i] @ (l, d) + offsets[i] * 2**n,
+    # and edges is a (c, m, 2, 2) array of the seams crossed, each as its two ends in the chart in units of 2**n,
+    # with shorter chains padded by repeating their last seam (which doesn't change where a path can get to)
+    # every peel looks the same from its own squares, so the chains from C and D do for all of them
+    isometries = _get_seam_isometries()
+    chains = {(parity, peel_offset, last_parity): [] for parity in (0, 1) for peel_offset in range(N_PEELS) for last_parity in (0, 1)}
+    for parity in (0, 1):
+        stack = [([(0, parity)], 0, np.zeros(2, dtype=np.int64), [])]
+        while stack:
+            squares, k, offset, edges = stack.pop()
+            chains[(parity, *squares[-1])].append((k, offset, edges))
+            if len(edges) == MAX_SEAMS_IN_CHART:
+                continue
+            rotation = _get_rotation(k)
+            peel, square_parity = squares[-1]
+            for side in SQUARE_SIDES:
+                peel_offset, new_parity, seam_k, seam_offset = isometries[(square_parity, side)]
+                square = ((peel + peel_offset) % N_PEELS, new_parity)
+                if square in squares:
+                    continue
+                edge = [rotation @ corner + offset for corner in SIDE_TO_EDGE[side]]
+                # undo the seam to bring the next square's (l, d) into the current square's, then into the chart
+                inverse_rotation = _get_rotation(-seam_k)
+                stack.append((squares + [square], (k - seam_k) % 6, offset - rotation @ inverse_rotation @ seam_offset, edges + [edge]))
+    res = {}
+    for key, group in chains.items():
+        n_seams = max(len(edges) for k, offset, edges in group)
+        rotations = np.array([_get_rotation(k) for k, offset, edges in group], dtype=np.int64)
+        offsets = np.array([offset for k, offset, edges in group], dtype=np.int64)
+        edges = np.array([edges + edges[-1:] * (n_seams - len(edges)) for k, offset, edges in group], dtype=np.int64).reshape(len(group), n_seams, 2, 2)
+        res[key] = (rotations, offsets, edges)
+    return res
+
+
+def _get_squares_for_hop_distance(h, l, d, size):
+    # square index (h - C_INDEX) and (l, d) in it, with each pole at a corner of a square
+    # (the north pole is C's (size, 0), the south pole is D's (0, size))
+    north = h == ppc.NORTH_POLE_INDEX
+    south = h == ppc.SOUTH_POLE_INDEX
+    squares = np.where(north, 0, np.where(south, 1, h - C_INDEX))
+    l = np.where(north, size, l)
+    d = np.where(south, size, d)
+    return squares, l, d
+
+
+# inverse of the matrix with each sector's two directions as its columns,
+# which turns an offset in the sector into the number of steps in each of those two directions
+SECTOR_INVERSES = np.array([np.round(np.linalg.inv(np.array([DIRECTION_TO_LD_OFFSET[a], DIRECTION_TO_LD_OFFSET[b]]).T)) for a, b in SECTOR_DIRECTIONS], dtype=np.int64)
+
+
+def _get_sector_inverses(dl, dd):
+    sector = np.select([(dl >= dd) & (dd >= 0), (dd >= dl) & (dl >= 0), (dl <= 0) & (dd >= 0), (dl <= dd) & (dd <= 0), (dd <= dl) & (dl <= 0)], [0, 1, 2, 3, 4], 5)
+    return SECTOR_INVERSES[sector]
+
+
+def _has_shortest_path_in_chain(dl, dd, edges, l1, d1, size):
+    # whether one of the shortest paths in the chart from (l1, d1) to (l1 + dl, d1 + dd) stays in the chain of squares
+    # whose seams are edges (N, m, 2, 2), i.e. one that only steps in the sector's two directions;
+    # writing points as steps (s, t) in those directions from the start, the points on each seam that such a path
+    # can get to are an interval of the edge, and the points that can be reached from an interval (an edge goes along
+    # one of the six directions) are those with s >= min_s, t >= min_t, s + t >= min_sum over its two ends;
+    # each square is convex, so any of those in the next square's far edge can be reached inside it
+    inverses = _get_sector_inverses(dl, dd)
+    to_steps = lambda x, y: (inverses[:, 0, 0] * x + inverses[:, 0, 1] * y, inverses[:, 1, 0] * x + inverses[:, 1, 1] * y)
+    min_s = min_t = min_sum = np.zeros(len(dl), dtype=np.int64)
+    res = np.ones(len(dl), dtype=bool)
+    for i in range(edges.shape[1]):
+        start = edges[:, i, 0]
+        end = edges[:, i, 1]
+        s0, t0 = to_steps(start[:, 0] * size - l1, start[:, 1] * size - d1)
+        ds, dt = to_steps(end[:, 0] - start[:, 0], end[:, 1] - start[:, 1])
+        # the points s0 + u * ds, t0 + u * dt on the edge for 0 <= u <= size, where ds, dt, and ds + dt are each -1, 0, or 1
+        lo = np.zeros(len(dl), dtype=np.int64)
+        hi = size + lo
+        for coefficient, value, minimum in ((ds, s0, min_s), (dt, t0, min_t), (ds + dt, s0 + t0, min_sum)):
+            lo = np.where(coefficient > 0, np.maximum(lo, minimum - value), lo)
+            hi = np.where(coefficient < 0, np.minimum(hi, value - minimum), hi)
+            res &= (coefficient != 0) | (value >= minimum)
+        res &= lo <= hi
+        min_s = np.minimum(s0 + lo * ds, s0 + hi * ds)
+        min_t = np.minimum(t0 + lo * dt, t0 + hi * dt)
+        min_sum = np.minimum(s0 + t0 + lo * (ds + dt), s0 + t0 + hi * (ds + dt))
+    s, t = to_steps(dl, dd)
+    return res & (s >= min_s) & (t >= min_t) & (s + t >= min_sum)
+
+
+def get_hop_distance_array_from_packed_codes(ppcs1, ppcs2):
+    # (N,) number of steps between each pair of points (which must be at the same iteration)
+    # the least hex distance over the charts of the chains of squares from the first point's square to the second's
+    # in which a shortest path stays inside the chain (paths past a pentagon go along the seams meeting at it)
+    ppcs1 = np.asarray(ppcs1, dtype=np.int64)
+    ppcs2 = np.asarray(ppcs2, dtype=np.int64)
+    if ppcs1.shape != ppcs2.shape:
+        raise ValueError(f"got {ppcs1.shape} and {ppcs2.shape} arrays of packed codes")
+    h1, l1, d1, n1 = ppc.unpack_l_and_d_array(ppcs1)
+    h2, l2, d2, n2 = ppc.unpack_l_and_d_array(ppcs2)
+    if (n1 != n2).any():
+        raise ValueError("hop distance needs both points at the same iteration")
+    size = np.left_shift(1, n1, dtype=np.int64)
+    squares1, l1, d1 = _get_squares_for_hop_distance(h1, l1, d1, size)
+    squares2, l2, d2 = _get_squares_for_hop_distance(h2, l2, d2, size)
+    res = np.full(len(ppcs1), np.iinfo(np.int64).max)
+    # group the pairs by the first square's parity and where the second square is from it, and only try the chains between those
+    groups = (squares1 % 2 * N_PEELS + (squares2 // 2 - squares1 // 2) % N_PEELS) * 2 + squares2 % 2
+    order = np.argsort(groups, kind="stable")
+    group_starts = np.searchsorted(groups[order], np.arange(4 * N_PEELS + 1))
+    for (parity, peel_offset, last_parity), (rotations, offsets, edges) in _get_square_chains().items():
+        group = (parity * N_PEELS + peel_offset) * 2 + last_parity
+        rows = order[group_starts[group]:group_starts[group + 1]]
+        if len(rows) == 0:
+            continue
+        # (rows, chains) offsets and hex distances in each chain's chart
+        dl = rotations[:, 0, 0] * l2[rows, None] + rotations[:, 0, 1] * d2[rows, None] + offsets[:, 0] * size[rows, None] - l1[rows, None]
+        dd = rotations[:, 1, 0] * l2[rows, None] + rotations[:, 1, 1] * d2[rows, None] + offsets[:, 1] * size[rows, None] - d1[rows, None]
+        distances = get_hex_distance_from_ld_offsets(dl, dd)
+        if edges.shape[1] == 0:
+            res[rows] = distances[:, 0]
+            continue
+        # try each pair's nearest chart first, which is usually the one, then the rest nearest first, a few at a time,
+        # until one of them has a shortest path in its chain
+        pending = np.arange(len(rows))
+        tried = np.argmin(distances, axis=1)[:, None]
+        ranked = None
+        next_rank = 1
+        while len(pending) > 0 and tried.shape[1] > 0:
+            pair_rows = np.repeat(pending, tried.shape[1])
+            chains = tried.ravel()
+            row_rows = rows[pair_rows]
+            ok = _has_shortest_path_in_chain(dl[pair_rows, chains], dd[pair_rows, chains], edges[chains], l1[row_rows], d1[row_rows], size[row_rows])
+            tried_distances = np.where(ok, distances[pair_rows, chains], np.iinfo(np.int64).max).reshape(tried.shape).min(axis=1)
+            found = tried_distances < np.iinfo(np.int64).max
+            res[rows[pending[found]]] = tried_distances[found]
+            pending = pending[~found]
+            ranked = np.argsort(distances[pending], axis=1, kind="stable") if ranked is None else ranked[~found]
+            tried = ranked[:, next_rank:next_rank + CHAINS_TRIED_AT_ONCE]
+            next_rank += CHAINS_TRIED_AT_ONCE
+    return res
+
+
+def hop_distance(pc1, pc2):
+    # number of steps between two point codes at the same iteration
+    ppcs = ppc.get_packed_code_array_from_point_codes([pc1, pc2])
+    return int(get_hop_distance_array_from_packed_codes(ppcs[:1], ppcs[1:])[0])
@@ -0,0 +1,156 @@
+# streaming a whole iteration of the lattice in fixed-size chunks, for iterations too big to hold all at once
+# (iteration 11 has about 42 million points)
+
+# a stream is a generator of LevelChunks in canonical order, each holding a contiguous block of canonical indices
+# stages are generator functions that take a stream and yield chunks (e.g. adding a field computed from the xyz),
+# and sinks consume a stream (e.g. writing a field to a .npy file, or accumulating statistics),
+# so a pipeline like
+#   write_field_to_npy(with_field(iterate_level_chunks(11), "elevation", f), "elevation", path)
+# only ever has one chunk in memory
+
+
+import collections
+import numpy as np
+
+import icosalattice.Iterations as it
+from icosalattice.AdjacencyArrays import get_neighbor_array_from_packed_codes, NO_NEIGHBOR
+from icosalattice.CoordinatesOfPointCode import get_xyz_array_function
+from icosalattice.GeneratePointCodes import get_all_packed_codes_at_iteration, get_canonical_indices_from_packed_codes
+
+
+DEFAULT_CHUNK_SIZE = 2**20
+
+# fields is a dict of name -> array with one row per point of the chunk, filled in by stages
+LevelChunk = collections.namedtuple("LevelChunk", ["iterations", "packed_codes", "indices", "xyz", "neighbors", "fields"])
+
+
+def iterate_level_chunks(iterations, chunk_size=DEFAULT_CHUNK_SIZE, with_xyz=True, with_neighbors=False, method=None, start=0, stop=None):
+    # chunks of the points with canonical indices [start, stop) at this iteration
+    # xyz is placed by method (None if not with_xyz),
+    # neighbors are rows of the neighbor table (see AdjacencyGraph) if with_neighbors, otherwise None
+    n_points = it.get_exact_n_points_from_iterations(iterations)
+    stop = n_points if stop is None else min(stop, n_points)
+    f_xyz = get_xyz_array_function(method)
+    for chunk_start in range(start, stop, chunk_size):
+        chunk_stop = min(chunk_start + chunk_size, stop)
+        ppcs = get_all_packed_codes_at_iteration(iterations, start=chunk_start, stop=chunk_stop)
+        indices = np.arange(chunk_start, chunk_stop, dtype=np.int64)
+        xyz = f_xyz(ppcs) if with_xyz else None
+        neighbors = None
+        if with_neighbors:
+            adj = get_neighbor_array_from_packed_codes(ppcs)
+            has_neighbor = adj != NO_NEIGHBOR
+            neighbors = np.full(adj.shape, NO_NEIGHBOR, dtype=np.int64)
+            neighbors[has_neighbor] = get_canonical_indices_from_packed_codes(adj[has_neighbor])
+        yield LevelChunk(iterations, ppcs, indices, xyz, neighbors, {})
+
+
+# ---- stages ---- #
+
+
+def map_chunks(chunks, f):
+    # replace each chunk with f(chunk)
+    for chunk in chunks:
+        yield f(chunk)
+
+
+def with_field(chunks, name, f):
+    # add a field f(chunk) to each chunk, e.g. initial values of a field computed from the xyz
+    for chunk in chunks:
+        values = np.asarray(f(chunk))
+        if len(values) != len(chunk.indices):
+            raise ValueError(f"field {name!r} has {len(values)} values for a chunk of {len(chunk.indices)} points")
+        chunk.fields[name] = values
+        yield chunk
+
+
+def observe_chunks(chunks, f):
+    # call f(chunk) for each chunk (e.g. to update statistics) and pass the chunk on unchanged
+    for chunk in chunks:
+        f(chunk)
+        yield chunk
+
+
+def get_chunk_values(chunk, name):
+    # a field of the chunk, or one of its own arrays ("packed_codes", "indices", "xyz", "neighbors")
+    return chunk.fields[name] if name in chunk.fields else getattr(chunk, name)
+
+
+# ---- sinks ---- #
+
+
+class RunningStatistics:
+    # count, mean, variance, min and max of values seen in batches, without keeping them
+    # (batches are merged with the parallel variance formula, so the result doesn't depend on chunk size)
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.sum_squared_deviations = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = values.mean()
+        batch_ssd = ((values - batch_mean) ** 2).sum()
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.sum_squared_deviations += batch_ssd + delta**2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    @property
+    def variance(self):
+        return self.sum_squared_deviations / self.count if self.count > 0 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def __repr__(self):
+        return f"<RunningStatistics count={self.count} mean={self.mean} std={self.std} min={self.min} max={self.max}>"
+
+
+def collect_statistics(chunks, name, stats):
+    # pass-through stage updating stats (a RunningStatistics) with a field of each chunk
+    return observe_chunks(chunks, lambda chunk: stats.update(get_chunk_values(chunk, name)))
+
+
+def get_statistics_of_field(chunks, name):
+    stats = RunningStatistics()
+    consume(collect_statistics(chunks, name, stats))
+    return stats
+
+
+def write_field_to_npy(chunks, name, path, n_points=None):
+    # write a field of a whole level to a .npy file (memory-mapped, so only one chunk is in memory)
+    # the chunks must cover canonical indices [0, n_points) in order, with n_points from the first chunk's iteration by default
+    out = None
+    expected_start = 0
+    for chunk in chunks:
+        values = np.asarray(get_chunk_values(chunk, name))
+        if out is None:
+            if n_points is None:
+                n_points = it.get_exact_n_points_from_iterations(chunk.iterations)
+            out = np.lib.format.open_memmap(path, mode="w+", dtype=values.dtype, shape=(n_points,) + values.shape[1:])
+        if len(chunk.indices) > 0 and chunk.indices[0] != expected_start:
+            raise ValueError(f"chunk starts at canonical index {chunk.indices[0]}, expected {expected_start}")
+        out[chunk.indices[0]:chunk.indices[0] + len(values)] = values
+        expected_start += len(values)
+    if out is None:
+        raise ValueError("no chunks to write")
+    if expected_start != n_points:
+        raise ValueError(f"chunks covered {expected_start} points, expected {n_points}")
+    out.flush()
+    return np.load(path, mmap_mode="r")
+
+
+def consume(chunks):
+    # run a pipeline for its side effects
+    for _ in chunks:
+        pass
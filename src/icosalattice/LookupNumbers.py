@@ -1,5 +1,24 @@
 # another number system for lattice points
 
+# the prefix lookup number reverses the point code and reads it as a number:
+# the starting point letter is the least significant digit (base 10, C=0 ... L=9),
+# and the digits after it are base 4, with the first digit of the code least significant
+#   ln = letter + 10 * sum(digit[i] * 4**i)
+# so every code starting with a given prefix of length p is congruent to the prefix's lookup number
+# modulo 10 * 4**(p-1), and filtering a table by prefix is a single modulus and comparison
+# trailing zeros don't change the number, so a point has the same lookup number at every iteration
+# the poles can't have children, so they are special values outside this scheme (A=-2, B=-3)
+
+# in uint64 arrays, the poles are the same bits as -2 and -3 as int64 (i.e. 2**64-2 and 2**64-3),
+# which leaves room for codes with up to 30 digits (more than packed point codes can hold)
+
+
+import numpy as np
+
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.PackedPointCodes import STARTING_POINT_SHIFT, ITERATION_MASK, NORTH_POLE_INDEX, SOUTH_POLE_INDEX, C_INDEX
+
+
 # for converting between {point code, number array, lookup number}
 LETTER_TO_NUMBER_DICT = {c:i for i,c in enumerate("CDEFGHIJKL")}
 LETTER_TO_NUMBER_DICT["A"] = -2
@@ -7,4 +26,159 @@ LETTER_TO_NUMBER_DICT["B"] = -3
 NUMBER_TO_LETTER_DICT = {i:c for c,i in LETTER_TO_NUMBER_DICT.items()}
 INITIAL_POINT_LOOKUP_NUMBERS = [-2, -3, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
 
+NORTH_POLE_LOOKUP_NUMBER = LETTER_TO_NUMBER_DICT["A"]
+SOUTH_POLE_LOOKUP_NUMBER = LETTER_TO_NUMBER_DICT["B"]
+NORTH_POLE_LOOKUP_NUMBER_UINT64 = np.int64(NORTH_POLE_LOOKUP_NUMBER).astype(np.uint64)
+SOUTH_POLE_LOOKUP_NUMBER_UINT64 = np.int64(SOUTH_POLE_LOOKUP_NUMBER).astype(np.uint64)
+MIN_POLE_LOOKUP_NUMBER_UINT64 = min(NORTH_POLE_LOOKUP_NUMBER_UINT64, SOUTH_POLE_LOOKUP_NUMBER_UINT64)
+
+
+def get_prefix_lookup_number_from_point_code(pc):
+    if pc is None:
+        return None
+    n0 = LETTER_TO_NUMBER_DICT[pc[0]]
+    if n0 < 0:
+        if any(x != "0" for x in pc[1:]):
+            raise ValueError(f"pole point code {pc!r} cannot have nonzero digits")
+        return n0
+    res = 0
+    for x in reversed(pc[1:]):
+        res = 4 * res + int(x)
+    return n0 + 10 * res
+
+
+def get_prefix_lookup_numbers_from_point_codes(pcs):
+    return [get_prefix_lookup_number_from_point_code(pc) for pc in pcs]
+
+
+def get_point_code_from_prefix_lookup_number(ln, iterations=None):
+    # the lookup number doesn't know about trailing zeros,
+    # so the code is as short as possible unless iterations is given
+    if ln is None:
+        return None
+    if ln < 0:
+        digits = []
+        head = ln
+    else:
+        rest, head = divmod(ln, 10)
+        digits = []
+        while rest > 0:
+            rest, digit = divmod(rest, 4)
+            digits.append(str(digit))
+    if iterations is not None:
+        if len(digits) > iterations:
+            raise ValueError(f"lookup number {ln} needs more than {iterations} iterations")
+        digits += ["0"] * (iterations - len(digits))
+    return NUMBER_TO_LETTER_DICT[head] + "".join(digits)
+
+
+def get_point_codes_from_prefix_lookup_numbers(lns, iterations=None):
+    return [get_point_code_from_prefix_lookup_number(ln, iterations) for ln in lns]
+
+
+def get_prefix_lookup_modulus(prefix):
+    return 1 if len(prefix) == 0 else 10 * 4**(len(prefix)-1)
+
+
+def lookup_number_matches_prefix_number(lookup_number, modulus, prefix_number):
+    if prefix_number == NORTH_POLE_LOOKUP_NUMBER:
+        return lookup_number == NORTH_POLE_LOOKUP_NUMBER
+    elif prefix_number == SOUTH_POLE_LOOKUP_NUMBER:
+        return lookup_number == SOUTH_POLE_LOOKUP_NUMBER
+    return lookup_number % modulus == prefix_number
+
+
+def point_code_matches_prefix(pc, prefix):
+    modulus = get_prefix_lookup_modulus(prefix)
+    prefix_number = get_prefix_lookup_number_from_point_code(prefix) if len(prefix) > 0 else 0
+    return lookup_number_matches_prefix_number(get_prefix_lookup_number_from_point_code(pc), modulus, prefix_number)
+
+
+# ---- array versions ---- #
+# uint64 arrays of lookup numbers, converted to and from int64 arrays of packed point codes
+# reading the digits in reverse order is a reversal of the 2-bit pairs in a 64-bit word, so there is no loop over digits
+
+
+def _reverse_bit_pairs(x):
+    # x is a uint64 array, swap pairs within nibbles, then nibbles within bytes, etc.
+    x = ((x >> 2) & 0x3333333333333333) | ((x & 0x3333333333333333) << 2)
+    x = ((x >> 4) & 0x0F0F0F0F0F0F0F0F) | ((x & 0x0F0F0F0F0F0F0F0F) << 4)
+    x = ((x >> 8) & 0x00FF00FF00FF00FF) | ((x & 0x00FF00FF00FF00FF) << 8)
+    x = ((x >> 16) & 0x0000FFFF0000FFFF) | ((x & 0x0000FFFF0000FFFF) << 16)
+    x = (x >> 32) | (x << 32)
+    return x
+
+
+def get_prefix_lookup_number_array_from_packed_codes(ppcs):
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    h = ppcs >> STARTING_POINT_SHIFT
+
+    # left-align the tail in 64 bits (first digit in the top two bits), read it as digits, then reverse it
+    # so the first digit is in the bottom two bits; bits past the end of the code are zero
+    tail = (ppcs & ~((0xF << STARTING_POINT_SHIFT) | ITERATION_MASK)).astype(np.uint64) << (64 - STARTING_POINT_SHIFT)
+    digits = _reverse_bit_pairs(ppc.get_base_four_digits_from_tail(tail))
+
+    lns = (h - C_INDEX).astype(np.uint64) + np.uint64(10) * digits
+    lns[h == NORTH_POLE_INDEX] = NORTH_POLE_LOOKUP_NUMBER_UINT64
+    lns[h == SOUTH_POLE_INDEX] = SOUTH_POLE_LOOKUP_NUMBER_UINT64
+    return lns
+
+
+def get_prefix_lookup_number_array_from_point_codes(pcs):
+    return get_prefix_lookup_number_array_from_packed_codes(ppc.get_packed_code_array_from_point_codes(pcs))
+
+
+def get_packed_code_array_from_prefix_lookup_numbers(lns, iterations):
+    # all the resulting packed codes have the same number of iterations (padded with trailing zeros)
+    lns = np.asarray(lns, dtype=np.uint64)
+    is_north_pole = lns == NORTH_POLE_LOOKUP_NUMBER_UINT64
+    is_south_pole = lns == SOUTH_POLE_LOOKUP_NUMBER_UINT64
+    is_pole = is_north_pole | is_south_pole
+    if ((lns >= MIN_POLE_LOOKUP_NUMBER_UINT64) & ~is_pole).any():
+        raise ValueError("invalid lookup numbers")
+
+    digits = np.where(is_pole, 0, lns // np.uint64(10))
+    if (digits >= np.uint64(4**iterations)).any():
+        raise ValueError(f"lookup numbers need more than {iterations} iterations")
+    h = np.where(is_pole, 0, lns % np.uint64(10)).astype(np.int64) + C_INDEX
+    h[is_north_pole] = NORTH_POLE_INDEX
+    h[is_south_pole] = SOUTH_POLE_INDEX
+
+    # undo the reversal, then move the left-aligned tail from the top of the word to its place in the packed code
+    tail = ppc.get_tail_from_base_four_digits(_reverse_bit_pairs(digits)) >> np.uint64(64 - STARTING_POINT_SHIFT)
+    return (h << STARTING_POINT_SHIFT) | tail.astype(np.int64) | iterations
+
+
+def get_point_code_array_from_prefix_lookup_numbers(lns, iterations):
+    return ppc.get_point_code_array_from_packed_codes(get_packed_code_array_from_prefix_lookup_numbers(lns, iterations))
+
+
+def get_prefix_match_mask(lns, prefixes):
+    # boolean mask of which lookup numbers (uint64 array) belong to codes starting with any of the prefixes
+    # prefixes of the same length share a modulus, so each distinct length costs one pass over the array
+    lns = np.asarray(lns, dtype=np.uint64)
+    if any(len(prefix) == 0 for prefix in prefixes):
+        return np.ones(lns.shape, dtype=bool)
+
+    pole_lns = []
+    prefix_numbers_by_modulus = {}
+    for prefix in prefixes:
+        prefix_number = get_prefix_lookup_number_from_point_code(prefix)
+        if prefix_number < 0:
+            pole_lns.append(np.int64(prefix_number).astype(np.uint64))
+        else:
+            prefix_numbers_by_modulus.setdefault(get_prefix_lookup_modulus(prefix), []).append(prefix_number)
+
+    mask = np.zeros(lns.shape, dtype=bool)
+    for modulus, prefix_numbers in prefix_numbers_by_modulus.items():
+        remainders = lns % np.uint64(modulus)
+        if len(prefix_numbers) == 1:
+            mask |= remainders == np.uint64(prefix_numbers[0])
+        else:
+            mask |= np.isin(remainders, np.array(prefix_numbers, dtype=np.uint64))
 
+    # the poles' lookup numbers are arbitrary as far as the modulus is concerned, so they only match themselves
+    mask &= lns < MIN_POLE_LOOKUP_NUMBER_UINT64
+    for pole_ln in pole_lns:
+        mask |= lns == pole_ln
+    return mask
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -59,7 +60,8 @@ def mag_3d(v):
 
 def mag_3d_simple(xyz):
     x, y, z = xyz
-    return (x**2 + y**2 + z**2) ** 0.5
+    # x*x and math.sqrt are correctly rounded (pow isn't necessarily), so array versions can reproduce this exactly
+    return math.sqrt(x*x + y*y + z*z)
 
 
 def get_latlon_of_point_on_map(r, c, map_r_size, map_c_size,
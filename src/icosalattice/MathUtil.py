@@ -109,4 +109,22 @@ def zigzag_inverse(x, a, n):
     return res
 
 
+def zigzag_array(x, a):
+    # same as zigzag, on arrays
+    x = np.asarray(x, dtype=float) / a
+    n = np.floor(x)
+    n_odd = n % 2 == 1
+    res = np.mod(np.where(n_odd, -x, x), 1)
+    res = np.where(n_odd & (res == 0), 1.0, res)
+    return res * a
+
+
+def zigzag_inverse_array(x, a, n):
+    # same as zigzag_inverse, on arrays (n is an array of the same shape as x)
+    x = np.asarray(x, dtype=float) / a
+    n = np.asarray(n)
+    res = np.where(n % 2 == 1, -x, x) + n + np.mod(n, 2)
+    return res * a
+
+
 class InvalidVectorDecompositionException(Exception): pass
@@ -0,0 +1,112 @@
+# finding the nearest lattice point to arbitrary locations on the sphere, for many locations at once
+
+# the lattice's adjacency is (close to) a Delaunay triangulation of the points,
+# so walking from any point to whichever of its neighbors is closest to the query, until none are closer,
+# ends at the nearest point of that iteration
+# going from iteration k-1 to k, the nearest point's code with a 0 appended is the same location,
+# so the walk at iteration k starts there and only needs a step or two
+
+# the nearest point depends on where the placement method puts the points, so all of this takes the method name
+# (see CoordinatesOfPointCode), and distances are measured to the points as placed by that method
+
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.MapCoordinateMath as mcm
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.AdjacencyArrays import get_neighbor_array_from_packed_codes, NO_NEIGHBOR
+from icosalattice.CoordinatesOfPointCode import get_xyz_array_function
+from icosalattice.DistancesOnSphere import convert_distance_3d_to_great_circle
+from icosalattice.SpatialIndex import get_spatial_index_of_iteration
+
+
+# iteration of the lattice that is searched all at once with a KD-tree before walking to finer iterations
+DEFAULT_SEED_ITERATIONS = 7
+
+
+def walk_to_nearest_packed_codes(xyz, ppcs, d_3d=None, method=None):
+    # starting from the points ppcs, step to whichever neighbor is closest to each query xyz until no neighbor is closer
+    # returns (packed codes, 3d distances), all at the same iterations as the starting codes
+    f_xyz = get_xyz_array_function(method)
+    ppcs = np.array(ppcs, dtype=np.int64)
+    if d_3d is None:
+        d_3d = np.linalg.norm(f_xyz(ppcs) - xyz, axis=1)
+    else:
+        d_3d = np.array(d_3d, dtype=float)
+
+    active = np.arange(len(ppcs))
+    while len(active) > 0:
+        neighbors = get_neighbor_array_from_packed_codes(ppcs[active])
+        has_neighbor = neighbors != NO_NEIGHBOR
+        neighbor_d = np.full(neighbors.shape, np.inf)
+        query_rows = np.broadcast_to(np.arange(len(active))[:, None], neighbors.shape)[has_neighbor]
+        neighbor_d[has_neighbor] = np.linalg.norm(f_xyz(neighbors[has_neighbor]) - xyz[active[query_rows]], axis=1)
+
+        best_col = np.argmin(neighbor_d, axis=1)
+        best_d = neighbor_d[np.arange(len(active)), best_col]
+        improved = best_d < d_3d[active]
+        moved = active[improved]
+        ppcs[moved] = neighbors[improved, best_col[improved]]
+        d_3d[moved] = best_d[improved]
+        active = moved
+    return ppcs, d_3d
+
+
+def _append_zero(ppcs, iterations):
+    # the tail is left-aligned, so appending a 0 digit only changes the iteration bits
+    return (ppcs & ~ppc.ITERATION_MASK) | iterations
+
+
+def get_nearest_packed_codes_to_xyz_array(xyz, iterations=None, max_distance=None, planet_radius=1, method=None, max_iterations=ppc.MAX_ITERATIONS):
+    # xyz is an (N, 3) array of unit vectors
+    # give exactly one of:
+    # - iterations: the nearest point at this iteration
+    # - max_distance: the nearest point at the lowest iteration that has one within max_distance (great-circle, in units of planet_radius)
+    #   (raises ValueError if some point has none within max_distance by max_iterations)
+    # returns (packed codes, great-circle distances in units of planet_radius)
+    if (iterations is None) == (max_distance is None):
+        raise ValueError("give exactly one of iterations or max_distance")
+    xyz = np.asarray(xyz, dtype=float).reshape(-1, 3)
+    to_distance = lambda d_3d: planet_radius * convert_distance_3d_to_great_circle(d_3d)
+
+    if iterations is not None:
+        seed_iterations = min(iterations, DEFAULT_SEED_ITERATIONS)
+        d_3d, indices = get_spatial_index_of_iteration(seed_iterations, method).kdtree.query(xyz)
+        ppcs = gpc.get_packed_codes_from_canonical_indices(indices, seed_iterations)
+        for k in range(seed_iterations + 1, iterations + 1):
+            ppcs, d_3d = walk_to_nearest_packed_codes(xyz, _append_zero(ppcs, k), d_3d, method=method)
+        return ppcs, to_distance(d_3d)
+
+    d_3d, indices = get_spatial_index_of_iteration(0, method).kdtree.query(xyz)
+    ppcs = gpc.get_packed_codes_from_canonical_indices(indices, 0)
+    distances = to_distance(d_3d)
+    active = np.flatnonzero(distances > max_distance)
+    for k in range(1, max_iterations + 1):
+        if len(active) == 0:
+            break
+        new_ppcs, new_d_3d = walk_to_nearest_packed_codes(xyz[active], _append_zero(ppcs[active], k), d_3d[active], method=method)
+        ppcs[active] = new_ppcs
+        d_3d[active] = new_d_3d
+        distances[active] = to_distance(new_d_3d)
+        active = active[distances[active] > max_distance]
+    if len(active) > 0:
+        raise ValueError(f"{len(active)} points have no lattice point within max_distance={max_distance} by iteration {max_iterations}")
+    return ppcs, distances
+
+
+def get_nearest_packed_codes_to_latlon_array(latlons, iterations=None, max_distance=None, planet_radius=1, method=None, deg=True, max_iterations=ppc.MAX_ITERATIONS):
+    # latlons is an (N, 2) array of (lat, lon)
+    latlons = np.asarray(latlons, dtype=float).reshape(-1, 2)
+    xyz = mcm.unit_vector_latlon_to_cartesian(latlons[:, 0], latlons[:, 1], deg=deg).T
+    return get_nearest_packed_codes_to_xyz_array(xyz, iterations=iterations, max_distance=max_distance, planet_radius=planet_radius, method=method, max_iterations=max_iterations)
+
+
+def get_nearest_point_codes_to_xyz_array(xyz, iterations=None, max_distance=None, planet_radius=1, method=None, max_iterations=ppc.MAX_ITERATIONS):
+    ppcs, distances = get_nearest_packed_codes_to_xyz_array(xyz, iterations=iterations, max_distance=max_distance, planet_radius=planet_radius, method=method, max_iterations=max_iterations)
+    return ppc.get_point_code_array_from_packed_codes(ppcs), distances
+
+
+def get_nearest_point_codes_to_latlon_array(latlons, iterations=None, max_distance=None, planet_radius=1, method=None, deg=True, max_iterations=ppc.MAX_ITERATIONS):
+    ppcs, distances = get_nearest_packed_codes_to_latlon_array(latlons, iterations=iterations, max_distance=max_distance, planet_radius=planet_radius, method=method, deg=deg, max_iterations=max_iterations)
+    return ppc.get_point_code_array_from_packed_codes(ppcs), distances
@@ -0,0 +1,179 @@
+# the same "arithmetic" as PointCodeArithmetic, but on packed integer point codes
+# moving in the 1 direction adds one to the l bit plane of the tail, moving in the 3 direction adds one to the d bit plane
+# so carrying and borrowing can be done with masked integer addition/subtraction instead of lists of bits
+# the case structure (peel normalization, refraction at the CA and DB edges, reversed edge polarity)
+# mirrors add_direction_to_point_code exactly, so results are identical to the string version
+
+import icosalattice.PackedPointCodes as ppc_mod
+from icosalattice.PackedPointCodes import L_PLANE_MASKS, D_PLANE_MASKS, NORTH_POLE_INDEX, SOUTH_POLE_INDEX, C_INDEX, D_INDEX
+
+
+DIRECTIONS = (1, 2, 3, -1, -2, -3)
+
+_I = ppc_mod.STARTING_POINT_INDEX
+E_INDEX = _I["E"]
+F_INDEX = _I["F"]
+K_INDEX = _I["K"]
+L_INDEX = _I["L"]
+
+# same as initial_points_results in add_direction_to_point_code, using starting point indices
+INITIAL_POINT_RESULTS = {
+    C_INDEX: {1: NORTH_POLE_INDEX, 2: K_INDEX, 3: L_INDEX, -1: D_INDEX, -2: E_INDEX, -3: None},
+    D_INDEX: {1: C_INDEX, 2: L_INDEX, 3: SOUTH_POLE_INDEX, -1: None, -2: F_INDEX, -3: E_INDEX},
+    NORTH_POLE_INDEX: {3: K_INDEX},  # for reversed K-A edge
+    SOUTH_POLE_INDEX: {1: L_INDEX},  # for reversed L-B edge
+}
+
+
+def add_direction_to_packed_code(ppc, x):
+    if ppc is None:
+        return None
+    spc_index, tail, n = ppc_mod.unpack(ppc)
+    res = add_direction_to_unpacked_code(spc_index, tail, n, x)
+    if res is None:
+        return None
+    return ppc_mod.pack(res[0], res[1], n)
+
+
+def add_direction_to_unpacked_code(h, t, n, x, fix_edge_polarity=True):
+    # h is the starting point index, t is the interleaved l/d tail with n digits
+    # returns (new_h, new_t), or None if there is no neighbor in that direction
+    if x not in DIRECTIONS:
+        raise ValueError(f"invalid direction {x!r}")
+
+    # normalize peel to CD
+    if h >= C_INDEX:
+        peel_offset = (h - C_INDEX) >> 1
+        h = C_INDEX + ((h - C_INDEX) & 1)
+    else:
+        peel_offset = 0
+    reference_peel_is_kl = False
+    lm = L_PLANE_MASKS[n]
+    dm = D_PLANE_MASKS[n]
+
+    if fix_edge_polarity and h < C_INDEX:
+        # directions from poles are ill-defined
+        return None
+    elif n == 0:
+        new_h = INITIAL_POINT_RESULTS[h].get(x)
+        res = None if new_h is None else (new_h, 0)
+    elif h >= C_INDEX and x == 2 and t & lm != lm and t & dm != dm:
+        # interior of the square, no carrying out of either bit plane
+        res = (h, (((t | ~lm) + 1) & lm) | (((t | ~dm) + 1) & dm))
+    elif h >= C_INDEX and x == -2 and t & lm and t & dm:
+        # interior of the square, no borrowing out of either bit plane
+        res = (h, (((t & lm) - 1) & lm) | (((t & dm) - 1) & dm))
+    else:
+        res, reference_peel_is_kl = _add_direction_general_case(h, t, n, x, lm, dm)
+
+    if res is None:
+        return None
+
+    # only fix the edge polarity at the very final result, before reapplying the peel offset
+    if fix_edge_polarity:
+        res = _correct_reversed_edge_polarity_if_needed(res, lm, dm, reference_peel_is_kl)
+
+    if peel_offset != 0 and res[0] >= C_INDEX:
+        res = (C_INDEX + (res[0] - C_INDEX + 2 * peel_offset) % 10, res[1])
+    return res
+
+
+def _add_direction_general_case(h, t, n, x, lm, dm):
+    # h is already normalized to the CD peel (or is a pole, for reverse-polarity-encoded intermediate results)
+    add = lambda y, direction: None if y is None else add_direction_to_unpacked_code(y[0], y[1], n, direction, fix_edge_polarity=False)
+    pc = (h, t)
+    reference_peel_is_kl = False
+
+    if h == NORTH_POLE_INDEX:
+        assert t & lm == 0, f"invalid packed point code tail {t} for north pole"
+        allowed_directions = (3, -1) if t == 0 else (3, -1, -2, -3)
+    elif h == SOUTH_POLE_INDEX:
+        assert t & dm == 0, f"invalid packed point code tail {t} for south pole"
+        allowed_directions = (1, -3) if t == 0 else (1, 2, 3, -3)
+    else:
+        allowed_directions = DIRECTIONS
+    if x not in allowed_directions:
+        return None, reference_peel_is_kl
+
+    on_edge_CA = h == C_INDEX and t & dm == 0
+    on_edge_DB = h == D_INDEX and t & lm == 0
+
+    if x == 2:
+        res = add(add(pc, 1), 3)
+        if res is not None and res[0] < C_INDEX:
+            # we moved off the left or bottom edge of CD peel
+            reference_peel_is_kl = True
+
+    # special cases of C1 - 2 = E2, C1 - 3 = E1, D3 - 2 = F2, D3 - 1 = F3
+    elif n == 1 and h == C_INDEX and t == 0b10 and x in (-2, -3):
+        res = (E_INDEX, 0b11 if x == -2 else 0b10)
+    elif n == 1 and h == D_INDEX and t == 0b01 and x in (-2, -1):
+        res = (F_INDEX, 0b11 if x == -2 else 0b01)
+
+    # refraction cases
+    elif on_edge_CA and x == -3:
+        if t == 0:
+            res = None
+        else:
+            # replace zeros with twos: l plane becomes all ones, d plane becomes the complement of the old l plane
+            res = (E_INDEX, lm | ((~t & lm) >> 1))
+    elif on_edge_CA and x == -2:
+        # do the refracting last, so do -2 = -1-3 NOT -3-1
+        y1 = add(pc, -1)
+        if y1[0] == C_INDEX and y1[1] == 0:
+            res = add(add(pc, -3), 3)
+        else:
+            res = add(y1, -3)
+    elif on_edge_DB and x == -1:
+        if t == 0:
+            res = None
+        else:
+            # replace zeros with twos: d plane becomes all ones, l plane becomes the complement of the old d plane
+            res = (F_INDEX, dm | ((~t & dm) << 1))
+    elif on_edge_DB and x == -2:
+        # do the refracting last, so do -2 = -3-1 NOT -1-3
+        y3 = add(pc, -3)
+        if y3[0] == D_INDEX and y3[1] == 0:
+            res = add(add(pc, -1), 1)
+        else:
+            res = add(y3, -1)
+
+    elif x == -2:
+        res = add(add(pc, -1), -3)
+    else:
+        m = lm if abs(x) == 1 else dm
+        if x > 0:
+            overflow = t & m == m
+            new_plane = 0 if overflow else ((t | ~m) + 1) & m
+        else:
+            overflow = t & m == 0
+            new_plane = m if overflow else ((t & m) - 1) & m
+        new_t = new_plane | (t & ~m)
+
+        # overflow is used to change watershed by applying the direction to the starting point
+        new_h = INITIAL_POINT_RESULTS[h].get(x) if overflow else h
+        if new_h is None:
+            res = None
+        else:
+            res = (new_h, new_t)
+            if new_h < C_INDEX:
+                # we moved off the left or bottom edge of CD peel
+                reference_peel_is_kl = True
+
+    return res, reference_peel_is_kl
+
+
+def _correct_reversed_edge_polarity_if_needed(res, lm, dm, reference_peel_is_kl):
+    # points of form A{0,3}+ are reverse-polarity-coded K{0,1}+ (from the perspective of the KL peel)
+    # and B{0,1}+ are reverse-polarity-coded L{0,3}+
+    # flipping the polarity maps the bit plane value v to 2**n - v and moves it to the other bit plane
+    h, t = res
+    if t == 0:
+        return res
+    if h == NORTH_POLE_INDEX and t & lm == 0:
+        new_h = K_INDEX if reference_peel_is_kl else C_INDEX
+        return (new_h, ((((~t & dm) | ~dm) + 1) & dm) << 1)
+    if h == SOUTH_POLE_INDEX and t & dm == 0:
+        new_h = L_INDEX if reference_peel_is_kl else D_INDEX
+        return (new_h, ((((~t & lm) | ~lm) + 1) & lm) >> 1)
+    return res
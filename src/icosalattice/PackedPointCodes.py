@@ -0,0 +1,235 @@
+# representing point codes as integers rather than strings
+# so that arithmetic on them (e.g. finding neighbors) doesn't have to build lots of short-lived strings and lists
+
+# a point code is a starting point letter followed by n digits (n = number of iterations)
+# each digit encodes one bit of the l coordinate and one bit of the d coordinate in the half-peel square
+# (same convention as PointRepresentationAsFloat: "0" = 0b00, "1" = 0b10, "3" = 0b01, "2" = 0b11)
+# so the tail of the code is an integer whose odd bits are the l bit plane and whose even bits are the d bit plane
+
+# packed layout (fits in a signed 64-bit integer, so it can also be stored in NumPy int64 arrays):
+# - bits 59..62: index of the starting point in sp.STARTING_POINT_CODES (A=0, B=1, C=2, ..., L=11)
+# - bits 5..58: the tail, left-aligned, so the first digit of the code is always in bits 57..58
+# - bits 0..4: the number of iterations n
+# left-aligning the tail means that a code and its descendants share their high bits,
+# and sorting packed codes sorts by starting point, then by digits, then by iteration
+
+
+import numpy as np
+
+import icosalattice.StartingPoints as sp
+
+
+MAX_ITERATIONS = 27
+ITERATION_BITS = 5
+ITERATION_MASK = (1 << ITERATION_BITS) - 1
+STARTING_POINT_SHIFT = ITERATION_BITS + 2 * MAX_ITERATIONS
+
+# indices of the starting points, for code that works on the packed form
+STARTING_POINT_INDEX = {pc: i for i, pc in enumerate(sp.STARTING_POINT_CODES)}
+NORTH_POLE_INDEX = STARTING_POINT_INDEX[sp.NORTH_POLE]
+SOUTH_POLE_INDEX = STARTING_POINT_INDEX[sp.SOUTH_POLE]
+C_INDEX = STARTING_POINT_INDEX["C"]
+D_INDEX = STARTING_POINT_INDEX["D"]
+
+# each of the five peels is a northern (C-like) and a southern (D-like) half-peel square, C, D, E, ..., L in index order
+N_PEELS = 5
+N_SQUARES = 2 * N_PEELS
+
+# moving in a direction adds this to the peel coordinates (l, d) in a half-peel square
+DIRECTION_TO_LD_OFFSET = {1: (1, 0), 2: (1, 1), 3: (0, 1), -1: (-1, 0), -2: (-1, -1), -3: (0, -1)}
+
+# masks selecting the l bit plane and d bit plane of an n-digit tail
+L_PLANE_MASKS = tuple(int("10" * n, 2) if n > 0 else 0 for n in range(MAX_ITERATIONS + 1))
+D_PLANE_MASKS = tuple(int("01" * n, 2) if n > 0 else 0 for n in range(MAX_ITERATIONS + 1))
+TAIL_MASKS = tuple((1 << (2 * n)) - 1 for n in range(MAX_ITERATIONS + 1))
+
+DIGIT_TO_TAIL_BITS = str.maketrans("0123", "0231")
+TAIL_BIT_PAIR_TO_DIGIT = {"00": "0", "10": "1", "11": "2", "01": "3"}
+
+# byte lookup tables for converting whole arrays of point code strings at once
+NO_STARTING_POINT = -1
+BYTE_TO_STARTING_POINT_INDEX = np.full(256, NO_STARTING_POINT, dtype=np.int64)
+for _pc, _i in STARTING_POINT_INDEX.items():
+    BYTE_TO_STARTING_POINT_INDEX[ord(_pc)] = _i
+BYTE_TO_TAIL_BITS = np.full(256, -1, dtype=np.int64)
+BYTE_TO_TAIL_BITS[0] = 0  # padding after the end of a shorter code
+for _c, _bits in zip("0123", [0b00, 0b10, 0b11, 0b01]):
+    BYTE_TO_TAIL_BITS[ord(_c)] = _bits
+STARTING_POINT_INDEX_TO_BYTE = np.array([ord(pc) for pc in sp.STARTING_POINT_CODES], dtype=np.uint8)
+TAIL_BITS_TO_BYTE = np.array([ord(c) for c in "0312"], dtype=np.uint8)
+
+
+class PackedPointCodeOverflowException(Exception): pass
+
+
+def pack(spc_index, tail, iterations):
+    # tail is the interleaved l/d integer with the first digit most significant
+    if iterations > MAX_ITERATIONS:
+        raise PackedPointCodeOverflowException(f"packed point codes support at most {MAX_ITERATIONS} iterations, but got {iterations}")
+    return (spc_index << STARTING_POINT_SHIFT) | (tail << (STARTING_POINT_SHIFT - 2 * iterations)) | iterations
+
+
+def unpack(ppc):
+    n = ppc & ITERATION_MASK
+    spc_index = ppc >> STARTING_POINT_SHIFT
+    tail = (ppc >> (STARTING_POINT_SHIFT - 2 * n)) & TAIL_MASKS[n]
+    return spc_index, tail, n
+
+
+def get_packed_code_from_point_code(pc):
+    if pc is None:
+        return None
+    n = len(pc) - 1
+    tail = int(pc[1:].translate(DIGIT_TO_TAIL_BITS), 4) if n > 0 else 0
+    return pack(STARTING_POINT_INDEX[pc[0]], tail, n)
+
+
+def get_point_code_from_packed_code(ppc):
+    if ppc is None:
+        return None
+    spc_index, tail, n = unpack(ppc)
+    s = sp.STARTING_POINT_CODES[spc_index]
+    if n > 0:
+        bits = format(tail, f"0{2*n}b")
+        s += "".join(TAIL_BIT_PAIR_TO_DIGIT[bits[i:i+2]] for i in range(0, 2*n, 2))
+    return s
+
+
+def get_packed_codes_from_point_codes(pcs):
+    return [get_packed_code_from_point_code(pc) for pc in pcs]
+
+
+def get_point_codes_from_packed_codes(ppcs):
+    return [get_point_code_from_packed_code(ppc) for ppc in ppcs]
+
+
+def get_iteration_number_from_packed_code(ppc):
+    # includes trailing zeros, same as Iterations.get_iteration_number_from_point_code
+    return ppc & ITERATION_MASK
+
+
+def strip_trailing_zeros_from_packed_codes(ppcs):
+    # for arrays; the tail is left-aligned, so this only changes the iteration bits to the position of the last nonzero digit
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    tails = ppcs & ~ITERATION_MASK & ((1 << STARTING_POINT_SHIFT) - 1)
+    lowest_bit = np.frexp((tails & -tails).astype(float))[1] - 1
+    n = np.where(tails == 0, 0, (STARTING_POINT_SHIFT - lowest_bit + 1) // 2)
+    return (ppcs & ~ITERATION_MASK) | n
+
+
+def get_starting_point_index_from_packed_code(ppc):
+    return ppc >> STARTING_POINT_SHIFT
+
+
+def get_l_and_d_from_tail(tail):
+    # de-interleave the bit planes into two n-bit integers
+    l = compact_bits(tail >> 1)
+    d = compact_bits(tail)
+    return l, d
+
+
+def get_tail_from_l_and_d(l, d):
+    return (spread_bits(l) << 1) | spread_bits(d)
+
+
+def get_tail_from_base_four_digits(v):
+    # v is the tail read as a base-4 number with the digits' face values (e.g. int("1023", 4))
+    # digit g = (g1 g0) in binary has d bit g1 and l bit g1 ^ g0
+    hi = (v >> 1) & 0x5555555555555555
+    lo = v & 0x5555555555555555
+    return ((hi ^ lo) << 1) | hi
+
+
+def get_base_four_digits_from_tail(tail):
+    # inverse of get_tail_from_base_four_digits
+    d = tail & 0x5555555555555555
+    l = (tail >> 1) & 0x5555555555555555
+    return (d << 1) | (l ^ d)
+
+
+def spread_bits(x):
+    # put the bits of x (at most 32 bits) in the even positions of the result
+    # works on Python ints and on NumPy int64 arrays
+    x = x & 0xFFFFFFFF
+    x = (x | (x << 16)) & 0x0000FFFF0000FFFF
+    x = (x | (x << 8)) & 0x00FF00FF00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x << 2)) & 0x3333333333333333
+    x = (x | (x << 1)) & 0x5555555555555555
+    return x
+
+
+def compact_bits(x):
+    # inverse of spread_bits, take the bits in even positions and squash them together
+    x = x & 0x5555555555555555
+    x = (x | (x >> 1)) & 0x3333333333333333
+    x = (x | (x >> 2)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x >> 4)) & 0x00FF00FF00FF00FF
+    x = (x | (x >> 8)) & 0x0000FFFF0000FFFF
+    x = (x | (x >> 16)) & 0x00000000FFFFFFFF
+    return x
+
+
+# ---- array versions ---- #
+# these take and return NumPy int64 arrays of packed codes, and loop over digits rather than over points
+
+
+def pack_array(spc_indices, tails, iterations):
+    spc_indices = np.asarray(spc_indices, dtype=np.int64)
+    tails = np.asarray(tails, dtype=np.int64)
+    iterations = np.asarray(iterations, dtype=np.int64)
+    if np.any(iterations > MAX_ITERATIONS):
+        raise PackedPointCodeOverflowException(f"packed point codes support at most {MAX_ITERATIONS} iterations, but got {iterations.max()}")
+    return (spc_indices << STARTING_POINT_SHIFT) | (tails << (STARTING_POINT_SHIFT - 2 * iterations)) | iterations
+
+
+def unpack_array(ppcs):
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    n = ppcs & ITERATION_MASK
+    spc_indices = ppcs >> STARTING_POINT_SHIFT
+    tails = (ppcs >> (STARTING_POINT_SHIFT - 2 * n)) & ((1 << (2 * n)) - 1)
+    return spc_indices, tails, n
+
+
+def pack_l_and_d_array(spc_indices, l, d, iterations):
+    return pack_array(spc_indices, get_tail_from_l_and_d(np.asarray(l, dtype=np.int64), np.asarray(d, dtype=np.int64)), iterations)
+
+
+def unpack_l_and_d_array(ppcs):
+    spc_indices, tails, n = unpack_array(ppcs)
+    l, d = get_l_and_d_from_tail(tails)
+    return spc_indices, l, d, n
+
+
+def get_packed_code_array_from_point_codes(pcs):
+    arr = np.asarray(pcs, dtype="S")
+    if arr.ndim != 1:
+        raise ValueError(f"expected one-dimensional collection of point codes, got shape {arr.shape}")
+    width = arr.dtype.itemsize
+    if width - 1 > MAX_ITERATIONS:
+        raise PackedPointCodeOverflowException(f"packed point codes support at most {MAX_ITERATIONS} iterations, but got codes of length {width}")
+    b = arr.view(np.uint8).reshape(len(arr), width)
+
+    spc_indices = BYTE_TO_STARTING_POINT_INDEX[b[:, 0]]
+    digits = BYTE_TO_TAIL_BITS[b[:, 1:]]
+    if np.any(spc_indices == NO_STARTING_POINT) or np.any(digits < 0):
+        raise ValueError("got invalid point code in array")
+    n = (b[:, 1:] != 0).sum(axis=1)
+
+    # tails are left-aligned, so each digit position has the same shift regardless of the code's length
+    shifts = STARTING_POINT_SHIFT - 2 * np.arange(1, width, dtype=np.int64)
+    tails = np.bitwise_or.reduce(digits << shifts, axis=1) if width > 1 else np.zeros(len(arr), dtype=np.int64)
+    return (spc_indices << STARTING_POINT_SHIFT) | tails | n
+
+
+def get_point_code_array_from_packed_codes(ppcs):
+    # returns a NumPy array of str
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    n = ppcs & ITERATION_MASK
+    max_n = int(n.max()) if len(ppcs) > 0 else 0
+    b = np.zeros((len(ppcs), max_n + 1), dtype=np.uint8)
+    b[:, 0] = STARTING_POINT_INDEX_TO_BYTE[ppcs >> STARTING_POINT_SHIFT]
+    for i in range(max_n):
+        digit_bits = (ppcs >> (STARTING_POINT_SHIFT - 2 * (i + 1))) & 0b11
+        b[:, i + 1] = np.where(i < n, TAIL_BITS_TO_BYTE[digit_bits], 0)
+    return b.view(f"S{max_n + 1}").reshape(len(ppcs)).astype(str)
@@ -24,6 +24,8 @@ import icosalattice.MapCoordinateMath as mcm
 import icosalattice.CoordinatesByAncestry as anc
 import icosalattice.TriangularPeelCoordinates as tri
 import icosalattice.PointCodeArithmetic as pca
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.ConstantMakerDecorator import constant_maker
 
 
 # potential optimizations, if needed:
@@ -388,3 +390,63 @@ def get_adjusted_peel_coordinates_of_point_codes_on_face(pcs, face_name, func_pc
         ds.append(d)
     
     return ls, ds
+
+
+
+# ---- array versions ---- #
+# starting points are given by their index in sp.STARTING_POINT_CODES (as in packed point codes)
+# the upward/downward face split is done with masks, using per-starting-point tables of the face vertices
+
+
+@constant_maker("HALF_PEEL_VERTEX_ARRAYS")
+def get_half_peel_vertex_arrays():
+    # (12, 3) arrays of the xyz of the vertex at the starting point and in its 1, 2, 3 directions
+    # the upward face is (0, 1, 2) and the downward face is (0, 2, 3); poles just have their own xyz in every row
+    face_name_to_xyzs = fc.get_face_corner_coordinates_xyz(as_array=True)
+    v0, v1, v2, v3 = [np.zeros((len(sp.STARTING_POINT_CODES), 3)) for i in range(4)]
+    for i, spc in enumerate(sp.STARTING_POINT_CODES):
+        p_xyz = sp.STARTING_POINTS[i].xyz(as_array=True)
+        v0[i] = v1[i] = v2[i] = v3[i] = p_xyz
+        if spc in sp.POLES:
+            continue
+        for f in fc.get_faces_in_watershed_of_starting_point(spc):
+            xyz0, xyz1, xyz2, xyz3 = face_name_to_xyzs[f]
+            v2[i] = xyz2
+            if fc.get_directionality_of_face(f) == "up":
+                v1[i] = xyz1
+            else:
+                v3[i] = xyz3
+    return v0, v1, v2, v3
+
+HALF_PEEL_VERTEX_ARRAYS = get_half_peel_vertex_arrays(calling_to_create_constant=True)
+
+
+def get_raw_peel_coordinate_arrays_from_packed_codes(ppcs):
+    # same as get_raw_peel_coordinates_from_point_code, returns (starting point indices, l, d)
+    spc_indices, l_int, d_int, n = ppc.unpack_l_and_d_array(ppcs)
+    denom = (1 << n).astype(float)
+    return spc_indices, l_int / denom, d_int / denom
+
+
+def get_xyz_array_from_adjusted_peel_coordinate_arrays(spc_indices, l, d):
+    # same as get_xyz_from_adjusted_peel_coordinates, returns (N, 3) array
+    spc_indices = np.asarray(spc_indices)
+    l = np.asarray(l, dtype=float)
+    d = np.asarray(d, dtype=float)
+    if (l < 0).any() or (l >= 1).any() or (d < 0).any() or (d >= 1).any():
+        raise ValueError("must have peel coords in interval [0, 1)")
+    v0, v1, v2, v3 = [v[spc_indices] for v in HALF_PEEL_VERTEX_ARRAYS]
+
+    # upward face (l >= d) moves l-d along the 1 edge and d along the 2 edge,
+    # downward face (d > l) moves l along the 2 edge and d-l along the 3 edge
+    # on the diagonal l == d both are the same point
+    up = (l >= d)[:, None]
+    dl_coefficient = np.where(up[:, 0], d, l)[:, None]
+    other_coefficient = np.abs(l - d)[:, None]
+    other_vector = np.where(up, v1 - v0, v3 - v0)
+    xyz_on_plane = v0 + (other_coefficient * other_vector + dl_coefficient * (v2 - v0))
+    xyz_on_sphere = xyz_on_plane / np.linalg.norm(xyz_on_plane, axis=1)[:, None]
+
+    at_starting_point = (l == 0) & (d == 0)
+    xyz_on_sphere[at_starting_point] = v0[at_starting_point]
+    return xyz_on_sphere
@@ -0,0 +1,191 @@
+# fields on a whole iteration stored as the ten half-peel squares (see PeelCoordinates), plus the two poles
+# squares[s, l, d] is the point of starting point C + s (C, D, E, ..., L) with peel coordinates l and d (each 0 to 2**n - 1),
+# so moving in direction 1 is l + 1, 2 is l + 1 and d + 1, 3 is d + 1 (and the opposite directions subtract),
+# and the neighbors of every point in a square are slices of the square with a one-cell border (halo) around it
+
+# the halo is filled from the neighboring squares (and poles) with the same seam rules as AdjacencyArrays,
+# including the refraction across the CA and DB edges, so the six neighbor views of a padded array
+# are the neighbors in the neighbor table's direction order, except:
+# - each square's starting point (at l = d = 0) is a pentagon with one direction missing, and its view in that direction
+#   holds whatever the halo has there for the point next to it, so stencils should use get_neighbor_mask
+# - the halo corners at (-1, 2**n) and (2**n, -1) are never anyone's neighbor and hold fill_value
+# - the poles aren't in any square, and their neighbors come from get_pole_neighbor_indices
+
+# "flat" indices are positions in the field with the poles first and then the squares raveled: A, B, squares[0, 0, 0], ...
+# (this is not canonical order, which goes through each square in the order of its digits, see split_field_into_squares)
+
+
+import functools
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.AdjacencyArrays import ADJACENCY_DIRECTIONS, NO_NEIGHBOR, get_adjacency_array_from_packed_codes, get_neighbor_array_from_packed_codes
+from icosalattice.PackedPointCodes import C_INDEX, N_SQUARES, DIRECTION_TO_LD_OFFSET
+
+
+def get_square_size(iterations):
+    return 1 << iterations
+
+
+def get_flat_indices_of_packed_codes(ppcs):
+    spc_indices, l, d, n = ppc.unpack_l_and_d_array(ppcs)
+    size = np.left_shift(1, n, dtype=np.int64)
+    return np.where(spc_indices < C_INDEX, spc_indices, 2 + ((spc_indices - C_INDEX) * size + l) * size + d)
+
+
+def get_packed_codes_of_flat_indices(flat_indices, iterations):
+    flat_indices = np.asarray(flat_indices, dtype=np.int64)
+    size = get_square_size(iterations)
+    is_pole = flat_indices < 2
+    rest = np.maximum(flat_indices - 2, 0)
+    square, rest = np.divmod(rest, size * size)
+    l, d = np.divmod(rest, size)
+    spc_indices = np.where(is_pole, flat_indices, C_INDEX + square)
+    return ppc.pack_l_and_d_array(spc_indices, np.where(is_pole, 0, l), np.where(is_pole, 0, d), np.full(len(flat_indices), iterations))
+
+
+@functools.lru_cache(maxsize=32)
+def get_canonical_indices_of_flat_layout(iterations):
+    # canonical index of each flat position, so field_in_canonical_order[this] is the field in the flat layout
+    n_points = 2 + N_SQUARES * get_square_size(iterations) ** 2
+    res = gpc.get_canonical_indices_from_packed_codes(get_packed_codes_of_flat_indices(np.arange(n_points), iterations))
+    res.flags.writeable = False
+    return res
+
+
+def split_field_into_squares(values, iterations):
+    # values in canonical order (leading axis over points) -> (squares with shape (10, 2**n, 2**n, ...), poles with shape (2, ...))
+    values = np.asarray(values)
+    size = get_square_size(iterations)
+    flat = values[get_canonical_indices_of_flat_layout(iterations)]
+    return flat[2:].reshape((N_SQUARES, size, size) + values.shape[1:]), flat[:2]
+
+
+def join_squares_into_field(squares, poles):
+    # inverse of split_field_into_squares
+    squares = np.asarray(squares)
+    iterations = squares.shape[1].bit_length() - 1
+    flat = np.concatenate([np.asarray(poles, dtype=squares.dtype), squares.reshape((-1,) + squares.shape[3:])])
+    res = np.empty_like(flat)
+    res[get_canonical_indices_of_flat_layout(iterations)] = flat
+    return res
+
+
+# ---- halo ---- #
+
+
+def _get_halo_candidates(size):
+    # for each halo cell (padded coordinates), the (interior l, interior d, direction) it can be reached from,
+    # in order of preference: a pentagon has one of them missing, but the other one is then still there
+    top = size - 1
+    candidates = []
+    for i in range(size):
+        candidates.append(((0, i + 1), [(0, i, -1), (0, i + 1, -2)]))
+        candidates.append(((size + 1, i + 1), [(top, i, 1), (top, i - 1, 2)]))
+        candidates.append(((i + 1, 0), [(i, 0, -3), (i + 1, 0, -2)]))
+        candidates.append(((i + 1, size + 1), [(i, top, 3), (i - 1, top, 2)]))
+    candidates.append(((0, 0), [(0, 0, -2)]))
+    candidates.append(((size + 1, size + 1), [(top, top, 2)]))
+    return candidates
+
+
+@functools.lru_cache(maxsize=32)
+def get_halo_source_indices(iterations):
+    # (halo rows, halo cols, sources) where sources has shape (10, len(halo rows)) and holds the flat index
+    # of the point in each square's halo cell (padded coordinates), or NO_NEIGHBOR
+    size = get_square_size(iterations)
+    squares = np.arange(N_SQUARES)
+    candidates = _get_halo_candidates(size)
+    rows = np.array([cell[0] for cell, _ in candidates])
+    cols = np.array([cell[1] for cell, _ in candidates])
+    sources = np.full((N_SQUARES, len(candidates)), NO_NEIGHBOR, dtype=np.int64)
+    for rank in range(2):
+        for j, (cell, options) in enumerate(candidates):
+            if rank >= len(options):
+                continue
+            l, d, direction = options[rank]
+            if not (0 <= l < size and 0 <= d < size):
+                continue
+            unfilled = sources[:, j] == NO_NEIGHBOR
+            if not unfilled.any():
+                continue
+            ppcs = ppc.pack_l_and_d_array(C_INDEX + squares[unfilled], np.full(unfilled.sum(), l), np.full(unfilled.sum(), d), np.full(unfilled.sum(), iterations))
+            neighbors = get_adjacency_array_from_packed_codes(ppcs)[:, ADJACENCY_DIRECTIONS.index(direction)]
+            exists = neighbors != NO_NEIGHBOR
+            filled = np.flatnonzero(unfilled)[exists]
+            sources[filled, j] = get_flat_indices_of_packed_codes(neighbors[exists])
+    for a in [rows, cols, sources]:
+        a.flags.writeable = False
+    return rows, cols, sources
+
+
+def add_halo(squares, poles, fill_value=np.nan):
+    # (10, 2**n + 2, 2**n + 2, ...) padded copy of squares with the halo filled in
+    squares = np.asarray(squares)
+    size = squares.shape[1]
+    dtype = np.result_type(squares.dtype, np.min_scalar_type(fill_value)) if np.isscalar(fill_value) else squares.dtype
+    padded = np.empty((N_SQUARES, size + 2, size + 2) + squares.shape[3:], dtype=dtype)
+    padded[:, 1:-1, 1:-1] = squares
+    exchange_halo(padded, poles, fill_value=fill_value)
+    return padded
+
+
+def exchange_halo(padded, poles, fill_value=np.nan):
+    # refill the halo of a padded array (e.g. from add_halo) in place from its interior, after the interior has been updated
+    size = padded.shape[1] - 2
+    iterations = size.bit_length() - 1
+    rows, cols, sources = get_halo_source_indices(iterations)
+    interior = padded[:, 1:-1, 1:-1]
+    flat = np.concatenate([np.asarray(poles, dtype=padded.dtype), interior.reshape((-1,) + padded.shape[3:])])
+    values = flat[np.maximum(sources, 0)]
+    values[sources == NO_NEIGHBOR] = fill_value
+    padded[:, rows, cols] = values
+    padded[:, 0, -1] = fill_value
+    padded[:, -1, 0] = fill_value
+    return padded
+
+
+def get_neighbor_views(padded):
+    # six (10, 2**n, 2**n, ...) views of a padded array, in direction order [1, 2, 3, -1, -2, -3]
+    size = padded.shape[1] - 2
+    views = []
+    for direction in ADJACENCY_DIRECTIONS:
+        dl, dd = DIRECTION_TO_LD_OFFSET[direction]
+        views.append(padded[:, 1 + dl:1 + dl + size, 1 + dd:1 + dd + size])
+    return views
+
+
+@functools.lru_cache(maxsize=32)
+def get_neighbor_mask(iterations):
+    # (6, 10, 2**n, 2**n) whether each neighbor view is a real neighbor (False only at the starting points' missing directions)
+    size = get_square_size(iterations)
+    mask = np.ones((len(ADJACENCY_DIRECTIONS), N_SQUARES, size, size), dtype=bool)
+    corners = ppc.pack_l_and_d_array(C_INDEX + np.arange(N_SQUARES), np.zeros(N_SQUARES), np.zeros(N_SQUARES), np.full(N_SQUARES, iterations))
+    missing_square, missing_column = np.nonzero(get_adjacency_array_from_packed_codes(corners) == NO_NEIGHBOR)
+    mask[missing_column, missing_square, 0, 0] = False
+    mask.flags.writeable = False
+    return mask
+
+
+@functools.lru_cache(maxsize=32)
+def get_pole_neighbor_indices(iterations):
+    # (2, 5) flat indices of the neighbors of A and B
+    poles = ppc.pack_l_and_d_array([0, 1], [0, 0], [0, 0], [iterations, iterations])
+    res = get_flat_indices_of_packed_codes(get_neighbor_array_from_packed_codes(poles)[:, :5])
+    res.flags.writeable = False
+    return res
+
+
+def get_neighbor_mean(squares, poles):
+    # mean of each point's neighbors, as (squares, poles), e.g. for smoothing a field
+    squares = np.asarray(squares, dtype=float)
+    poles = np.asarray(poles, dtype=float)
+    iterations = squares.shape[1].bit_length() - 1
+    views = get_neighbor_views(add_halo(squares, poles, fill_value=0))
+    mask = get_neighbor_mask(iterations)
+    total = sum(np.where(m, v, 0) for m, v in zip(mask, views))
+    res_squares = total / mask.sum(axis=0)
+    flat = np.concatenate([poles, squares.ravel()])
+    res_poles = flat[get_pole_neighbor_indices(iterations)].mean(axis=1)
+    return res_squares, res_poles
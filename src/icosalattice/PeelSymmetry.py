@@ -0,0 +1,199 @@
+# building whole-level tables (xyz, neighbor table, cell areas, edge lengths) from a fraction of the points,
+# copying the rest by the icosahedron's symmetries, which all the point placement methods respect
+
+# - rotation: the five peels are copies of the CD peel rotated by 72 degrees about the z axis (see PointCodeArithmetic.normalize_peel),
+#   and in canonical order peel p is the block of indices [2 + p * 2 * 4**n, 2 + (p + 1) * 2 * 4**n),
+#   so peel p's rows are the CD peel's rows, with xyz rotated by p * 72 degrees and neighbor indices moved over by p peels
+# - mirror: the watershed of each starting point is symmetric across the great circle through its 2-direction diagonal
+#   (as in CoordinatesByRThetaAdjustment), which swaps l and d, so only the half with l >= d is computed,
+#   and the other half is its reflection, with directions 1 and 3 swapped
+# so the geometry is computed for the poles and a fifth of the other points (a tenth with the mirror)
+
+# the neighbor table only uses the rotation, since it is made of indices rather than geometry
+# cell areas and edge lengths are on the unit sphere
+
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.Iterations as it
+import icosalattice.PackedPointCodes as ppc
+import icosalattice.StartingPoints as sp
+from icosalattice.AdjacencyArrays import get_neighbor_array_from_packed_codes, NO_NEIGHBOR
+from icosalattice.CoordinatesOfPointCode import get_xyz_array_function
+from icosalattice.PackedPointCodes import N_PEELS
+
+
+PEEL_ANGLE = 2 * np.pi / N_PEELS
+
+# neighbor table columns are directions [1, 2, 3, -1, -2, -3], and the mirror swaps 1 and 3
+MIRRORED_DIRECTION_COLUMNS = [2, 1, 0, 5, 4, 3]
+
+
+def get_peel_rotation_matrix(peel_offset):
+    # rotation taking the CD peel to the peel peel_offset to the east (e.g. 1 for EF)
+    a = peel_offset * PEEL_ANGLE
+    return np.array([
+        [np.cos(a), -np.sin(a), 0],
+        [np.sin(a), np.cos(a), 0],
+        [0, 0, 1],
+    ])
+
+
+def get_peel_block_size(iterations):
+    # number of points in each peel (both of its starting points' watersheds)
+    return 2 * 4 ** iterations
+
+
+def get_symmetry_representative_indices(iterations, use_rotation=True, use_mirror=True):
+    # canonical indices of the points that are computed directly: the poles,
+    # then the CD peel (or all the peels, without the rotation), only the halves with l >= d if use_mirror
+    stop = 2 + get_peel_block_size(iterations) if use_rotation else it.get_exact_n_points_from_iterations(iterations)
+    indices = np.arange(2, stop, dtype=np.int64)
+    if use_mirror:
+        _, l, d, _ = ppc.unpack_l_and_d_array(gpc.get_packed_codes_from_canonical_indices(indices, iterations))
+        indices = indices[l >= d]
+    return np.concatenate([np.arange(2, dtype=np.int64), indices])
+
+
+def get_mirror_canonical_indices(indices, iterations):
+    # the points with l and d swapped (in the same starting point's watershed), for non-pole canonical indices
+    spc_indices, l, d, n = ppc.unpack_l_and_d_array(gpc.get_packed_codes_from_canonical_indices(indices, iterations))
+    return gpc.get_canonical_indices_from_packed_codes(ppc.pack_l_and_d_array(spc_indices, d, l, n))
+
+
+def get_starting_point_indices(indices, iterations):
+    indices = np.asarray(indices, dtype=np.int64)
+    return np.where(indices < 2, indices, 2 + (np.maximum(indices, 2) - 2) // 4 ** iterations)
+
+
+def get_mirror_plane_normals(method=None):
+    # (12, 3) unit normals of the planes through each starting point's 2-direction diagonal, zero for the poles
+    f_xyz = get_xyz_array_function(method)
+    normals = np.zeros((len(sp.STARTING_POINT_CODES), 3))
+    for i, spc in enumerate(sp.STARTING_POINT_CODES):
+        if spc in sp.POLES:
+            continue
+        ends = ppc.get_packed_code_array_from_point_codes([spc, sp.STARTING_DIRECTIONAL_DICT[spc]["2"]])
+        normal = np.cross(*f_xyz(ends))
+        normals[i] = normal / np.linalg.norm(normal)
+    return normals
+
+
+def expand_by_symmetry(values, iterations, rotate=None, mirror=None, use_rotation=True, use_mirror=True):
+    # a table over all points at this iteration from values at get_symmetry_representative_indices
+    # rotate(block_values, peel_offset) gives a peel's values from the CD peel's (default: the same values)
+    # mirror(indices, values) gives the values at the mirror images of these points (default: the same values)
+    indices = get_symmetry_representative_indices(iterations, use_rotation=use_rotation, use_mirror=use_mirror)
+    values = np.asarray(values)
+    if len(values) != len(indices):
+        raise ValueError(f"got {len(values)} values for {len(indices)} representative points")
+    res = np.empty((it.get_exact_n_points_from_iterations(iterations),) + values.shape[1:], dtype=values.dtype)
+    res[indices] = values
+
+    if use_mirror:
+        # points on the diagonal are their own mirror images, so they keep their computed values
+        indices = indices[2:]
+        values = values[2:]
+        mirror_indices = get_mirror_canonical_indices(indices, iterations)
+        off_diagonal = mirror_indices != indices
+        mirror_values = values[off_diagonal] if mirror is None else mirror(indices[off_diagonal], values[off_diagonal])
+        res[mirror_indices[off_diagonal]] = mirror_values
+
+    if use_rotation:
+        copy_cd_peel_to_other_peels(res, iterations, rotate=rotate)
+    return res
+
+
+def copy_cd_peel_to_other_peels(table, iterations, rotate=None):
+    # fill the other peels' rows of a table over all points from its CD peel rows, in place
+    block_size = get_peel_block_size(iterations)
+    block = table[2:2 + block_size]
+    for peel_offset in range(1, N_PEELS):
+        start = 2 + peel_offset * block_size
+        table[start:start + block_size] = block if rotate is None else rotate(block, peel_offset)
+
+
+def rotate_neighbor_indices(indices, peel_offset, iterations):
+    # canonical indices of the points peel_offset peels east of these, keeping poles and NO_NEIGHBOR
+    indices = np.asarray(indices)
+    n_non_poles = N_PEELS * get_peel_block_size(iterations)
+    shifted = 2 + (indices - 2 + peel_offset * get_peel_block_size(iterations)) % n_non_poles
+    return np.where(indices < 2, indices, shifted).astype(indices.dtype)
+
+
+# ---- tables ---- #
+
+
+def build_xyz_table(iterations, method=None, use_rotation=True, use_mirror=True):
+    # (N, 3) positions of all the points, in canonical order
+    f_xyz = get_xyz_array_function(method)
+    indices = get_symmetry_representative_indices(iterations, use_rotation=use_rotation, use_mirror=use_mirror)
+    xyz = f_xyz(gpc.get_packed_codes_from_canonical_indices(indices, iterations))
+
+    def rotate(block_xyz, peel_offset):
+        return block_xyz @ get_peel_rotation_matrix(peel_offset).T
+
+    normals = get_mirror_plane_normals(method)
+
+    def mirror(indices, xyz):
+        n = normals[get_starting_point_indices(indices, iterations)]
+        return xyz - 2 * np.sum(xyz * n, axis=1, keepdims=True) * n
+
+    return expand_by_symmetry(xyz, iterations, rotate=rotate, mirror=mirror, use_rotation=use_rotation, use_mirror=use_mirror)
+
+
+def _get_neighbor_xyz(ppcs, f_xyz):
+    # (N, 6, 3) positions of the neighbors in the neighbor table's column order, and where there are neighbors
+    neighbors = get_neighbor_array_from_packed_codes(ppcs)
+    has_neighbor = neighbors != NO_NEIGHBOR
+    neighbor_xyz = np.full(neighbors.shape + (3,), np.nan)
+    neighbor_xyz[has_neighbor] = f_xyz(neighbors[has_neighbor])
+    return neighbor_xyz, has_neighbor
+
+
+def get_angles_between_unit_vectors(xyz1, xyz2):
+    # accurate for small angles too, unlike arccos of the dot product
+    return np.arctan2(np.linalg.norm(np.cross(xyz1, xyz2), axis=-1), np.sum(xyz1 * xyz2, axis=-1))
+
+
+def get_areas_of_spherical_triangles(xyz1, xyz2, xyz3):
+    # on the unit sphere (Van Oosterom and Strackee), for arrays of vertices
+    numerator = np.abs(np.sum(xyz1 * np.cross(xyz2, xyz3), axis=-1))
+    denominator = 1 + np.sum(xyz1 * xyz2, axis=-1) + np.sum(xyz2 * xyz3, axis=-1) + np.sum(xyz3 * xyz1, axis=-1)
+    return 2 * np.arctan2(numerator, denominator)
+
+
+def build_edge_length_table(iterations, method=None, use_rotation=True, use_mirror=True):
+    # (N, 6) great-circle distances to the neighbors in the neighbor table (see AdjacencyGraph), inf where there isn't one
+    f_xyz = get_xyz_array_function(method)
+    indices = get_symmetry_representative_indices(iterations, use_rotation=use_rotation, use_mirror=use_mirror)
+    ppcs = gpc.get_packed_codes_from_canonical_indices(indices, iterations)
+    neighbor_xyz, has_neighbor = _get_neighbor_xyz(ppcs, f_xyz)
+    lengths = np.where(has_neighbor, get_angles_between_unit_vectors(f_xyz(ppcs)[:, None, :], neighbor_xyz), np.inf)
+    mirror = lambda indices, lengths: lengths[:, MIRRORED_DIRECTION_COLUMNS]
+    return expand_by_symmetry(lengths, iterations, mirror=mirror, use_rotation=use_rotation, use_mirror=use_mirror)
+
+
+def build_cell_area_table(iterations, method=None, use_rotation=True, use_mirror=True):
+    # (N,) area of each point's cell: a third of each spherical triangle it makes with two consecutive neighbors,
+    # so the cells add up to the whole sphere (4 pi)
+    f_xyz = get_xyz_array_function(method)
+    indices = get_symmetry_representative_indices(iterations, use_rotation=use_rotation, use_mirror=use_mirror)
+    ppcs = gpc.get_packed_codes_from_canonical_indices(indices, iterations)
+    xyz = f_xyz(ppcs)[:, None, :]
+    neighbor_xyz, has_neighbor = _get_neighbor_xyz(ppcs, f_xyz)
+
+    # the columns go around the point, so roll each row to put its missing column (if any) last,
+    # then consecutive columns make triangles, and a point with 5 neighbors closes its ring from the 5th to the 1st
+    missing = ~has_neighbor
+    has_missing = missing.any(axis=1)
+    order = (np.where(has_missing, np.argmax(missing, axis=1) + 1, 0)[:, None] + np.arange(6)) % 6
+    neighbor_xyz = np.take_along_axis(neighbor_xyz, order[:, :, None], axis=1)
+    next_columns = np.tile((np.arange(6) + 1) % 6, (len(ppcs), 1))
+    next_columns[has_missing, 4] = 0
+    next_xyz = np.take_along_axis(neighbor_xyz, next_columns[:, :, None], axis=1)
+    triangle_areas = get_areas_of_spherical_triangles(xyz, neighbor_xyz, next_xyz)
+    triangle_areas[has_missing, 5] = 0
+    areas = triangle_areas.sum(axis=1) / 3
+    return expand_by_symmetry(areas, iterations, use_rotation=use_rotation, use_mirror=use_mirror)
@@ -1,9 +1,7 @@
 # implementing the "arithmetic" on point code strings
 # to try to remove the need for recursion as much as possible in computing adjacency
 
-import functools
-
-from icosalattice.BoxCornerMapping import correct_reversed_edge_polarity, point_code_is_in_reversed_polarity_encoding, reverse_edge_polarity
+import icosalattice.LatticeCoordinates as lc
 import icosalattice.StartingPoints as sp
 
 
@@ -21,8 +19,21 @@ def add_direction_to_point_code(pc, x, fix_edge_polarity=True, debug=False):
     if pc is None:
         return None
 
+    if fix_edge_polarity:
+        # top-level call: step in integer lattice coordinates, where the seams are a table lookup (see LatticeCoordinates)
+        # invalid directions give None, as the case analysis below does
+        if x not in lc.DIRECTION_TO_LD_OFFSET:
+            dprint(f"invalid direction {x!r} from {pc}")
+            return None
+        coords = lc.get_lattice_coordinates_from_point_code(pc)
+        res = lc.add_direction_to_lattice_coordinates(coords, x)
+        res = None if res is None else lc.get_point_code_from_lattice_coordinates(res)
+        dprint(f"adding {x:+} to {pc} at lattice coordinates {tuple(coords)}: {res}")
+        return res
+
+    # the rest is the original case analysis on strings, only reached with fix_edge_polarity=False (including its own
+    # recursive calls), whose results can be in reversed-polarity encoding (e.g. A + 3 = K on the reversed K-A edge)
     pc, peel_offset = normalize_peel(pc)
-    reference_peel = "CD"  # since we normalized, but need to make sure to update this if we move elsewhere
     head = pc[0]
     tail = pc[1:]
     initial_points_results = {
@@ -34,12 +45,7 @@ def add_direction_to_point_code(pc, x, fix_edge_polarity=True, debug=False):
 
     dprint(f"adding {x:+} to {pc}")
 
-    if fix_edge_polarity and pc[0] in ["A", "B"]:
-        # fix_edge_polarity indicates that we are in top-level call
-        # it's okay to do like A + 3 = K in intermediate calls (with reversed K-A edge)
-        # raise DisallowedDirectionException(f"directions from poles are ill-defined: {pc=}, {x=}")
-        res = None
-    elif len(pc) == 1:
+    if len(pc) == 1:
         res = initial_points_results[pc].get(x)
         dprint(f"case: initial point; {res=}")
     else:
@@ -62,9 +68,6 @@ def add_direction_to_point_code(pc, x, fix_edge_polarity=True, debug=False):
                 dprint(f"{pc} +1+3 = {y13} ; {pc} +3+1 = {y31}")
                 assert y13 == y31
                 res = y13
-                if res[0] in ["A", "B"]:
-                    # we moved off the left or bottom edge of CD peel
-                    reference_peel = "KL"
                 dprint(f"case: x=2; {res=}")
             
             # special case of C1 - 2 = E2, calculating this as -1-3 gives None
@@ -161,16 +164,8 @@ def add_direction_to_point_code(pc, x, fix_edge_polarity=True, debug=False):
                     res = None
                 else:
                     res = new_head + new_tail
-                    if res[0] in ["A", "B"]:
-                        # we moved off the left or bottom edge of CD peel
-                        reference_peel = "KL"
                     dprint(f"case: {x=}, not on reversed edge; {res=}")
 
-    # only fix the edge polarity at the very final result, 
-    # but before reapplying offset (so we still know reference peel is whatever we set it to, usually CD)
-    if res is not None and fix_edge_polarity and point_code_is_in_reversed_polarity_encoding(res):
-        res = correct_reversed_edge_polarity(res, reference_peel)
-
     if res is not None:
         pc = apply_peel_offset(pc, peel_offset)
         res = apply_peel_offset(res, peel_offset)
@@ -4,21 +4,40 @@
 
 import numpy as np
 
-import icosalattice.PointCodeArithmetic as pca
+import icosalattice.LatticeCoordinates as lc
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.CoordinatesOfPointCode import get_xyz_array_function
 
 
 def get_point_path(pc_init, pc_final, direction):
-    pcs = [pc_init]
-    last_pc_added = pc_init
-    pcs_seen = {pc_init}
-    while last_pc_added != pc_final:
-        next_pc = pca.add_direction_to_point_code(last_pc_added, direction)
-        if next_pc in pcs_seen:
-            raise RuntimeError(f"loop detected: point code {next_pc} is already in the path in the {direction} direction from {pc_init}, so the destination {pc_final} will never be reached")
-        pcs.append(next_pc)
-        pcs_seen.add(next_pc)
-        last_pc_added = next_pc
-    return pcs
+    # the points from pc_init to pc_final going in one direction, found a run of the line at a time (see LatticeCoordinates)
+    start = lc.get_lattice_coordinates_from_point_code(pc_init)
+    spc_final, l_final, d_final, n_final = lc.get_lattice_coordinates_from_point_code(pc_final)
+    dl, dd = lc.DIRECTION_TO_LD_OFFSET[direction]
+    n_steps = 0
+    runs_seen = set()
+    for run_start, length in lc.iterate_line_runs(start, direction):
+        if run_start in runs_seen:
+            raise RuntimeError(f"loop detected: point code {lc.get_point_code_from_lattice_coordinates(run_start)} is already in the path in the {direction} direction from {pc_init}, so the destination {pc_final} will never be reached")
+        runs_seen.add(run_start)
+        spc, l, d, n = run_start
+        if spc == spc_final and n == n_final:
+            # the step along the run that gets to (l_final, d_final), if any
+            steps = [(l_final - l) * dl if dl != 0 else None, (d_final - d) * dd if dd != 0 else None]
+            steps_along = {s for s in steps if s is not None}
+            on_line = (dl != 0 or l_final == l) and (dd != 0 or d_final == d) and len(steps_along) == 1
+            if on_line and 0 <= min(steps_along) < length:
+                n_steps += min(steps_along)
+                return ppc.get_point_code_array_from_packed_codes(lc.get_line_packed_codes(ppc.get_packed_code_from_point_code(pc_init), direction, n_steps)).tolist()
+        n_steps += length
+    raise RuntimeError(f"the path in the {direction} direction from {pc_init} ends before reaching the destination {pc_final}")
+
+
+def get_point_path_arrays(pc_init, direction, n_steps, method=None):
+    # (packed codes, xyz) of the line from pc_init through n_steps steps in one direction, starting with pc_init
+    # (shorter if the line runs into a pole or a pentagon's missing direction first)
+    ppcs = lc.get_line_packed_codes(ppc.get_packed_code_from_point_code(pc_init), direction, n_steps)
+    return ppcs, get_xyz_array_function(method)(ppcs)
 
 
 def get_stepwise_path_distances_and_angles_2d(xs, ys):
@@ -0,0 +1,96 @@
+# growing a connected region of lattice points outward from seeds, one ring at a time
+# replaces get_region_around_point_code_by_spreading (quarantined in IcosahedronMath)
+
+# works on canonical indices at a single iteration, and keeps only the current ring and the one before it:
+# in breadth-first order, the accepted neighbors of a ring are all in the ring before it, the ring itself, or the next one,
+# so nothing further back needs to be remembered to avoid going backwards
+# (points that fail the predicate aren't remembered either, so they may be tested again from a later ring)
+
+# the predicate gets a whole ring's indices at once and returns a boolean array of which ones belong to the region
+
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+from icosalattice.AdjacencyArrays import get_neighbor_array_from_packed_codes, NO_NEIGHBOR
+from icosalattice.CoordinatesOfPointCode import get_xyz_array_function
+from icosalattice.NearestPointCodes import get_nearest_packed_codes_to_xyz_array
+from icosalattice.RegionQueries import get_angle_between_unit_vectors, get_center_xyz
+
+
+def get_neighbor_indices(indices, iterations, neighbor_table=None):
+    # (N, 6) canonical indices of neighbors, NO_NEIGHBOR where there isn't one
+    # uses the neighbor table (see AdjacencyGraph) if given, otherwise computes them from the codes
+    if neighbor_table is not None:
+        return np.asarray(neighbor_table[indices], dtype=np.int64)
+    neighbors = get_neighbor_array_from_packed_codes(gpc.get_packed_codes_from_canonical_indices(indices, iterations))
+    exists = neighbors != NO_NEIGHBOR
+    res = np.full(neighbors.shape, NO_NEIGHBOR, dtype=np.int64)
+    res[exists] = gpc.get_canonical_indices_from_packed_codes(neighbors[exists])
+    return res
+
+
+def iterate_region_rings(seeds, predicate, iterations, neighbor_table=None):
+    # yields the region one ring at a time (sorted canonical indices), starting with the seeds that pass the predicate
+    seeds = np.unique(np.asarray(seeds, dtype=np.int64))
+    ring = seeds[predicate(seeds)]
+    previous_ring = np.array([], dtype=np.int64)
+    while len(ring) > 0:
+        yield ring
+        candidates = np.unique(get_neighbor_indices(ring, iterations, neighbor_table))
+        candidates = candidates[candidates != NO_NEIGHBOR]
+        candidates = candidates[~np.isin(candidates, ring, assume_unique=True)]
+        candidates = candidates[~np.isin(candidates, previous_ring, assume_unique=True)]
+        previous_ring, ring = ring, candidates[predicate(candidates)]
+
+
+def grow_region(seeds, predicate, iterations, neighbor_table=None):
+    # sorted canonical indices of all points connected to the seeds through points passing the predicate
+    rings = list(iterate_region_rings(seeds, predicate, iterations, neighbor_table))
+    if len(rings) == 0:
+        return np.array([], dtype=np.int64)
+    return np.sort(np.concatenate(rings))
+
+
+# ---- predicates ---- #
+
+
+def get_distance_predicate(center, max_distance, iterations, planet_radius=1, method=None):
+    # points within great-circle distance max_distance of center (a point code or xyz)
+    center_xyz = get_center_xyz(center, method)
+    f_xyz = get_xyz_array_function(method)
+    max_angle = max_distance / planet_radius
+    def predicate(indices):
+        xyz = f_xyz(gpc.get_packed_codes_from_canonical_indices(indices, iterations))
+        return get_angle_between_unit_vectors(xyz, center_xyz) <= max_angle
+    return predicate
+
+
+def get_mask_predicate(mask):
+    # points where the boolean array mask (indexed by canonical index) is True
+    mask = np.asarray(mask, dtype=bool)
+    return lambda indices: mask[indices]
+
+
+def get_field_threshold_predicate(field, min_value=None, max_value=None):
+    # points where the field (indexed by canonical index) is in [min_value, max_value]
+    field = np.asarray(field)
+    def predicate(indices):
+        values = field[indices]
+        res = np.ones(len(indices), dtype=bool)
+        if min_value is not None:
+            res &= values >= min_value
+        if max_value is not None:
+            res &= values <= max_value
+        return res
+    return predicate
+
+
+def get_region_around_point_by_spreading(center, max_distance, iterations, planet_radius=1, method=None, neighbor_table=None):
+    # sorted canonical indices of the points at this iteration within max_distance of center,
+    # grown from the nearest point to center
+    center_xyz = get_center_xyz(center, method)
+    seed_ppcs, _ = get_nearest_packed_codes_to_xyz_array(center_xyz[None, :], iterations=iterations, method=method)
+    seeds = gpc.get_canonical_indices_from_packed_codes(seed_ppcs)
+    predicate = get_distance_predicate(center_xyz, max_distance, iterations, planet_radius=planet_radius, method=method)
+    return grow_region(seeds, predicate, iterations, neighbor_table=neighbor_table)
@@ -0,0 +1,189 @@
+# finding all the lattice points at an iteration that lie in a region of the sphere, without looking at every point
+
+# the descendants of a code form a small patch around it (its watershed), and at iteration n they are one contiguous
+# range of canonical indices (see HierarchicalOrder), so the query descends the code hierarchy from the starting points:
+# - a code whose whole watershed is inside the region is emitted as a range without looking at its descendants
+# - a code whose watershed is entirely outside is dropped
+# - otherwise it is split into its 4 sub-watersheds (appending each digit), until iteration n, where the points are tested
+# so the work is proportional to the number of cells along the region's boundary, not the number of points in it
+
+# whether a watershed is inside or outside is decided from a cap containing it (see BoundingCaps):
+# from the bounding cap hierarchy down to its depth, and below that a cap around the code's own point
+# results are sorted, merged (starts, stops) arrays of canonical indices at iteration n
+
+
+import numpy as np
+import shapely
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.Iterations as it
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.BoundingCaps import (
+    get_angle_between_unit_vectors, get_first_child_canonical_indices, get_watershed_cap_radii,
+    get_bounding_caps, get_bounding_caps_of_canonical_indices, get_bounding_cap_depth,
+)
+from icosalattice.CoordinatesOfPointCode import get_xyz_array_function
+from icosalattice.HierarchicalOrder import merge_index_ranges, get_mask_from_index_ranges
+
+
+def get_center_xyz(center, method=None):
+    # center of a region given as a point code or a vector
+    if isinstance(center, str):
+        return get_xyz_array_function(method)(ppc.get_packed_code_array_from_point_codes([center]))[0]
+    xyz = np.asarray(center, dtype=float).reshape(3)
+    return xyz / np.linalg.norm(xyz)
+
+
+def get_index_ranges_in_region(classify, iterations, method=None, bounding_caps=None):
+    # generic hierarchical descent
+    # classify(xyz, cap_radius) gets the caps around the watersheds of the codes on the frontier
+    # (at the last iteration, the points themselves with cap_radius 0),
+    # and returns an int array: 1 if the whole cap is in the region, -1 if none of it is, 0 if it can't tell
+    # (with cap_radius 0, it must not return 0)
+    # bounding_caps is (centers, radii) from BoundingCaps.get_bounding_caps, by default the cached default hierarchy
+    f_xyz = get_xyz_array_function(method)
+    radii = get_watershed_cap_radii(method)
+    if bounding_caps is None:
+        bounding_caps = get_bounding_caps(method=method)
+    bounding_cap_depth = get_bounding_cap_depth(bounding_caps[1])
+    starts = []
+    stops = []
+
+    # the poles have no descendants, so they are only ever points
+    poles = np.array([0, 1], dtype=np.int64)
+    pole_inside = classify(f_xyz(gpc.get_packed_codes_from_canonical_indices(poles, iterations)), np.zeros(2)) == 1
+    starts.append(poles[pole_inside])
+    stops.append(poles[pole_inside] + 1)
+
+    frontier = np.arange(2, 12, dtype=np.int64)
+    for p in range(iterations + 1):
+        if len(frontier) == 0:
+            break
+        if p == iterations:
+            cap_xyz = f_xyz(gpc.get_packed_codes_from_canonical_indices(frontier, p))
+            cap_radius = np.zeros(len(frontier))
+        elif p <= bounding_cap_depth:
+            cap_xyz, cap_radius = get_bounding_caps_of_canonical_indices(*bounding_caps, frontier, p)
+        else:
+            cap_xyz = f_xyz(gpc.get_packed_codes_from_canonical_indices(frontier, p))
+            cap_radius = np.full(len(frontier), radii[p])
+        classes = classify(cap_xyz, cap_radius)
+        inside = frontier[classes == 1]
+        first = get_first_child_canonical_indices(inside, iterations - p)
+        starts.append(first)
+        stops.append(first + (1 << (2 * (iterations - p))))
+        split = frontier[classes == 0]
+        if p == iterations and len(split) > 0:
+            raise ValueError("classify must decide for every point at the last iteration")
+        frontier = (get_first_child_canonical_indices(split)[:, None] + np.arange(4)).ravel()
+
+    return merge_index_ranges(np.concatenate(starts), np.concatenate(stops))
+
+
+def _format_index_ranges(starts, stops, iterations, as_mask):
+    if as_mask:
+        return get_mask_from_index_ranges(starts, stops, it.get_exact_n_points_from_iterations(iterations))
+    return starts, stops
+
+
+def points_in_cap(center, radius, iterations, planet_radius=1, method=None, bounding_caps=None, as_mask=False):
+    # canonical index ranges of the points at this iteration within great-circle distance radius of center
+    # (or a boolean mask over all the points, if as_mask)
+    # center is a point code or an xyz vector
+    center_xyz = get_center_xyz(center, method)
+    angle = radius / planet_radius
+
+    def classify(xyz, cap_radius):
+        d = get_angle_between_unit_vectors(xyz, center_xyz)
+        return np.where(d + cap_radius <= angle, 1, np.where(d - cap_radius > angle, -1, 0))
+
+    starts, stops = get_index_ranges_in_region(classify, iterations, method=method, bounding_caps=bounding_caps)
+    return _format_index_ranges(starts, stops, iterations, as_mask)
+
+
+# ---- lat/lon rectangles and polygons ---- #
+# these decide about caps by their lat/lon bounding boxes: a cap is inside if its box is, and outside if its box is
+# latitudes and longitudes are in degrees, longitudes in [-180, 180]
+
+
+def get_latlon_arrays_from_xyz(xyz):
+    xyz = np.asarray(xyz, dtype=float)
+    lat = np.degrees(np.arcsin(np.clip(xyz[..., 2], -1, 1)))
+    lon = np.degrees(np.arctan2(xyz[..., 1], xyz[..., 0]))
+    return lat, lon
+
+
+def get_latlon_bounding_boxes_of_caps(xyz, cap_radius):
+    # (min_lat, max_lat, center_lon, lon_half_width) of each cap, in degrees
+    # a cap around a pole covers all longitudes, which is a half width of 180 (but a point at a pole has its own longitude)
+    lat, lon = get_latlon_arrays_from_xyz(xyz)
+    r = np.degrees(cap_radius)
+    min_lat = lat - r
+    max_lat = lat + r
+    has_pole = ((max_lat >= 90) | (min_lat <= -90)) & (r > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.sin(np.radians(r)) / np.cos(np.radians(lat))
+    half_width = np.where(has_pole, 180, np.degrees(np.arcsin(np.clip(np.where(has_pole, 0, ratio), 0, 1))))
+    return np.maximum(min_lat, -90), np.minimum(max_lat, 90), lon, half_width
+
+
+def points_in_latlon_rectangle(min_lat, max_lat, min_lon, max_lon, iterations, method=None, bounding_caps=None, as_mask=False):
+    # points with min_lat <= lat <= max_lat and lon in [min_lon, max_lon]
+    # if min_lon > max_lon, the rectangle crosses the antimeridian (e.g. 170 to -170 is 20 degrees wide)
+    lon_width = max_lon - min_lon if min_lon <= max_lon else max_lon - min_lon + 360
+
+    def classify(xyz, cap_radius):
+        cap_min_lat, cap_max_lat, lon, half_width = get_latlon_bounding_boxes_of_caps(xyz, cap_radius)
+        # longitudes as offsets east of min_lon, so the rectangle is [0, lon_width]
+        offset = np.mod(lon - half_width - min_lon, 360)
+        covers_all_lons = half_width >= 180
+        lon_inside = np.where(covers_all_lons, lon_width >= 360, offset + 2 * half_width <= lon_width)
+        lon_outside = ~covers_all_lons & (offset > lon_width) & (offset + 2 * half_width < 360)
+        inside = (cap_min_lat >= min_lat) & (cap_max_lat <= max_lat) & lon_inside
+        outside = (cap_max_lat < min_lat) | (cap_min_lat > max_lat) | lon_outside
+        return np.where(inside, 1, np.where(outside, -1, 0))
+
+    starts, stops = get_index_ranges_in_region(classify, iterations, method=method, bounding_caps=bounding_caps)
+    return _format_index_ranges(starts, stops, iterations, as_mask)
+
+
+def get_polygon_from_latlons(latlons):
+    # shapely polygon (x = lon, y = lat) from a sequence of (lat, lon) vertices
+    latlons = np.asarray(latlons, dtype=float)
+    return shapely.Polygon(latlons[:, ::-1])
+
+
+def points_in_polygon(polygon, iterations, method=None, bounding_caps=None, as_mask=False):
+    # points inside or on the boundary of polygon, which is a shapely geometry (x = lon, y = lat, in degrees),
+    # e.g. a country's (Multi)Polygon, or a sequence of (lat, lon) vertices
+    # the geometry is taken as drawn on a lat/lon map, i.e. its edges are straight in lat/lon, not great circles
+    if not isinstance(polygon, shapely.Geometry):
+        polygon = get_polygon_from_latlons(polygon)
+    shapely.prepare(polygon)
+
+    def classify(xyz, cap_radius):
+        if (cap_radius == 0).all():
+            lat, lon = get_latlon_arrays_from_xyz(xyz)
+            return np.where(shapely.intersects_xy(polygon, lon, lat), 1, -1)
+
+        min_lat, max_lat, lon, half_width = get_latlon_bounding_boxes_of_caps(xyz, cap_radius)
+        covers_all_lons = half_width >= 180
+        west = np.where(covers_all_lons, -180, lon - half_width)
+        east = np.where(covers_all_lons, 180, lon + half_width)
+        # boxes over the antimeridian are split in two, the second part going in a second array of boxes
+        wraps_west = west < -180
+        wraps_east = east > 180
+        wraps = wraps_west | wraps_east
+        first = shapely.box(np.maximum(west, -180), min_lat, np.minimum(east, 180), max_lat)
+        second_west = np.where(wraps_west, west + 360, -180)
+        second_east = np.where(wraps_west, 180, east - 360)
+        second = shapely.box(second_west[wraps], min_lat[wraps], second_east[wraps], max_lat[wraps])
+
+        inside = shapely.covers(polygon, first)
+        outside = ~shapely.intersects(polygon, first)
+        inside[wraps] &= shapely.covers(polygon, second)
+        outside[wraps] &= ~shapely.intersects(polygon, second)
+        return np.where(inside, 1, np.where(outside, -1, 0))
+
+    starts, stops = get_index_ranges_in_region(classify, iterations, method=method, bounding_caps=bounding_caps)
+    return _format_index_ranges(starts, stops, iterations, as_mask)
@@ -0,0 +1,206 @@
+# regions of the sphere as unions of prefix cells, a compact alternative to sets of point code strings
+
+# a prefix cell is a point code together with all of its descendants (its watershed), at every iteration,
+# which is one range of hierarchical keys (see HierarchicalOrder)
+# so a region is stored as sorted, disjoint, merged ranges of keys:
+# - the ranges are the normalized cell union, split into cells only when asked for (see get_cells);
+#   four complete sibling cells are always one cell of their parent, since their ranges merge
+# - memory scales with the region's boundary, not its area
+# - union, intersection and difference are merges of sorted ranges
+# the region at a given iteration is the points of that iteration whose keys are in the ranges
+
+
+import zlib
+import numpy as np
+
+import icosalattice.PackedPointCodes as ppc
+import icosalattice.Iterations as it
+from icosalattice.GeneratePointCodes import get_packed_codes_from_canonical_indices
+from icosalattice.PackedPointCodes import MAX_ITERATIONS, ITERATION_MASK
+from icosalattice.HierarchicalOrder import (
+    get_hierarchical_key_array_from_packed_codes, get_packed_code_array_from_hierarchical_keys,
+    merge_index_ranges, get_indices_from_index_ranges, get_mask_from_index_ranges, get_index_ranges_from_mask,
+    get_key_ranges_from_index_ranges, get_index_ranges_from_key_ranges,
+)
+
+
+SERIALIZATION_HEADER = b"ICRG1"
+
+
+def _floor_log4(x):
+    # for int64 arrays of positive numbers
+    x = np.asarray(x, dtype=np.int64)
+    k = (np.frexp(x.astype(float))[1] - 1) // 2
+    # converting to float can round up past a power of 2
+    k -= (np.left_shift(1, 2 * k, dtype=np.int64) > x).astype(np.int64)
+    return k
+
+
+def _count_trailing_base_four_zeros(x):
+    # for int64 arrays of positive numbers
+    lowest_bit = x & -x
+    return _floor_log4(lowest_bit)
+
+
+def get_cell_key_range(ppcs):
+    # half-open key ranges of the cells of these packed codes (each cell at the code's own number of iterations)
+    ppcs = np.asarray(ppcs, dtype=np.int64)
+    keys = get_hierarchical_key_array_from_packed_codes(ppcs)
+    n = ppcs & ITERATION_MASK
+    sizes = np.where(keys < 2, 1, np.left_shift(1, 2 * (MAX_ITERATIONS - n), dtype=np.int64))
+    return keys, keys + sizes
+
+
+def _combine_key_ranges(starts1, stops1, starts2, stops2, op):
+    # ranges where op(in first, in second) is True
+    boundaries = np.unique(np.concatenate([starts1, stops1, starts2, stops2]))
+    if len(boundaries) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    # each elementary interval [boundaries[i], boundaries[i+1]) is entirely in or out of each region
+    lefts = boundaries[:-1]
+    def is_in(starts, stops):
+        i = np.searchsorted(starts, lefts, side="right") - 1
+        return (i >= 0) & (lefts < stops[np.maximum(i, 0)]) if len(starts) > 0 else np.zeros(len(lefts), dtype=bool)
+    keep = op(is_in(starts1, stops1), is_in(starts2, stops2))
+    return merge_index_ranges(lefts[keep], boundaries[1:][keep])
+
+
+class PointCodeRegion:
+    def __init__(self, key_starts=(), key_stops=()):
+        self.key_starts, self.key_stops = merge_index_ranges(key_starts, key_stops)
+
+    @classmethod
+    def from_packed_codes(cls, ppcs):
+        # union of the cells of these codes, so trailing zeros matter: "C1" includes "C13", "C10" doesn't
+        return cls(*get_cell_key_range(ppcs))
+
+    @classmethod
+    def from_point_codes(cls, pcs):
+        return cls.from_packed_codes(ppc.get_packed_code_array_from_point_codes(pcs))
+
+    @classmethod
+    def from_index_ranges(cls, starts, stops, iterations):
+        # from canonical index ranges of points at this iteration (e.g. from RegionQueries), including their descendants
+        return cls(*get_key_ranges_from_index_ranges(starts, stops, iterations))
+
+    @classmethod
+    def from_mask(cls, mask, iterations):
+        return cls.from_index_ranges(*get_index_ranges_from_mask(mask), iterations)
+
+    def __repr__(self):
+        return f"<PointCodeRegion of {len(self.key_starts)} key ranges>"
+
+    def __eq__(self, other):
+        if not isinstance(other, PointCodeRegion):
+            return NotImplemented
+        return np.array_equal(self.key_starts, other.key_starts) and np.array_equal(self.key_stops, other.key_stops)
+
+    def is_empty(self):
+        return len(self.key_starts) == 0
+
+    # ---- set algebra ---- #
+
+    def union(self, other):
+        return PointCodeRegion(np.concatenate([self.key_starts, other.key_starts]), np.concatenate([self.key_stops, other.key_stops]))
+
+    def intersection(self, other):
+        return PointCodeRegion(*_combine_key_ranges(self.key_starts, self.key_stops, other.key_starts, other.key_stops, np.logical_and))
+
+    def difference(self, other):
+        return PointCodeRegion(*_combine_key_ranges(self.key_starts, self.key_stops, other.key_starts, other.key_stops, lambda a, b: a & ~b))
+
+    def symmetric_difference(self, other):
+        return PointCodeRegion(*_combine_key_ranges(self.key_starts, self.key_stops, other.key_starts, other.key_stops, np.logical_xor))
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __xor__ = symmetric_difference
+
+    def contains_region(self, other):
+        return other.difference(self).is_empty()
+
+    # ---- points ---- #
+
+    def contains_packed_codes(self, ppcs):
+        # whether each point (not its whole cell) is in the region
+        keys = get_hierarchical_key_array_from_packed_codes(np.atleast_1d(ppcs))
+        i = np.searchsorted(self.key_starts, keys, side="right") - 1
+        res = (i >= 0) & (keys < self.key_stops[np.maximum(i, 0)]) if len(self.key_starts) > 0 else np.zeros(len(keys), dtype=bool)
+        return res if np.ndim(ppcs) > 0 else bool(res[0])
+
+    def contains_point_codes(self, pcs):
+        return self.contains_packed_codes(ppc.get_packed_code_array_from_point_codes(pcs))
+
+    def __contains__(self, pc):
+        return bool(self.contains_point_codes([pc])[0])
+
+    def get_index_ranges(self, iterations):
+        # canonical index ranges of the points of the region at this iteration
+        return get_index_ranges_from_key_ranges(self.key_starts, self.key_stops, iterations)
+
+    def get_canonical_indices(self, iterations):
+        return get_indices_from_index_ranges(*self.get_index_ranges(iterations))
+
+    def get_mask(self, iterations):
+        return get_mask_from_index_ranges(*self.get_index_ranges(iterations), it.get_exact_n_points_from_iterations(iterations))
+
+    def get_n_points(self, iterations):
+        starts, stops = self.get_index_ranges(iterations)
+        return int((stops - starts).sum())
+
+    def get_packed_codes(self, iterations):
+        # all the points of the region at this iteration (expanding whole cells), in canonical order
+        return get_packed_codes_from_canonical_indices(self.get_canonical_indices(iterations), iterations)
+
+    # ---- cells ---- #
+
+    def get_cells(self):
+        # the fewest prefix cells whose union is the region, as packed codes (each at its own number of iterations),
+        # in key order; each range is split greedily into the biggest cells that start where the last one ended
+        starts = self.key_starts.copy()
+        stops = self.key_stops
+        cell_keys = []
+        cell_iterations = []
+        active = np.arange(len(starts))
+        while len(active) > 0:
+            s = starts[active]
+            is_pole = s < 2
+            offset = np.where(is_pole, 1, s - 2)
+            # the biggest cell starting at s is limited by how s is aligned and by how much of the range is left
+            aligned = np.where(offset == 0, MAX_ITERATIONS, np.minimum(_count_trailing_base_four_zeros(np.maximum(offset, 1)), MAX_ITERATIONS))
+            fits = _floor_log4(stops[active] - s)
+            k = np.where(is_pole, 0, np.minimum(aligned, fits))
+            cell_keys.append(s)
+            cell_iterations.append(np.where(is_pole, 0, MAX_ITERATIONS - k))
+            starts[active] = s + np.left_shift(1, 2 * k, dtype=np.int64)
+            active = active[starts[active] < stops[active]]
+
+        if len(cell_keys) == 0:
+            return np.array([], dtype=np.int64)
+        keys = np.concatenate(cell_keys)
+        iterations = np.concatenate(cell_iterations)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        iterations = iterations[order]
+        ppcs = get_packed_code_array_from_hierarchical_keys(keys, MAX_ITERATIONS)
+        return (ppcs & ~ITERATION_MASK) | iterations
+
+    def get_cell_point_codes(self):
+        return list(ppc.get_point_code_array_from_packed_codes(self.get_cells()))
+
+    # ---- serialization ---- #
+
+    def to_bytes(self):
+        # ranges as alternating gaps and lengths (small numbers that compress well), deflated
+        bounds = np.column_stack([self.key_starts, self.key_stops]).ravel()
+        deltas = np.diff(np.concatenate([[0], bounds])).astype("<i8")
+        return SERIALIZATION_HEADER + zlib.compress(deltas.tobytes())
+
+    @classmethod
+    def from_bytes(cls, b):
+        if not b.startswith(SERIALIZATION_HEADER):
+            raise ValueError("not a serialized PointCodeRegion")
+        deltas = np.frombuffer(zlib.decompress(b[len(SERIALIZATION_HEADER):]), dtype="<i8")
+        bounds = np.cumsum(deltas).astype(np.int64).reshape(-1, 2)
+        return cls(bounds[:, 0], bounds[:, 1])
@@ -0,0 +1,178 @@
+# spatial index over a set of lattice points (a whole iteration or any subset), built once and reused for many queries
+# replaces get_nearest_neighbors_ln_to_ln_with_distance (quarantined in IcosahedronMath), which rebuilt a KDTree on every call
+# and returned dicts keyed by lookup number; here everything is arrays of positions in the index's point list
+
+# distances are great-circle, in units of planet_radius (like NearestPointCodes)
+# the index pickles with its KD-tree already built, so a big candidate set can be built once and loaded from disk
+# (the tree's data array is the xyz array itself, so the points are only stored once)
+
+
+import os
+import pickle
+import functools
+import numpy as np
+from scipy.spatial import cKDTree
+
+import icosalattice.CoordinatesOfPointCode as coords
+import icosalattice.GeneratePointCodes as gpc
+from icosalattice.DistancesOnSphere import convert_distance_3d_to_great_circle
+from icosalattice.PeelSymmetry import build_xyz_table
+
+
+NO_POINT = -1
+
+
+def _convert_great_circle_distance_to_3d(d_gc, planet_radius=1):
+    return 2 * np.sin(np.minimum(np.asarray(d_gc, dtype=float) / (2 * planet_radius), np.pi / 2))
+
+
+def _convert_3d_distance_to_great_circle(d_3d, planet_radius=1):
+    # rounding can put antipodal points slightly more than 2 apart, and missing neighbors are at inf
+    d_gc = planet_radius * convert_distance_3d_to_great_circle(np.minimum(d_3d, 2))
+    return np.where(np.isinf(d_3d), np.inf, d_gc)
+
+
+class LatticePointIndex:
+    def __init__(self, xyz, packed_codes=None, method=None):
+        # xyz is an (N, 3) array of unit vectors; packed_codes (optional) are the points they belong to, in the same order
+        # method is only recorded, so that queries by packed code place the query points the same way as the candidates
+        xyz = np.ascontiguousarray(xyz, dtype=float).reshape(-1, 3)
+        self.kdtree = cKDTree(xyz)
+        self.method = method
+        if packed_codes is None:
+            self.packed_codes = None
+            self._sorted_code_order = None
+        else:
+            self.packed_codes = np.asarray(packed_codes, dtype=np.int64)
+            if self.packed_codes.shape != (len(xyz),):
+                raise ValueError(f"got {len(self.packed_codes)} packed codes for {len(xyz)} points")
+            self._sorted_code_order = np.argsort(self.packed_codes, kind="stable")
+
+    @classmethod
+    def from_packed_codes(cls, ppcs, method=None):
+        ppcs = np.asarray(ppcs, dtype=np.int64)
+        return cls(coords.get_xyz_array_function(method)(ppcs), packed_codes=ppcs, method=method)
+
+    @classmethod
+    def from_iteration(cls, iterations, method=None):
+        # all points at this iteration, so positions in the index are canonical indices
+        return cls(build_xyz_table(iterations, method=method), packed_codes=gpc.get_all_packed_codes_at_iteration(iterations), method=method)
+
+    @property
+    def xyz(self):
+        return self.kdtree.data
+
+    def __len__(self):
+        return self.kdtree.n
+
+    def __repr__(self):
+        return f"<LatticePointIndex of {len(self)} points>"
+
+    def get_indices_of_packed_codes(self, ppcs):
+        # position of each packed code in the index, or NO_POINT if it isn't in it
+        if self.packed_codes is None:
+            raise ValueError("this index was built without packed codes")
+        ppcs = np.asarray(ppcs, dtype=np.int64)
+        sorted_codes = self.packed_codes[self._sorted_code_order]
+        pos = np.minimum(np.searchsorted(sorted_codes, ppcs), len(sorted_codes) - 1)
+        found = sorted_codes[pos] == ppcs
+        return np.where(found, self._sorted_code_order[pos], NO_POINT)
+
+    def query(self, xyz, k=1, exclude=None, planet_radius=1, workers=1):
+        # k nearest points to each of the (N, 3) query points
+        # exclude is an optional length-N array of one index per query to leave out of its results (NO_POINT for none),
+        # e.g. the query point's own position, so a point is not its own nearest neighbor
+        # returns (distances, indices), both of shape (N, k); if there are fewer than k points,
+        # the missing entries have distance inf and index len(self)
+        xyz = np.asarray(xyz, dtype=float).reshape(-1, 3)
+        n_queries = len(xyz)
+        k_query = k if exclude is None else k + 1
+        d_3d, indices = self.kdtree.query(xyz, k=k_query, workers=workers)
+        d_3d = d_3d.reshape(n_queries, k_query)
+        indices = indices.reshape(n_queries, k_query)
+
+        if exclude is not None:
+            exclude = np.asarray(exclude, dtype=np.int64).reshape(n_queries)
+            # drop the excluded index where it was found, otherwise drop the farthest one
+            keep = indices != exclude[:, None]
+            keep[keep.all(axis=1), -1] = False
+            d_3d = d_3d[keep].reshape(n_queries, k)
+            indices = indices[keep].reshape(n_queries, k)
+
+        return _convert_3d_distance_to_great_circle(d_3d, planet_radius), indices
+
+    def query_radius(self, xyz, radius, exclude=None, planet_radius=1, workers=1):
+        # all points within great-circle distance radius of each of the (N, 3) query points, nearest first
+        # exclude is as in query
+        # returns (offsets, indices, distances), where the results of query i are indices[offsets[i]:offsets[i+1]]
+        xyz = np.asarray(xyz, dtype=float).reshape(-1, 3)
+        n_queries = len(xyz)
+        r_3d = _convert_great_circle_distance_to_3d(radius, planet_radius)
+        neighbor_lists = self.kdtree.query_ball_point(xyz, r_3d, workers=workers)
+        counts = np.fromiter((len(x) for x in neighbor_lists), dtype=np.int64, count=n_queries)
+        indices = np.fromiter((i for x in neighbor_lists for i in x), dtype=np.int64, count=counts.sum())
+        rows = np.repeat(np.arange(n_queries), counts)
+
+        if exclude is not None:
+            exclude = np.asarray(exclude, dtype=np.int64).reshape(n_queries)
+            keep = indices != exclude[rows]
+            indices = indices[keep]
+            rows = rows[keep]
+            counts = np.bincount(rows, minlength=n_queries)
+
+        d_3d = np.linalg.norm(self.xyz[indices] - xyz[rows], axis=1)
+        order = np.lexsort((d_3d, rows))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return offsets, indices[order], _convert_3d_distance_to_great_circle(d_3d[order], planet_radius)
+
+    def _get_query_xyz_and_exclude(self, ppcs, allow_self):
+        ppcs = np.asarray(ppcs, dtype=np.int64)
+        xyz = coords.get_xyz_array_function(self.method)(ppcs)
+        exclude = None if allow_self else self.get_indices_of_packed_codes(ppcs)
+        return xyz, exclude
+
+    def query_packed_codes(self, ppcs, k=1, allow_self=False, planet_radius=1, workers=1):
+        # k nearest points to each of the packed codes, leaving out the query point itself unless allow_self
+        xyz, exclude = self._get_query_xyz_and_exclude(ppcs, allow_self)
+        return self.query(xyz, k=k, exclude=exclude, planet_radius=planet_radius, workers=workers)
+
+    def query_radius_packed_codes(self, ppcs, radius, allow_self=False, planet_radius=1, workers=1):
+        xyz, exclude = self._get_query_xyz_and_exclude(ppcs, allow_self)
+        return self.query_radius(xyz, radius, exclude=exclude, planet_radius=planet_radius, workers=workers)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        if not isinstance(index, LatticePointIndex):
+            raise TypeError(f"{path} does not contain a LatticePointIndex")
+        return index
+
+
+def get_spatial_index_cache_path(iterations, method=None, cache_dir="."):
+    method = coords.CHOSEN_METHOD if method is None else method
+    return os.path.join(cache_dir, f"spatial_index_{method}_iteration_{iterations}.pickle")
+
+
+def get_spatial_index_of_iteration(iterations, method=None, cache_dir=None):
+    # index of all points at this iteration, kept in memory, and also on disk if cache_dir is given
+    # (the method is resolved before the in-memory cache, so changing CHOSEN_METHOD gives a new index)
+    method = coords.CHOSEN_METHOD if method is None else method
+    return _get_spatial_index_of_iteration(iterations, method, cache_dir)
+
+
+@functools.lru_cache(maxsize=16)
+def _get_spatial_index_of_iteration(iterations, method, cache_dir):
+    if cache_dir is None:
+        return LatticePointIndex.from_iteration(iterations, method=method)
+    path = get_spatial_index_cache_path(iterations, method=method, cache_dir=cache_dir)
+    if os.path.exists(path):
+        return LatticePointIndex.load(path)
+    index = LatticePointIndex.from_iteration(iterations, method=method)
+    os.makedirs(cache_dir, exist_ok=True)
+    index.save(path)
+    return index
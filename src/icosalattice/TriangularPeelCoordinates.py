@@ -235,6 +235,39 @@ def deadjust_ld_using_lp_transformation_in_triangle_coordinates(l, d):
 
 
 
+# ---- array versions ---- #
+
+
+def get_ack_arrays_from_ld(l_coord, d_coord):
+    # same as get_ack_from_ld, on arrays (points on the diagonal l == d use the upward face)
+    l_coord = np.asarray(l_coord, dtype=float)
+    d_coord = np.asarray(d_coord, dtype=float)
+    down = l_coord < d_coord
+    abs_c = np.where(down, 1.0 - l_coord, l_coord)
+    abs_k = np.where(down, d_coord, 1.0 - d_coord)
+    abs_a = 2.0 - abs_c - abs_k
+    sign = np.where(down, -1.0, 1.0)
+    return sign * abs_a, sign * abs_c, sign * abs_k
+
+
+def adjust_ld_arrays_using_lp_transformation_in_triangle_coordinates(l, d):
+    # same as adjust_ld_using_lp_transformation_in_triangle_coordinates, on arrays
+    a, c, k = get_ack_arrays_from_ld(l, d)
+    neg = a < 0
+    a, c, k = np.abs(a), np.abs(c), np.abs(k)
+    a2 = distort.get_lp_proportion_from_theta_proportion(a)
+    c2 = distort.get_lp_proportion_from_theta_proportion(c)
+    k2 = distort.get_lp_proportion_from_theta_proportion(k)
+    r = 2 / (a2 + c2 + k2)
+    c2 = c2 * r
+    k2 = k2 * r
+    l2 = np.where(neg, 1.0 - c2, c2)
+    d2 = np.where(neg, k2, 1.0 - k2)
+    if (l2 < -1e-9).any() or (d2 < -1e-9).any():
+        raise ValueError("negative l or d after adjustment")
+    return np.maximum(l2, 0.0), np.maximum(d2, 0.0)
+
+
 
 if __name__ == "__main__":
     while True:
@@ -1,3 +1,5 @@
+import os
+
 import icosalattice.Edges as ed
 import icosalattice.StartingPoints as sp
 from icosalattice.PointRepresentationAsFloat import point_float_to_code
@@ -33,3 +35,17 @@ def get_test_point_codes():
 
 
 TEST_POINT_CODES = get_test_point_codes()
+
+
+def get_stored_point_code_arithmetic_results():
+    # pc -> {direction: result}, from the original string arithmetic, as an oracle independent of LatticeCoordinates
+    path = os.path.join(os.path.dirname(__file__), "point_code_arithmetic_results.txt")
+    directions = [1, 2, 3, -1, -2, -3]
+    res = {}
+    with open(path) as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            pc, *results = line.split()
+            res[pc] = {x: None if r == "-" else r for x, r in zip(directions, results)}
+    return res
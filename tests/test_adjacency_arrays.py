@@ -0,0 +1,34 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.Adjacency import get_adjacency_from_point_code
+from icosalattice.AdjacencyArrays import get_adjacency_array_from_point_codes, get_adjacency_array_from_packed_codes, ADJACENCY_DIRECTIONS, NO_NEIGHBOR
+
+from TestUtil import TEST_POINT_CODES
+
+
+def test_adjacency_array_matches_adjacency_of_each_point():
+    pcs = TEST_POINT_CODES + gpc.get_all_point_codes_at_iteration(iterations=3)
+    adj = get_adjacency_array_from_point_codes(pcs)
+    assert adj.shape == (len(pcs), 6)
+    for pc, row in zip(pcs, adj):
+        d = get_adjacency_from_point_code(pc)
+        expected = [d[x] for x in ADJACENCY_DIRECTIONS]
+        assert list(row) == expected, f"{pc} has adjacency {expected} but got {list(row)}"
+
+
+def test_adjacency_array_sentinels():
+    pcs = gpc.get_all_point_codes_at_iteration(iterations=2)
+    ppcs = ppc.get_packed_code_array_from_point_codes(pcs)
+    adj = get_adjacency_array_from_packed_codes(ppcs)
+    n_missing = (adj == NO_NEIGHBOR).sum(axis=1)
+    for pc, k in zip(pcs, n_missing):
+        if pc[0] in ["A", "B"]:
+            assert k == 6, pc
+        elif all(x == "0" for x in pc[1:]):
+            assert k == 1, pc
+        else:
+            assert k == 0, pc
@@ -0,0 +1,49 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+from icosalattice.Adjacency import get_adjacency_from_point_code, get_neighbors_of_point_code
+from icosalattice.AdjacencyArrays import ADJACENCY_DIRECTIONS, NO_NEIGHBOR
+from icosalattice.AdjacencyGraph import (
+    build_adjacency_graph, get_adjacency_graph, get_adjacency_graph_cache_path, save_adjacency_graph,
+)
+
+
+def test_neighbor_table_matches_adjacency_of_each_point():
+    iterations = 3
+    pcs = gpc.get_all_point_codes_at_iteration(iterations=iterations)
+    mat, table = build_adjacency_graph(iterations)
+    assert table.shape == (len(pcs), 6)
+    for pc, row in zip(pcs, table):
+        neighbors = [None if i == NO_NEIGHBOR else pcs[i] for i in row]
+        if pc[0] in ["A", "B"]:
+            # poles have their neighbors in order instead of by direction
+            assert neighbors[:5] == get_neighbors_of_point_code(pc), pc
+            assert neighbors[5] is None, pc
+        else:
+            d = get_adjacency_from_point_code(pc)
+            assert neighbors == [d[x] for x in ADJACENCY_DIRECTIONS], pc
+
+
+def test_adjacency_matrix_is_symmetric():
+    for iterations in [0, 1, 3]:
+        mat, table = build_adjacency_graph(iterations)
+        assert (mat != mat.T).nnz == 0
+        degrees = np.asarray(mat.sum(axis=1)).ravel()
+        assert (degrees == 5).sum() == 12
+        assert (degrees == 6).sum() == len(table) - 12
+
+
+def test_adjacency_graph_cache_round_trip(tmp_path):
+    mat, table = get_adjacency_graph(2, cache_dir=tmp_path)
+    mat2, table2 = get_adjacency_graph(2, cache_dir=tmp_path)
+    assert (table == table2).all()
+    assert (mat != mat2).nnz == 0
+
+
+def test_adjacency_graph_cache_of_wrong_iteration(tmp_path):
+    mat, table = build_adjacency_graph(1)
+    save_adjacency_graph(get_adjacency_graph_cache_path(2, tmp_path), mat, table, 1)
+    with pytest.raises(ValueError):
+        get_adjacency_graph(2, cache_dir=tmp_path)
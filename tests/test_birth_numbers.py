@@ -0,0 +1,40 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.BirthNumbers as bn
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PointCodeArithmetic as pca
+
+from TestUtil import TEST_POINT_CODES
+
+
+def test_birth_numbers_of_iteration_are_prefix():
+    for iterations in range(5):
+        pcs = gpc.get_all_point_codes_at_iteration(iterations)
+        bns = bn.get_birth_number_array_from_point_codes(pcs)
+        assert sorted(bns.tolist()) == list(range(len(pcs)))
+        assert bns.tolist() == bn.get_birth_numbers_from_point_codes(pcs)
+
+
+def test_birth_number_round_trip():
+    for pc in TEST_POINT_CODES:
+        x = bn.get_birth_number_from_point_code(pc)
+        assert bn.get_point_code_from_birth_number(x, iterations=len(pc) - 1) == pc, pc
+        stripped = pca.strip_trailing_zeros(pc)
+        if len(stripped) > 0:
+            assert bn.get_point_code_from_birth_number(x) == stripped, pc
+
+    iterations = 3
+    bns = np.arange(bn.N_POINTS_AT_ITERATION[iterations])
+    pcs = bn.get_point_code_array_from_birth_numbers(bns, iterations)
+    assert pcs.tolist() == bn.get_point_codes_from_birth_numbers(bns, iterations)
+    assert (bn.get_birth_number_array_from_point_codes(pcs) == bns).all()
+
+
+def test_birth_numbers_of_children():
+    assert bn.get_point_code_from_birth_number(12) == "C1"
+    assert bn.get_point_code_from_birth_number(41) == "L3"
+    assert bn.get_point_code_from_birth_number(42) == "C01"
+    with pytest.raises(ValueError):
+        bn.get_point_code_from_birth_number(42, iterations=1)
@@ -0,0 +1,65 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.Iterations as it
+from icosalattice.CoordinatesOfPointCode import METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY
+from icosalattice.BoundingCaps import (
+    WATERSHED_RADIUS_MEASURED_ITERATIONS, get_watershed_cap_radii,
+    build_bounding_caps, get_bounding_caps, get_bounding_cap_depth, get_bounding_cap_level_offsets,
+    get_bounding_caps_of_canonical_indices, get_angle_bounds_to_caps, get_angle_between_unit_vectors,
+    get_ancestor_canonical_indices, get_bounding_caps_cache_path, load_bounding_caps,
+)
+from icosalattice.HierarchicalOrder import get_indices_from_index_ranges
+from icosalattice.RegionQueries import points_in_cap
+
+
+@pytest.mark.parametrize("method", ["cpg1", "rta1"])
+def test_bounding_caps_contain_descendants(method):
+    depth = 3
+    centers, radii = build_bounding_caps(depth, method=method)
+    assert get_bounding_cap_depth(radii) == depth
+    assert len(radii) == get_bounding_cap_level_offsets(depth)[-1]
+    f_xyz = METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY[method]
+    n = 7
+    descendants = np.arange(2, 2 + 10 * 4**n, 7)
+    xyz = f_xyz(gpc.get_packed_codes_from_canonical_indices(descendants, n))
+    for p in range(depth + 1):
+        ancestors = get_ancestor_canonical_indices(descendants, n - p)
+        cap_centers, cap_radii = get_bounding_caps_of_canonical_indices(centers, radii, ancestors, p)
+        assert (get_angle_between_unit_vectors(xyz, cap_centers) <= cap_radii).all()
+        min_angle, max_angle = get_angle_bounds_to_caps(cap_centers, cap_radii, xyz)
+        assert (min_angle == 0).all()
+
+    with pytest.raises(ValueError):
+        get_bounding_caps_of_canonical_indices(centers, radii, [2], depth + 1)
+
+
+def test_extrapolated_watershed_cap_radii_contain_descendants():
+    # the radii past the measured iterations are extrapolated, so measure some of them
+    method = "cpg1"
+    radii = get_watershed_cap_radii(method)
+    f_xyz = METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY[method]
+    n = WATERSHED_RADIUS_MEASURED_ITERATIONS + 4
+    descendants = np.arange(2, it.get_exact_n_points_from_iterations(n), dtype=np.int64)
+    descendant_xyz = f_xyz(gpc.get_packed_codes_from_canonical_indices(descendants, n))
+    for p in range(WATERSHED_RADIUS_MEASURED_ITERATIONS + 1, n):
+        ancestors = get_ancestor_canonical_indices(descendants, n - p)
+        ancestor_xyz = f_xyz(gpc.get_all_packed_codes_at_iteration(p))
+        assert get_angle_between_unit_vectors(ancestor_xyz[ancestors], descendant_xyz).max() <= radii[p]
+
+
+def test_points_in_cap_with_shallow_bounding_caps():
+    bounding_caps = build_bounding_caps(1, method="cpg1")
+    for center, radius in [("D0123", 0.3), ("B", 1.0)]:
+        starts, stops = points_in_cap(center, radius, 5, method="cpg1", bounding_caps=bounding_caps)
+        expected_starts, expected_stops = points_in_cap(center, radius, 5, method="cpg1")
+        assert np.array_equal(get_indices_from_index_ranges(starts, stops), get_indices_from_index_ranges(expected_starts, expected_stops))
+
+
+def test_bounding_caps_cache_round_trip(tmp_path):
+    centers, radii = get_bounding_caps(2, "cpg1", cache_dir=tmp_path)
+    centers2, radii2 = load_bounding_caps(get_bounding_caps_cache_path(2, "cpg1", tmp_path))
+    assert (centers == centers2).all()
+    assert (radii == radii2).all()
@@ -0,0 +1,21 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.CoordinatesOfPointCode import METHOD_NAME_TO_FUNCTION_POINT_CODE_TO_XYZ, METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY
+
+from TestUtil import TEST_POINT_CODES
+
+
+def test_xyz_arrays_match_each_point():
+    pcs = TEST_POINT_CODES + gpc.get_all_point_codes_at_iteration(iterations=3)
+    ppcs = ppc.get_packed_code_array_from_point_codes(pcs)
+    for method_name, f_array in METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY.items():
+        f = METHOD_NAME_TO_FUNCTION_POINT_CODE_TO_XYZ[method_name]
+        xyz = f_array(ppcs)
+        assert xyz.shape == (len(pcs), 3)
+        for pc, row in zip(pcs, xyz):
+            expected = f(pc, as_array=True)
+            assert np.allclose(row, expected, rtol=0, atol=1e-12), f"{method_name}: {pc} at {expected} but got {row}"
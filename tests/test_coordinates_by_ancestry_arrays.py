@@ -0,0 +1,41 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.CoordinatesByAncestry as anc
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+
+from TestUtil import TEST_POINT_CODES
+
+
+def test_parents_array_matches_parents_of_each_point():
+    pcs = TEST_POINT_CODES + gpc.get_all_point_codes_at_iteration(iterations=3)
+    par, dpar = anc.get_parents_array_from_packed_codes(ppc.get_packed_code_array_from_point_codes(pcs))
+    for pc, p0, p1 in zip(pcs, par, dpar):
+        expected = anc.get_parents_from_point_code(pc)
+        got = [None if x == -1 else ppc.get_point_code_from_packed_code(int(x)) for x in [p0, p1]]
+        assert got == expected, pc
+
+
+def test_xyz_by_level_matches_recursive_ancestry():
+    for k, xyz in anc.iterate_xyz_arrays_by_level_using_ancestry(4):
+        pcs = gpc.get_all_point_codes_at_iteration(k)
+        expected = np.array([anc.get_xyz_from_point_code_using_ancestry(pc) for pc in pcs])
+        assert (xyz == expected).all(), k
+
+
+def test_xyz_of_sparse_mixed_depth_codes_matches_recursive_ancestry():
+    pcs = TEST_POINT_CODES + ["A", "B00", "C", "C1", "C10", "C100", "K2031102"]
+    xyz = anc.get_xyz_array_from_point_codes_using_ancestry(pcs)
+    assert xyz.shape == (len(pcs), 3)
+    for pc, row in zip(pcs, xyz):
+        assert (row == anc.get_xyz_from_point_code_using_ancestry(pc)).all(), pc
+
+
+def test_ancestor_closure_is_shared():
+    pcs = ["C1230", "C1231", "C1232", "C1233"]
+    levels = anc.get_ancestor_closure_by_level(ppc.get_packed_code_array_from_point_codes(pcs))
+    assert len(levels[4][0]) == 4
+    # the closure only holds what is needed, not whole levels
+    assert all(len(nodes) <= 12 for nodes, _, _ in levels)
@@ -9,6 +9,8 @@ import icosalattice.StartingPoints as sp
 import icosalattice.UnitSpherePoint as usp
 import icosalattice.Faces as fc
 import icosalattice.Edges as ed
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
 from icosalattice.CoordinatesByPlaneGridding import get_xyz_from_point_code_using_corrected_plane_gridding
 
 
@@ -44,3 +46,11 @@ def test_face_of_point_code():
         xyz = get_xyz_from_point_code_using_corrected_plane_gridding(pc)
         fs_from_xyz = sorted(fc.get_faces_of_xyz_by_closest_center(xyz))
         assert faces_expected == fs_from_pc == fs_from_xyz, f"expected: {faces_expected} for {pc}\ngot1: {fs_from_pc = }\ngot2: {fs_from_xyz = }"
+
+
+def test_face_membership_array_matches_point_codes():
+    pcs = gpc.get_all_point_codes_at_iteration(3) + [gpc.get_random_point_code(0, 5, 8) for _ in range(500)]
+    membership = fc.get_face_membership_array_from_packed_codes(ppc.get_packed_code_array_from_point_codes(pcs))
+    assert membership.shape == (len(pcs), len(fc.FACE_NAMES))
+    for pc, row in zip(pcs, membership):
+        assert sorted(np.array(fc.FACE_NAMES)[row]) == sorted(fc.get_faces_of_point_code(pc)), pc
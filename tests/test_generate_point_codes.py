@@ -0,0 +1,77 @@
+import itertools
+import pytest
+
+import numpy as np
+
+import icosalattice.Faces as fc
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+import icosalattice.PointCodeArithmetic as pca
+
+
+def get_descendants_by_product(ancestor_pc, directions, iterations):
+    k = iterations - (len(ancestor_pc) - 1)
+    return [ancestor_pc + "".join(digits) for digits in itertools.product(directions, repeat=k)]
+
+
+def test_descendants_using_directions_match_product():
+    for ancestor in ["C", "D3", "G010", "K2"]:
+        for directions in ["0123", "01", "03", "31", "2"]:
+            expected = get_descendants_by_product(ancestor, directions, 4)
+            assert gpc.get_descendants_of_point_code_using_directions(ancestor, directions, 4) == expected
+            assert gpc.get_n_descendants(ancestor, 4, directions) == len(expected)
+            stripped = gpc.get_descendants_of_point_code_using_directions(ancestor, directions, 4, with_trailing_zeros=False)
+            assert stripped == [pca.strip_trailing_zeros(pc) for pc in expected]
+
+
+def test_descendant_packed_codes_slices_and_chunks():
+    ancestor = "E12"
+    for directions in ["0123", "120"]:
+        all_ppcs = gpc.get_descendant_packed_codes(ancestor, 7, directions)
+        assert (gpc.get_descendant_packed_codes(ancestor, 7, directions, start=37, stop=101) == all_ppcs[37:101]).all()
+        chunks = list(gpc.iterate_descendant_packed_codes(ancestor, 7, directions, chunk_size=100))
+        assert all(len(chunk) <= 100 for chunk in chunks)
+        assert (np.concatenate(chunks) == all_ppcs).all()
+        pcs = list(gpc.iterate_descendant_point_codes(ancestor, 7, directions, chunk_size=100))
+        assert pcs == ppc.get_point_code_array_from_packed_codes(all_ppcs).tolist()
+
+
+def test_descendants_are_canonical_index_range():
+    iterations = 5
+    r = gpc.get_descendant_canonical_index_range("H20", iterations)
+    assert len(r) == 4 ** 3
+    assert (gpc.get_canonical_indices_from_packed_codes(gpc.get_descendant_packed_codes("H20", iterations)) == np.arange(r.start, r.stop)).all()
+
+
+def test_descendants_of_poles():
+    assert gpc.get_all_point_codes_from_ancestor_at_iteration("A", 3) == ["A000"]
+    assert gpc.get_all_point_codes_from_ancestor_at_iteration("B", 3, with_trailing_zeros=False) == ["B"]
+    assert gpc.get_descendants_of_point_code_using_directions("A", "12", 2) == []
+    assert gpc.get_descendants_of_point_code_using_directions("A", "12", 0) == ["A"]
+
+
+def test_descendants_argument_errors():
+    with pytest.raises(ValueError):
+        gpc.get_descendant_packed_codes("C123", 2)
+    with pytest.raises(ValueError):
+        gpc.get_descendant_packed_codes("C", 2, directions="011")
+    with pytest.raises(ValueError):
+        gpc.get_descendant_packed_codes("C", 2, directions="04")
+
+
+def test_strip_trailing_zeros_from_packed_codes():
+    pcs = ["C000", "C100", "A00", "L3330", "D", "F0102"]
+    stripped = ppc.strip_trailing_zeros_from_packed_codes(ppc.get_packed_code_array_from_point_codes(pcs))
+    assert ppc.get_point_code_array_from_packed_codes(stripped).tolist() == [pca.strip_trailing_zeros(pc) for pc in pcs]
+
+
+def test_points_on_face_match_filtered_watershed():
+    iterations = 4
+    all_ppcs = gpc.get_all_packed_codes_at_iteration(iterations)
+    membership = fc.get_face_membership_array_from_packed_codes(all_ppcs)
+    for j, face_name in enumerate(fc.FACE_NAMES):
+        with_edges = gpc.get_packed_codes_on_face_at_iteration(face_name, iterations)
+        assert sorted(with_edges) == sorted(all_ppcs[membership[:, j]])
+        in_watershed = gpc.get_packed_codes_on_face_at_iteration(face_name, iterations, with_edges=False)
+        starts_at_p0 = (all_ppcs >> ppc.STARTING_POINT_SHIFT) == ppc.STARTING_POINT_INDEX[face_name[0]]
+        assert (in_watershed == all_ppcs[membership[:, j] & starts_at_p0]).all()
@@ -0,0 +1,60 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.HierarchicalOrder as ho
+import icosalattice.PackedPointCodes as ppc
+
+from TestUtil import TEST_POINT_CODES
+
+
+def test_hierarchical_keys_are_canonical_order():
+    iterations = 3
+    pcs = gpc.get_all_point_codes_at_iteration(iterations)
+    keys = ho.get_hierarchical_key_array_from_point_codes(pcs)
+    assert (np.diff(keys) > 0).all()
+    assert (ho.get_canonical_indices_from_hierarchical_keys(keys, iterations) == np.arange(len(pcs))).all()
+    assert ho.get_point_code_array_from_hierarchical_keys(keys, iterations).tolist() == pcs
+
+
+def test_hierarchical_key_ignores_trailing_zeros():
+    for pc in TEST_POINT_CODES:
+        assert ho.get_hierarchical_key_from_point_code(pc) == ho.get_hierarchical_key_from_point_code(pc + "00")
+
+
+def test_descendant_range():
+    iterations = 4
+    pcs = gpc.get_all_point_codes_at_iteration(iterations)
+    ppcs = ppc.get_packed_code_array_from_point_codes(pcs)
+    for ancestor in ["A", "B", "C21", "D3", "G0000", "K012", "L"]:
+        expected = gpc.get_all_point_codes_from_ancestor_at_iteration(ancestor, iterations)
+        lo, hi = ho.descendant_range(ancestor, iterations)
+        assert pcs[lo:hi] == expected, ancestor
+        mask = ho.point_is_descendant(ppcs, ancestor)
+        assert [pc for pc, m in zip(pcs, mask) if m] == expected, ancestor
+
+
+def test_descendant_slices_in_sorted_keys():
+    iterations = 4
+    keys = ho.get_hierarchical_key_array_from_point_codes(gpc.get_all_point_codes_at_iteration(iterations))
+    sub_keys = np.sort(np.random.default_rng(0).choice(keys, 500, replace=False))
+    sub_pcs = ho.get_point_code_array_from_hierarchical_keys(sub_keys, iterations)
+    ancestors = ["C2", "E", "F1", "A"]
+    starts, stops = ho.get_descendant_slices_in_sorted_keys(sub_keys, ancestors)
+    for ancestor, start, stop in zip(ancestors, starts, stops):
+        expected = [pc for pc in sub_pcs if pc.startswith(ancestor)]
+        assert sub_pcs[start:stop].tolist() == expected
+        assert sub_pcs[ho.get_descendant_slice_in_sorted_keys(sub_keys, ancestor)].tolist() == expected
+
+
+def test_index_range_helpers():
+    starts, stops = ho.merge_index_ranges([5, 0, 3, 10, 12], [8, 2, 5, 10, 14])
+    assert list(starts) == [0, 3, 12]
+    assert list(stops) == [2, 8, 14]
+    indices = ho.get_indices_from_index_ranges(starts, stops)
+    assert list(indices) == [0, 1, 3, 4, 5, 6, 7, 12, 13]
+    mask = ho.get_mask_from_index_ranges(starts, stops, 15)
+    assert list(np.flatnonzero(mask)) == list(indices)
+    starts2, stops2 = ho.get_index_ranges_from_mask(mask)
+    assert list(starts2) == list(starts) and list(stops2) == list(stops)
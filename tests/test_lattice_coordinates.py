@@ -0,0 +1,93 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.LatticeCoordinates as lc
+import icosalattice.PackedPointCodes as ppc
+import icosalattice.PackedPointCodeArithmetic as ppca
+import icosalattice.PointPaths as paths
+
+from TestUtil import TEST_POINT_CODES, get_stored_point_code_arithmetic_results
+
+
+def test_lattice_coordinates_round_trip():
+    assert lc.get_lattice_coordinates_from_point_code("C2130") == ("C", 0b1100, 0b1010, 4)
+    for pc in TEST_POINT_CODES:
+        coords = lc.get_lattice_coordinates_from_point_code(pc)
+        assert coords.n == len(pc) - 1
+        assert 0 <= coords.l < 2 ** coords.n and 0 <= coords.d < 2 ** coords.n
+        assert lc.get_point_code_from_lattice_coordinates(coords) == pc
+
+
+def test_lattice_steps_match_packed_arithmetic():
+    ppcs = [ppc.get_packed_code_from_point_code(pc) for pc in TEST_POINT_CODES]
+    for iterations in range(5):
+        ppcs += gpc.get_all_packed_codes_at_iteration(iterations).tolist()
+    for p in ppcs:
+        for x in lc.DIRECTION_TO_LD_OFFSET:
+            expected = ppca.add_direction_to_packed_code(p, x)
+            got = lc.add_direction_to_packed_code_using_lattice_coordinates(p, x)
+            assert got == expected, (ppc.get_point_code_from_packed_code(p), x)
+
+
+
+def test_lattice_steps_match_stored_string_arithmetic():
+    for pc, results in get_stored_point_code_arithmetic_results().items():
+        coords = lc.get_lattice_coordinates_from_point_code(pc)
+        for x, expected in results.items():
+            got = lc.add_direction_to_lattice_coordinates(coords, x)
+            got = None if got is None else lc.get_point_code_from_lattice_coordinates(got)
+            assert got == expected, (pc, x)
+
+
+def test_lattice_step_errors_and_poles():
+    with pytest.raises(ValueError):
+        lc.add_direction_to_lattice_coordinates(("C", 0, 0, 1), 4)
+    assert lc.add_direction_to_lattice_coordinates(("A", 0, 0, 3), 1) is None
+    assert lc.add_direction_to_lattice_coordinates(("C", 0, 0, 3), -3) is None
+    assert lc.add_direction_to_lattice_coordinates(("C", 7, 0, 3), 1) == ("A", 0, 0, 3)
+    assert lc.add_direction_to_lattice_coordinates(("D", 0, 7, 3), 3) == ("B", 0, 0, 3)
+
+
+def test_jumps_match_repeated_steps():
+    ppcs = [ppc.get_packed_code_from_point_code(pc) for pc in TEST_POINT_CODES]
+    for iterations in range(3):
+        ppcs += gpc.get_all_packed_codes_at_iteration(iterations).tolist()
+    for p in ppcs:
+        for x in lc.DIRECTION_TO_LD_OFFSET:
+            line = [p]
+            q = p
+            for k in range(1, 40):
+                q = None if q is None else ppca.add_direction_to_packed_code(q, x)
+                assert lc.add_steps_to_packed_code(p, x, k) == q, (ppc.get_point_code_from_packed_code(p), x, k)
+                if q is not None:
+                    line.append(q)
+            assert lc.get_line_packed_codes(p, x, 39).tolist() == line
+
+
+def test_jumps_around_loops():
+    # direction -2 from D0202 goes around the globe through D, F, H, J, L and back
+    p = ppc.get_packed_code_from_point_code("D0202")
+    line = lc.get_line_packed_codes(p, -2, 200)
+    period = line.tolist().index(p, 1)
+    assert lc.add_direction("D0202", -2, 0) == "D0202"
+    assert lc.add_steps_to_packed_code(p, -2, 7 * period) == p
+    for k in [10**18 + 3, 10**30 + period // 2]:
+        assert lc.add_steps_to_packed_code(p, -2, k) == line[k % period]
+    assert lc.add_direction("C0000", 1, 16) == "A0000"
+    assert lc.add_direction("C0000", 1, 17) is None
+    with pytest.raises(ValueError):
+        lc.add_direction("C0000", 1, -1)
+
+
+def test_point_path():
+    path = paths.get_point_path("C1110000", "C2220000", 3)
+    expected = ["C1110000"]
+    while expected[-1] != "C2220000":
+        expected.append(lc.add_direction(expected[-1], 3))
+    assert path == expected
+    ppcs, xyz = paths.get_point_path_arrays("C1110000", 3, len(path) - 1)
+    assert ppc.get_point_code_array_from_packed_codes(ppcs).tolist() == path
+    assert xyz.shape == (len(path), 3)
+    assert np.allclose(np.linalg.norm(xyz, axis=1), 1)
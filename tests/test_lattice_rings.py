@@ -0,0 +1,92 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.LatticeRings as lr
+import icosalattice.PackedPointCodes as ppc
+import icosalattice.StartingPoints as sp
+from icosalattice.AdjacencyArrays import get_neighbor_array_from_packed_codes, NO_NEIGHBOR
+
+
+def get_distances_by_search(p, k, neighbors):
+    distances = {p: 0}
+    frontier = [p]
+    for j in range(1, k + 1):
+        frontier = [q for a in frontier for q in neighbors[a] if q not in distances]
+        frontier = list(dict.fromkeys(frontier))
+        distances.update((q, j) for q in frontier)
+    return distances
+
+
+def test_rings_match_breadth_first_search():
+    ppcs = gpc.get_all_packed_codes_at_iteration(4)
+    table = get_neighbor_array_from_packed_codes(ppcs)
+    neighbors = {int(p): [int(q) for q in row if q != NO_NEIGHBOR] for p, row in zip(ppcs, table)}
+    for k in range(5):
+        hex_rings = lr.get_hex_ring_array_from_packed_codes(ppcs, k)
+        k_rings = lr.get_k_ring_array_from_packed_codes(ppcs, k)
+        assert hex_rings.shape == (len(ppcs), lr.get_max_hex_ring_size(k))
+        assert k_rings.shape == (len(ppcs), lr.get_max_k_ring_size(k))
+        for p, hex_ring, k_ring in zip(ppcs, hex_rings, k_rings):
+            distances = get_distances_by_search(int(p), k, neighbors)
+            expected_rings = [sorted(q for q, v in distances.items() if v == j) for j in range(k + 1)]
+            assert hex_ring[hex_ring != NO_NEIGHBOR].tolist() == expected_rings[k]
+            assert k_ring[k_ring != NO_NEIGHBOR].tolist() == sum(expected_rings, [])
+
+
+def test_regular_rings():
+    assert lr.get_hex_distance_from_ld_offsets(lr.get_hex_ring_ld_offsets(5)[:, 0], lr.get_hex_ring_ld_offsets(5)[:, 1]).tolist() == [5] * 30
+    ring = lr.hex_ring("G01230", 2)
+    assert len(ring) == 12 and len(set(ring)) == 12
+    assert lr.k_ring("G01230", 3)[0] == "G01230"
+    assert len(lr.k_ring("G01230", 3)) == 37
+    # pentagons and poles have 5 neighbors
+    assert len(lr.hex_ring("C000", 1)) == 5
+    assert len(lr.hex_ring("A000", 1)) == 5
+    assert lr.hex_ring("A", 1).tolist() == sorted(lr.hex_ring("A", 1))
+    with pytest.raises(ValueError):
+        lr.k_ring("C000", -1)
+
+
+def test_rings_of_mixed_iterations():
+    pcs = ["C000", "G0123", "K11", "B", "D3333", "E0101010101"]
+    ppcs = ppc.get_packed_code_array_from_point_codes(pcs)
+    k_rings = lr.get_k_ring_array_from_packed_codes(ppcs, 3)
+    for pc, k_ring in zip(pcs, k_rings):
+        assert ppc.get_point_code_array_from_packed_codes(k_ring[k_ring != NO_NEIGHBOR]).tolist() == lr.k_ring(pc, 3).tolist()
+
+
+@pytest.mark.parametrize("iterations, every", [(2, 1), (3, 4), (5, 512)])
+def test_hop_distances_match_breadth_first_search(iterations, every):
+    # all pairs from every so many points, and from the poles and pentagons
+    ppcs = gpc.get_all_packed_codes_at_iteration(iterations)
+    table = get_neighbor_array_from_packed_codes(ppcs)
+    neighbors = {int(p): [int(q) for q in row if q != NO_NEIGHBOR] for p, row in zip(ppcs, table)}
+    starting_points = ppc.get_packed_code_array_from_point_codes([pc + "0" * iterations for pc in sp.STARTING_POINT_CODES])
+    sources = np.unique(np.concatenate([ppcs[::every], starting_points]))
+    searched = [get_distances_by_search(int(p), 3 * 2 ** iterations, neighbors) for p in sources]
+    expected = [distances[int(q)] for distances in searched for q in ppcs]
+    ppcs1 = np.repeat(sources, len(ppcs))
+    ppcs2 = np.tile(ppcs, len(sources))
+    assert lr.get_hop_distance_array_from_packed_codes(ppcs1, ppcs2).tolist() == expected
+    assert lr.get_hop_distance_array_from_packed_codes(ppcs2, ppcs1).tolist() == expected
+
+
+def test_far_hop_distances():
+    # points far apart on different peels at iteration 9, with their distances from breadth-first search over the whole level
+    pairs = {("C000000000", "H222222221"): 1025, ("A000000000", "B000000000"): 1536, ("G131313131", "L202020202"): 1194}
+    for (pc1, pc2), distance in pairs.items():
+        assert lr.hop_distance(pc1, pc2) == distance
+        assert lr.hop_distance(pc2, pc1) == distance
+
+
+def test_hop_distance():
+    assert lr.hop_distance("C0000", "C0000") == 0
+    assert lr.hop_distance("A", "B") == 3
+    for pc in ["G0123", "C0000", "D3333", "K2121", "A000"]:
+        for k in range(4):
+            for q in lr.hex_ring(pc, k):
+                assert lr.hop_distance(pc, q) == k
+    with pytest.raises(ValueError):
+        lr.hop_distance("C000", "C00")
@@ -0,0 +1,58 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+from icosalattice.AdjacencyGraph import build_neighbor_table
+from icosalattice.CoordinatesOfPointCode import get_xyz_array_from_packed_codes
+from icosalattice.LevelStreams import (
+    iterate_level_chunks, with_field, map_chunks, collect_statistics, get_statistics_of_field,
+    write_field_to_npy, consume, RunningStatistics,
+)
+
+
+def test_chunks_cover_level_in_canonical_order():
+    iterations = 3
+    chunks = list(iterate_level_chunks(iterations, chunk_size=100, with_neighbors=True))
+    assert all(len(chunk.indices) <= 100 for chunk in chunks)
+    ppcs = np.concatenate([chunk.packed_codes for chunk in chunks])
+    assert np.array_equal(ppcs, gpc.get_all_packed_codes_at_iteration(iterations))
+    assert np.array_equal(np.concatenate([chunk.indices for chunk in chunks]), np.arange(len(ppcs)))
+    assert np.array_equal(np.concatenate([chunk.xyz for chunk in chunks]), get_xyz_array_from_packed_codes(ppcs))
+    assert np.array_equal(np.concatenate([chunk.neighbors for chunk in chunks]), build_neighbor_table(iterations))
+
+    chunks = list(iterate_level_chunks(iterations, chunk_size=100, with_xyz=False, start=150, stop=420))
+    assert chunks[0].xyz is None and chunks[0].neighbors is None
+    assert np.array_equal(np.concatenate([chunk.indices for chunk in chunks]), np.arange(150, 420))
+
+
+def test_pipeline_statistics_and_writer(tmp_path):
+    iterations = 4
+    path = tmp_path / "z.npy"
+    stats = RunningStatistics()
+    chunks = iterate_level_chunks(iterations, chunk_size=777)
+    chunks = with_field(chunks, "z", lambda chunk: chunk.xyz[:, 2])
+    chunks = collect_statistics(chunks, "z", stats)
+    z = write_field_to_npy(chunks, "z", path)
+
+    expected = get_xyz_array_from_packed_codes(gpc.get_all_packed_codes_at_iteration(iterations))[:, 2]
+    assert np.array_equal(z, expected)
+    assert np.array_equal(np.load(path), expected)
+    assert stats.count == len(expected)
+    assert np.isclose(stats.mean, expected.mean())
+    assert np.isclose(stats.std, expected.std())
+    assert stats.min == expected.min() and stats.max == expected.max()
+
+
+def test_pipeline_stages_compose():
+    iterations = 2
+    chunks = iterate_level_chunks(iterations, chunk_size=50, with_xyz=False)
+    chunks = with_field(chunks, "double_index", lambda chunk: 2 * chunk.indices)
+    chunks = map_chunks(chunks, lambda chunk: chunk._replace(indices=chunk.indices + 1))
+    stats = get_statistics_of_field(chunks, "double_index")
+    n = len(gpc.get_all_packed_codes_at_iteration(iterations))
+    assert stats.count == n
+    assert stats.max == 2 * (n - 1)
+
+    with pytest.raises(ValueError):
+        consume(with_field(iterate_level_chunks(1), "bad", lambda chunk: [0]))
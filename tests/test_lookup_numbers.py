@@ -0,0 +1,36 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.LookupNumbers as lk
+
+from TestUtil import TEST_POINT_CODES
+
+
+def test_lookup_number_array_matches_scalar():
+    pcs = TEST_POINT_CODES + gpc.get_all_point_codes_at_iteration(iterations=3)
+    lns = lk.get_prefix_lookup_number_array_from_point_codes(pcs)
+    assert lns.dtype == np.uint64
+    assert lns.view(np.int64).tolist() == lk.get_prefix_lookup_numbers_from_point_codes(pcs)
+    for pc, ln in zip(pcs, lns.view(np.int64).tolist()):
+        assert lk.get_point_code_from_prefix_lookup_number(ln, iterations=len(pc) - 1) == pc
+
+
+def test_lookup_number_array_round_trip():
+    iterations = 4
+    pcs = gpc.get_all_point_codes_at_iteration(iterations)
+    lns = lk.get_prefix_lookup_number_array_from_point_codes(pcs)
+    assert len(set(lns.tolist())) == len(pcs)
+    assert lk.get_point_code_array_from_prefix_lookup_numbers(lns, iterations).tolist() == pcs
+
+
+def test_prefix_match_mask():
+    pcs = gpc.get_all_point_codes_at_iteration(iterations=3)
+    lns = lk.get_prefix_lookup_number_array_from_point_codes(pcs)
+    for prefixes in [["C1"], ["G", "K20", "D3"], ["A", "E02", "F0"], ["B"], ["L333", "L332", "C"]]:
+        mask = lk.get_prefix_match_mask(lns, prefixes)
+        expected = [any(pc.startswith(prefix) for prefix in prefixes) for pc in pcs]
+        assert mask.tolist() == expected, prefixes
+        for pc, m in zip(pcs, mask):
+            assert any(lk.point_code_matches_prefix(pc, prefix) for prefix in prefixes) == m, pc
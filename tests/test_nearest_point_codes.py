@@ -0,0 +1,69 @@
+import pytest
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.CoordinatesOfPointCode import METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY
+import icosalattice.NearestPointCodes as npc
+
+
+def get_random_unit_vectors(n, seed=0):
+    rng = np.random.default_rng(seed)
+    xyz = rng.normal(size=(n, 3))
+    return xyz / np.linalg.norm(xyz, axis=1)[:, None]
+
+
+@pytest.mark.parametrize("method", sorted(METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY))
+def test_nearest_point_matches_brute_force(method):
+    xyz = get_random_unit_vectors(5000)
+    for iterations in [0, 2, 8]:
+        ppcs, distances = npc.get_nearest_packed_codes_to_xyz_array(xyz, iterations=iterations, method=method)
+        lattice_xyz = METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY[method](gpc.get_all_packed_codes_at_iteration(iterations))
+        d_3d, indices = cKDTree(lattice_xyz).query(xyz)
+        assert (ppcs == gpc.get_packed_codes_from_canonical_indices(indices, iterations)).all()
+        assert np.allclose(distances, 2 * np.arcsin(d_3d / 2), atol=1e-12)
+
+
+def test_lattice_points_snap_to_themselves():
+    iterations = 9
+    ppcs = gpc.get_all_packed_codes_at_iteration(iterations)[::997]
+    xyz = METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY["cpg1"](ppcs)
+    res, distances = npc.get_nearest_packed_codes_to_xyz_array(xyz, iterations=iterations, method="cpg1")
+    assert (res == ppcs).all()
+    assert np.allclose(distances, 0)
+
+
+def test_nearest_point_within_max_distance():
+    xyz = get_random_unit_vectors(2000, seed=1)
+    planet_radius = 6371
+    max_distance = 50
+    ppcs, distances = npc.get_nearest_packed_codes_to_xyz_array(xyz, max_distance=max_distance, planet_radius=planet_radius)
+    assert (distances <= max_distance).all()
+
+    # the result is the nearest point at its own iteration, and the point at the iteration before is too far
+    iterations = ppcs & ppc.ITERATION_MASK
+    for n in np.unique(iterations):
+        mask = iterations == n
+        res, d = npc.get_nearest_packed_codes_to_xyz_array(xyz[mask], iterations=int(n), planet_radius=planet_radius)
+        assert (res == ppcs[mask]).all()
+        if n > 0:
+            _, d = npc.get_nearest_packed_codes_to_xyz_array(xyz[mask], iterations=int(n) - 1, planet_radius=planet_radius)
+            assert (d > max_distance).all()
+
+
+def test_max_distance_not_reached_by_max_iterations():
+    xyz = get_random_unit_vectors(100, seed=2)
+    with pytest.raises(ValueError):
+        npc.get_nearest_packed_codes_to_xyz_array(xyz, max_distance=1e-4, max_iterations=3)
+    ppcs, distances = npc.get_nearest_packed_codes_to_xyz_array(xyz, max_distance=1e-4, max_iterations=ppc.MAX_ITERATIONS)
+    assert (distances <= 1e-4).all()
+
+
+def test_nearest_point_codes_to_latlon():
+    pcs, distances = npc.get_nearest_point_codes_to_latlon_array([[90, 0], [-90, 45]], iterations=3)
+    assert list(pcs) == ["A000", "B000"]
+    assert np.allclose(distances, 0)
+    with pytest.raises(ValueError):
+        npc.get_nearest_packed_codes_to_xyz_array([[1, 0, 0]])
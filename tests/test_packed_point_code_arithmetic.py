@@ -0,0 +1,23 @@
+import pytest
+
+import icosalattice.PackedPointCodes as ppc
+import icosalattice.PackedPointCodeArithmetic as ppca
+
+from TestUtil import TEST_POINT_CODES, get_stored_point_code_arithmetic_results
+
+
+def test_packed_point_code_round_trip():
+    for pc in TEST_POINT_CODES:
+        p = ppc.get_packed_code_from_point_code(pc)
+        assert ppc.get_point_code_from_packed_code(p) == pc, pc
+        assert ppc.get_iteration_number_from_packed_code(p) == len(pc) - 1, pc
+
+
+def test_packed_point_code_arithmetic_matches_string_arithmetic():
+    # against the stored results of the original string case analysis, since add_direction_to_point_code now steps in lattice coordinates
+    for pc, results in get_stored_point_code_arithmetic_results().items():
+        p = ppc.get_packed_code_from_point_code(pc)
+        for x, expected in results.items():
+            got = ppc.get_point_code_from_packed_code(ppca.add_direction_to_packed_code(p, x))
+            if got != expected:
+                raise Exception(f"{pc} {x:+} = {expected} but got {got}")
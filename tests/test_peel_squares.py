@@ -0,0 +1,60 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+import icosalattice.PeelSquares as sq
+from icosalattice.AdjacencyArrays import NO_NEIGHBOR
+from icosalattice.AdjacencyGraph import build_neighbor_table
+
+
+def test_split_and_join_squares():
+    iterations = 3
+    values = np.random.default_rng(0).normal(size=len(gpc.get_all_packed_codes_at_iteration(iterations)))
+    squares, poles = sq.split_field_into_squares(values, iterations)
+    assert squares.shape == (10, 8, 8)
+    assert (poles == values[:2]).all()
+    # C2 is l = d = 1 at iteration 1, i.e. l = d = 4 at iteration 3
+    assert squares[0, 4, 4] == values[gpc.get_canonical_indices_from_packed_codes(ppc.get_packed_code_array_from_point_codes(["C200"]))[0]]
+    assert (sq.join_squares_into_field(squares, poles) == values).all()
+
+
+def test_neighbor_views_match_neighbor_table():
+    for iterations in [0, 1, 2, 4]:
+        table = build_neighbor_table(iterations)
+        canonical_of_flat = sq.get_canonical_indices_of_flat_layout(iterations)
+        flat_of_canonical = np.argsort(canonical_of_flat)
+        # each point's value is its own canonical index, so each neighbor view should be a column of the neighbor table
+        squares, poles = sq.split_field_into_squares(np.arange(len(table)), iterations)
+        views = sq.get_neighbor_views(sq.add_halo(squares, poles, fill_value=NO_NEIGHBOR))
+        mask = sq.get_neighbor_mask(iterations)
+        expected_squares, _ = sq.split_field_into_squares(table, iterations)
+        for col, (view, m) in enumerate(zip(views, mask)):
+            assert (view[m] == expected_squares[..., col][m]).all(), (iterations, col)
+        assert (~mask).sum() == 10
+        assert ((expected_squares == NO_NEIGHBOR).sum(axis=-1) == (~mask).sum(axis=0)).all()
+        pole_neighbors = canonical_of_flat[sq.get_pole_neighbor_indices(iterations)]
+        assert (pole_neighbors == table[:2, :5]).all()
+
+
+def test_neighbor_mean_matches_neighbor_table():
+    iterations = 3
+    table = build_neighbor_table(iterations)
+    values = np.random.default_rng(1).normal(size=len(table))
+    has_neighbor = table != NO_NEIGHBOR
+    expected = np.where(has_neighbor, values[table], 0).sum(axis=1) / has_neighbor.sum(axis=1)
+    squares, poles = sq.split_field_into_squares(values, iterations)
+    mean_squares, mean_poles = sq.get_neighbor_mean(squares, poles)
+    assert np.allclose(sq.join_squares_into_field(mean_squares, mean_poles), expected)
+
+
+def test_exchange_halo_after_update():
+    iterations = 2
+    squares, poles = sq.split_field_into_squares(np.zeros(len(gpc.get_all_packed_codes_at_iteration(iterations))), iterations)
+    padded = sq.add_halo(squares, poles)
+    padded[:, 1:-1, 1:-1] += 1
+    sq.exchange_halo(padded, poles + 1)
+    assert (padded[:, 1:-1, 1:-1] == 1).all()
+    assert (padded[:, 0, 1:-1] == 1).all()
+    assert np.isnan(padded[:, 0, -1]).all()
@@ -0,0 +1,55 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PeelSymmetry as ps
+from icosalattice.AdjacencyArrays import NO_NEIGHBOR
+from icosalattice.AdjacencyGraph import build_neighbor_table
+from icosalattice.CoordinatesOfPointCode import METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY
+
+
+SYMMETRY_OPTIONS = [dict(use_rotation=r, use_mirror=m) for r in [True, False] for m in [True, False]]
+
+
+def test_xyz_table_matches_direct_placement():
+    iterations = 4
+    ppcs = gpc.get_all_packed_codes_at_iteration(iterations)
+    for method, f in METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY.items():
+        expected = f(ppcs)
+        for options in SYMMETRY_OPTIONS:
+            assert np.allclose(ps.build_xyz_table(iterations, method=method, **options), expected, rtol=0, atol=1e-12), (method, options)
+
+
+def test_representative_indices():
+    iterations = 3
+    n_points = len(gpc.get_all_packed_codes_at_iteration(iterations))
+    assert len(ps.get_symmetry_representative_indices(iterations, use_rotation=False, use_mirror=False)) == n_points
+    assert len(ps.get_symmetry_representative_indices(iterations, use_mirror=False)) == 2 + (n_points - 2) // 5
+    indices = ps.get_symmetry_representative_indices(iterations)[2:]
+    mirrored = ps.get_mirror_canonical_indices(indices, iterations)
+    assert (ps.get_mirror_canonical_indices(mirrored, iterations) == indices).all()
+    assert len(np.union1d(indices, mirrored)) == (n_points - 2) // 5
+
+
+def test_cell_areas_and_edge_lengths_dont_depend_on_symmetry():
+    iterations = 3
+    areas = [ps.build_cell_area_table(iterations, **options) for options in SYMMETRY_OPTIONS]
+    lengths = [ps.build_edge_length_table(iterations, **options) for options in SYMMETRY_OPTIONS]
+    for a, l in zip(areas[1:], lengths[1:]):
+        assert np.allclose(a, areas[0], rtol=1e-12, atol=0)
+        assert np.allclose(l, lengths[0], rtol=1e-12, atol=0)
+    assert np.isclose(areas[0].sum(), 4 * np.pi)
+    assert (areas[0] > 0).all()
+
+
+def test_edge_lengths_match_neighbor_table():
+    iterations = 3
+    xyz = ps.build_xyz_table(iterations)
+    table = build_neighbor_table(iterations)
+    lengths = ps.build_edge_length_table(iterations)
+    has_neighbor = table != NO_NEIGHBOR
+    assert (np.isinf(lengths) == ~has_neighbor).all()
+    rows, cols = np.nonzero(has_neighbor)
+    expected = np.arccos(np.clip(np.sum(xyz[rows] * xyz[table[rows, cols]], axis=1), -1, 1))
+    assert np.allclose(lengths[rows, cols], expected)
@@ -2,6 +2,8 @@ import pytest
 
 import icosalattice.PointCodeArithmetic as pca
 
+from TestUtil import get_stored_point_code_arithmetic_results
+
 
 def test_point_code_arithmetic():
     test_cases = {
@@ -27,3 +29,18 @@ def test_point_code_arithmetic():
             # print(f"{pc} {x:+} = {got}")
             if got != target:
                 raise Exception(f"{pc} {x:+} = {target} but got {got}")
+
+
+def test_invalid_directions_and_debug():
+    for x in [0, 4, -4, "1"]:
+        assert pca.add_direction_to_point_code("C0123", x) is None
+    # debug only adds tracing, it doesn't change which code path runs
+    for pc in ["C1", "D300", "K23", "A00"]:
+        for x in [1, 2, 3, -1, -2, -3]:
+            assert pca.add_direction_to_point_code(pc, x, debug=True) == pca.add_direction_to_point_code(pc, x)
+
+
+def test_point_code_arithmetic_matches_stored_string_arithmetic():
+    for pc, results in get_stored_point_code_arithmetic_results().items():
+        for x, expected in results.items():
+            assert pca.add_direction_to_point_code(pc, x) == expected, (pc, x)
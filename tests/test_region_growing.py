@@ -0,0 +1,48 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+from icosalattice.AdjacencyGraph import build_neighbor_table
+from icosalattice.HierarchicalOrder import get_indices_from_index_ranges
+from icosalattice.RegionQueries import points_in_cap
+from icosalattice.RegionGrowing import (
+    grow_region, iterate_region_rings, get_region_around_point_by_spreading,
+    get_mask_predicate, get_field_threshold_predicate,
+)
+
+
+def test_spreading_matches_cap_query():
+    for center, radius, iterations in [("C0101", 0.5, 4), ("K2", 0.2, 7), ("A", 0.3, 5)]:
+        res = get_region_around_point_by_spreading(center, radius, iterations)
+        expected = get_indices_from_index_ranges(*points_in_cap(center, radius, iterations))
+        assert np.array_equal(res, expected)
+
+
+def test_spreading_with_neighbor_table():
+    iterations = 4
+    table = build_neighbor_table(iterations)
+    res = get_region_around_point_by_spreading("G30", 0.4, iterations, neighbor_table=table)
+    assert np.array_equal(res, get_region_around_point_by_spreading("G30", 0.4, iterations))
+
+
+def test_rings_are_disjoint_and_connected_region_only():
+    iterations = 3
+    n_points = 2 + 10 * 4**iterations
+    table = build_neighbor_table(iterations)
+    # two separate blobs in the mask; growing from one must not reach the other
+    blob1 = get_indices_from_index_ranges(*points_in_cap("C", 0.3, iterations))
+    blob2 = get_indices_from_index_ranges(*points_in_cap("H", 0.3, iterations))
+    mask = np.zeros(n_points, dtype=bool)
+    mask[blob1] = True
+    mask[blob2] = True
+    rings = list(iterate_region_rings([blob1[0]], get_mask_predicate(mask), iterations, neighbor_table=table))
+    all_points = np.concatenate(rings)
+    assert len(all_points) == len(np.unique(all_points))
+    assert np.array_equal(np.sort(all_points), blob1)
+
+    field = np.arange(n_points)
+    res = grow_region([0], get_field_threshold_predicate(field, max_value=-1), iterations, neighbor_table=table)
+    assert len(res) == 0
+    res = grow_region([0], get_field_threshold_predicate(field, min_value=0), iterations, neighbor_table=table)
+    assert len(res) == n_points
@@ -0,0 +1,95 @@
+import pytest
+
+import numpy as np
+import shapely
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.CoordinatesOfPointCode import METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY
+from icosalattice.HierarchicalOrder import get_indices_from_index_ranges, descendant_range
+from icosalattice.RegionQueries import (
+    points_in_cap, points_in_latlon_rectangle, points_in_polygon,
+    get_angle_between_unit_vectors, get_watershed_cap_radii, get_latlon_arrays_from_xyz,
+)
+
+
+@pytest.mark.parametrize("method", ["cpg1", "rta1"])
+def test_points_in_cap_matches_brute_force(method):
+    rng = np.random.default_rng(0)
+    for iterations in [0, 2, 5]:
+        ppcs = gpc.get_all_packed_codes_at_iteration(iterations)
+        xyz = METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY[method](ppcs)
+        for _ in range(10):
+            center = rng.normal(size=3)
+            center /= np.linalg.norm(center)
+            radius = rng.uniform(0, 1.5)
+            starts, stops = points_in_cap(center, radius, iterations, method=method)
+            assert (starts[1:] > stops[:-1]).all()
+            expected = np.flatnonzero(get_angle_between_unit_vectors(xyz, center) <= radius)
+            assert np.array_equal(get_indices_from_index_ranges(starts, stops), expected)
+
+
+def test_points_in_cap_around_point_code():
+    planet_radius = 6371
+    starts, stops = points_in_cap("A", 1, 4, planet_radius=planet_radius)
+    assert list(starts) == [0] and list(stops) == [1]
+
+    # whole watersheds inside the cap come out as ranges, not individual points
+    starts, stops = points_in_cap("C0101", 0.05, 12)
+    assert (stops - starts).max() > 1
+
+
+def test_watershed_cap_radii_contain_descendants():
+    method = "cpg1"
+    radii = get_watershed_cap_radii(method)
+    f_xyz = METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY[method]
+    for ancestor in ["F213011", "C000000", "L333333", "H1"]:
+        p = len(ancestor) - 1
+        n = p + 5
+        descendants = gpc.get_packed_codes_from_canonical_indices(np.arange(*descendant_range(ancestor, n)), n)
+        ancestor_xyz = f_xyz(ppc.get_packed_code_array_from_point_codes([ancestor]))[0]
+        assert get_angle_between_unit_vectors(f_xyz(descendants), ancestor_xyz).max() <= radii[p]
+
+
+def get_all_latlons(iterations, method="cpg1"):
+    xyz = METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY[method](gpc.get_all_packed_codes_at_iteration(iterations))
+    return get_latlon_arrays_from_xyz(xyz)
+
+
+def test_points_in_latlon_rectangle_matches_brute_force():
+    rng = np.random.default_rng(1)
+    for iterations in [0, 3, 5]:
+        lat, lon = get_all_latlons(iterations)
+        rectangles = [(-90, 90, -180, 180), (-90, -60, -180, 180), (10, 40, 170, -170)]
+        for _ in range(20):
+            min_lat, max_lat = np.sort(rng.uniform(-90, 90, 2))
+            min_lon, max_lon = rng.uniform(-180, 180, 2)
+            rectangles.append((min_lat, max_lat, min_lon, max_lon))
+        for min_lat, max_lat, min_lon, max_lon in rectangles:
+            mask = points_in_latlon_rectangle(min_lat, max_lat, min_lon, max_lon, iterations, method="cpg1", as_mask=True)
+            in_lon = (min_lon <= lon) & (lon <= max_lon) if min_lon <= max_lon else (lon >= min_lon) | (lon <= max_lon)
+            expected = (min_lat <= lat) & (lat <= max_lat) & in_lon
+            assert np.array_equal(mask, expected), (min_lat, max_lat, min_lon, max_lon)
+
+
+def test_points_in_polygon_matches_brute_force():
+    rng = np.random.default_rng(2)
+    for iterations in [0, 3, 5]:
+        lat, lon = get_all_latlons(iterations)
+        polygons = [
+            shapely.Point(10, 45).buffer(15),
+            shapely.box(170, -30, 180, 30),  # against the antimeridian
+            shapely.box(-180, -90, 180, -70),  # around the south pole
+            shapely.MultiPolygon([shapely.box(0, 0, 20, 20), shapely.box(-100, 30, -80, 50)]),
+        ]
+        for _ in range(10):
+            lonlats = rng.uniform([-180, -80], [180, 80], (8, 2))
+            polygons.append(shapely.Polygon(lonlats).convex_hull)
+        for polygon in polygons:
+            mask = points_in_polygon(polygon, iterations, method="cpg1", as_mask=True)
+            assert np.array_equal(mask, shapely.intersects_xy(polygon, lon, lat)), polygon
+
+    # vertices can also be given as (lat, lon)
+    latlons = [(0, 0), (0, 30), (30, 30), (30, 0)]
+    starts, stops = points_in_polygon(latlons, 4)
+    assert np.array_equal(starts, points_in_latlon_rectangle(0, 30, 0, 30, 4)[0])
@@ -0,0 +1,70 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.GeneratePointCodes as gpc
+import icosalattice.PackedPointCodes as ppc
+from icosalattice.Regions import PointCodeRegion
+from icosalattice.RegionQueries import points_in_cap, points_in_latlon_rectangle
+
+from TestUtil import TEST_POINT_CODES
+
+
+def test_complete_children_merge_into_parent():
+    region = PointCodeRegion.from_point_codes(["C1", "C2", "C3", "C0"])
+    assert region.get_cell_point_codes() == ["C"]
+    region = PointCodeRegion.from_point_codes(["C1", "C2", "C3", "C00"])
+    assert region.get_cell_point_codes() == ["C00", "C1", "C2", "C3"]
+    region = PointCodeRegion.from_point_codes(["B", "D", "A", "E3", "E2"])
+    assert region.get_cell_point_codes() == ["A", "B", "D", "E2", "E3"]
+
+
+def test_region_contains_descendants_of_cells():
+    region = PointCodeRegion.from_point_codes(["C1", "G302"])
+    assert "C1" in region
+    assert "C13200" in region
+    assert "C" not in region
+    assert "G3" not in region
+    assert "G3021" in region
+    assert "G303" not in region
+    ppcs = ppc.get_packed_code_array_from_point_codes(TEST_POINT_CODES)
+    expected = [pc.startswith("C1") or pc.startswith("G302") for pc in TEST_POINT_CODES]
+    assert list(region.contains_packed_codes(ppcs)) == expected
+
+
+def test_set_algebra_matches_masks():
+    a = PointCodeRegion.from_index_ranges(*points_in_cap("C0101", 0.3, 9), 9)
+    b = PointCodeRegion.from_index_ranges(*points_in_latlon_rectangle(0, 60, -30, 30, 8), 8)
+    for iterations in [4, 7]:
+        mask_a = a.get_mask(iterations)
+        mask_b = b.get_mask(iterations)
+        assert np.array_equal((a | b).get_mask(iterations), mask_a | mask_b)
+        assert np.array_equal((a & b).get_mask(iterations), mask_a & mask_b)
+        assert np.array_equal((a - b).get_mask(iterations), mask_a & ~mask_b)
+        assert np.array_equal((a ^ b).get_mask(iterations), mask_a ^ mask_b)
+    assert (a | b).contains_region(a)
+    assert not a.contains_region(a | b)
+    assert (a - a).is_empty()
+
+
+def test_region_expansion_to_iteration():
+    iterations = 5
+    starts, stops = points_in_cap("H", 0.5, iterations)
+    region = PointCodeRegion.from_index_ranges(starts, stops, iterations)
+    assert np.array_equal(region.get_canonical_indices(iterations), np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)]))
+    ppcs = region.get_packed_codes(iterations)
+    assert region.contains_packed_codes(ppcs).all()
+    assert region.get_n_points(iterations + 1) > 3 * region.get_n_points(iterations)
+    assert PointCodeRegion.from_mask(region.get_mask(iterations), iterations) == region
+
+    # the cells are the region itself
+    assert PointCodeRegion.from_packed_codes(region.get_cells()) == region
+
+
+def test_region_serialization_round_trip():
+    region = PointCodeRegion.from_index_ranges(*points_in_cap("K2", 0.2, 10), 10) | PointCodeRegion.from_point_codes(["A", "L"])
+    b = region.to_bytes()
+    assert PointCodeRegion.from_bytes(b) == region
+    assert PointCodeRegion.from_bytes(PointCodeRegion().to_bytes()).is_empty()
+    with pytest.raises(ValueError):
+        PointCodeRegion.from_bytes(b"nonsense")
@@ -0,0 +1,98 @@
+import pytest
+
+import numpy as np
+
+import icosalattice.CoordinatesOfPointCode as coords
+import icosalattice.GeneratePointCodes as gpc
+from icosalattice.CoordinatesOfPointCode import METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY
+from icosalattice.SpatialIndex import (
+    LatticePointIndex, NO_POINT, get_spatial_index_of_iteration, get_spatial_index_cache_path,
+)
+from icosalattice.DistancesOnSphere import convert_distance_3d_to_great_circle
+
+
+def get_brute_force_distances(query_xyz, candidate_xyz):
+    d_3d = np.linalg.norm(query_xyz[:, None, :] - candidate_xyz[None, :, :], axis=2)
+    return convert_distance_3d_to_great_circle(np.minimum(d_3d, 2))
+
+
+def test_knn_matches_brute_force_without_self():
+    iterations = 3
+    index = LatticePointIndex.from_iteration(iterations, method="cpg1")
+    ppcs = gpc.get_all_packed_codes_at_iteration(iterations)
+    xyz = METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY["cpg1"](ppcs)
+    k = 6
+    distances, indices = index.query_packed_codes(ppcs, k=k)
+    assert distances.shape == indices.shape == (len(ppcs), k)
+    assert (indices != np.arange(len(ppcs))[:, None]).all()
+
+    expected = get_brute_force_distances(xyz, xyz)
+    np.fill_diagonal(expected, np.inf)
+    assert np.allclose(distances, np.sort(expected, axis=1)[:, :k])
+
+    distances_with_self, indices_with_self = index.query_packed_codes(ppcs, k=1, allow_self=True)
+    assert (indices_with_self[:, 0] == np.arange(len(ppcs))).all()
+    assert np.allclose(distances_with_self, 0)
+
+
+def test_exclusion_of_points_not_in_index():
+    # query points that aren't in the candidate set keep all k of their nearest neighbors
+    candidates = gpc.get_all_packed_codes_at_iteration(2)
+    index = LatticePointIndex.from_packed_codes(candidates[::2], method="cpg1")
+    queries = candidates[:50]
+    assert ((index.get_indices_of_packed_codes(queries) == NO_POINT) == (np.arange(50) % 2 == 1)).all()
+    distances, indices = index.query_packed_codes(queries, k=3)
+    query_xyz = METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY["cpg1"](queries[1::2])
+    expected = np.sort(get_brute_force_distances(query_xyz, index.xyz), axis=1)[:, :3]
+    assert np.allclose(distances[1::2], expected)
+
+
+def test_radius_query_matches_brute_force():
+    index = LatticePointIndex.from_iteration(3, method="cpg1")
+    rng = np.random.default_rng(0)
+    xyz = rng.normal(size=(100, 3))
+    xyz /= np.linalg.norm(xyz, axis=1)[:, None]
+    planet_radius = 6371
+    radius = 1000
+    offsets, indices, distances = index.query_radius(xyz, radius, planet_radius=planet_radius)
+    expected = planet_radius * get_brute_force_distances(xyz, index.xyz)
+    for i in range(len(xyz)):
+        these_distances = distances[offsets[i]:offsets[i+1]]
+        assert set(indices[offsets[i]:offsets[i+1]]) == set(np.flatnonzero(expected[i] <= radius))
+        assert (np.diff(these_distances) >= 0).all()
+        assert np.allclose(these_distances, expected[i, indices[offsets[i]:offsets[i+1]]])
+
+
+def test_radius_query_excludes_self():
+    ppcs = gpc.get_all_packed_codes_at_iteration(2)
+    index = LatticePointIndex.from_packed_codes(ppcs, method="cpg1")
+    radius = 1.2 * np.arctan(2) / 4  # a bit more than the distance between neighbors
+    offsets, indices, distances = index.query_radius_packed_codes(ppcs, radius)
+    counts = np.diff(offsets)
+    assert ((counts == 5) | (counts == 6)).all()
+    assert (indices != np.repeat(np.arange(len(ppcs)), counts)).all()
+
+
+def test_spatial_index_save_and_load(tmp_path):
+    index = get_spatial_index_of_iteration(2, method="cpg1", cache_dir=tmp_path)
+    loaded = LatticePointIndex.load(get_spatial_index_cache_path(2, method="cpg1", cache_dir=tmp_path))
+    assert loaded is not index
+    assert (loaded.packed_codes == index.packed_codes).all()
+    assert (loaded.xyz == index.xyz).all()
+    assert (loaded.query(index.xyz, k=2)[1] == index.query(index.xyz, k=2)[1]).all()
+
+
+def test_spatial_index_follows_chosen_method(monkeypatch):
+    monkeypatch.setattr(coords, "CHOSEN_METHOD", "cpg1")
+    assert get_spatial_index_of_iteration(1).method == "cpg1"
+    other_method = next(m for m in METHOD_NAME_TO_FUNCTION_PACKED_CODES_TO_XYZ_ARRAY if m != "cpg1")
+    monkeypatch.setattr(coords, "CHOSEN_METHOD", other_method)
+    assert get_spatial_index_of_iteration(1).method == other_method
+
+
+def test_query_with_more_neighbors_than_points():
+    index = LatticePointIndex.from_iteration(0, method="cpg1")
+    distances, indices = index.query_packed_codes(index.packed_codes[:2], k=12)
+    assert (indices[:, -1] == len(index)).all()
+    assert np.isinf(distances[:, -1]).all()
+    assert np.isfinite(distances[:, :-1]).all()
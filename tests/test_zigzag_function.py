@@ -3,7 +3,7 @@ import pytest
 import math
 import numpy as np
 
-from icosalattice.MathUtil import zigzag, zigzag_inverse
+from icosalattice.MathUtil import zigzag, zigzag_inverse, zigzag_array, zigzag_inverse_array
 
 
 def test_zigzag_function():
@@ -19,3 +19,14 @@ def test_zigzag_function():
             n = math.floor(x/a)
             zi = zigzag_inverse(z, a=a, n=n)
             assert np.isclose(zi, x, rtol=1e-9), f"{a = :f}, {x = :f}, {z = :f}, {n = :f}, {zi = :f}"
+
+
+def test_zigzag_array_matches_scalar():
+    xs = np.arange(0, 8.01, 1/12)
+    for a in [1/3, 1, np.pi/3]:
+        z = zigzag_array(xs, a=a)
+        n = np.floor(xs / a)
+        zi = zigzag_inverse_array(z, a=a, n=n)
+        for x, zx, nx, zix in zip(xs, z, n, zi):
+            assert np.isclose(zx, zigzag(x, a=a), rtol=1e-12)
+            assert np.isclose(zix, zigzag_inverse(zx, a=a, n=int(nx)), rtol=1e-12)